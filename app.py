@@ -1,22 +1,22 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
-import pdfplumber
-import re
 import os
-import base64
-import json
-import glob
 import time
+import zipfile
 from datetime import datetime
 from io import BytesIO
 
-# Importar librerías de ReportLab
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
+from cache_extraccion import pdf_sha256
+from conduce_rapido import COPIES_ORIGINAL_COPY
+from documentos_pdf import logo_digest, PDF_THEMES, today_str, conduce_model, conduce_imeis_model, garantia_model, IMEI_LAYOUT_TEXT, IMEI_LAYOUT_GRID
+from cache_documentos import document_key, dataframe_digest, render_cached, pdf_preview_png
+from vista_html import conduce_html, conduce_imeis_html, garantia_html
+from datos_documentos import items_to_conduce_df, extract_conduce_info, render_document, DOC_CONDUCE, DOC_CONDUCE_IMEIS, DOC_GARANTIA
+from sesiones import SessionStore, SessionAutosaver, apply_changes, OP_FIELDS
+from trabajos_render import RenderJobQueue, JOB_PENDING, JOB_ERROR, JOB_EXPIRED
+from extraccion import STRATEGY_AUTO, STRATEGY_COLUMNS
+from lote_facturas import extract_batch
 
 # ==========================================
 # CONFIGURACIÓN GENERAL
@@ -159,21 +159,29 @@ def get_theme_css(theme_mode):
 # --- THEME SELECTOR ---
 with st.sidebar.expander("⚙️ Configuración", expanded=True):
     app_theme = st.radio("Tema de la App", ["Claro", "Oscuro"], index=1, horizontal=True)
+    st.checkbox("⚡ Lectura por columnas (beta)", value=False, key="column_parser", help="Lee las facturas por coordenadas de columnas en vez de reconstruir el texto. Más rápido y tolera números dentro de la descripción.")
+    st.checkbox("⚡ Conduce rápido", value=False, key="fast_conduce", help="Dibuja el conduce directo sobre una plantilla fija: mucho más rápido, sobre todo en lotes.")
+    st.checkbox("Conduce con copia", value=False, key="conduce_copy", help="Agrega una segunda copia rotulada ORIGINAL / COPIA (solo conduce rápido).")
+    st.checkbox("👁️ Vista previa en vivo", value=True, key="live_preview", help="Muestra el documento en HTML mientras editas; el PDF se genera solo al pulsar Generar.")
 
 st.markdown(get_theme_css(app_theme), unsafe_allow_html=True)
 
 # --- UTILS COMUNES ---
 DEFAULT_THEME_COLOR = '#BDE5F8'
-PDF_THEMES = {
-    "Azul Clásico": "#BDE5F8",
-    "Verde Menta": "#C1E1C1",
-    "Gris Elegante": "#E0E0E0",
-    "Rojo Suave": "#FADBD8",
-    "Dorado": "#F9E79F"
-}
 
 LOGO_CACHE_FILE = "logo_cache_web.png"
 
+@st.cache_resource
+def get_render_queue():
+    # Un pool de procesos de render para todo el servidor (ver trabajos_render)
+    return RenderJobQueue()
+
+def worker_logo(logo):
+    # Los procesos de render reciben la ruta o los bytes, no el archivo subido
+    if logo is None or isinstance(logo, str):
+        return logo
+    return logo.getvalue()
+
 def save_logo_to_cache(uploaded_file):
     try:
         with open(LOGO_CACHE_FILE, "wb") as f:
@@ -188,218 +196,231 @@ def get_cached_logo():
         return LOGO_CACHE_FILE
     return None
 
-def _is_light_color(hex_color):
-    h = hex_color.lstrip('#')
-    try:
-        rgb = tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
-        brightness = (rgb[0] * 299 + rgb[1] * 587 + rgb[2] * 114) / 1000
-        return brightness > 125
-    except: return True
-
-def get_logo_image_reader(logo_source):
-    """Helper to convert logo source (path or bytes) to ImageReader/Image safely"""
-    logo_paragraph = Paragraph("", getSampleStyleSheet()["Normal"])
-    if not logo_source:
-        return logo_paragraph
-
+@st.cache_data(max_entries=32, show_spinner=False)
+def get_pdf_preview(etag, _pdf_bytes):
+    # Por ETag: los bytes (con guion bajo) no se hashean en cada rerun
+    return pdf_preview_png(_pdf_bytes)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def get_html_preview(key, _render):
+    # Por clave del documento: los reruns sin cambios no vuelven a armar el HTML
+    return _render()
+
+def show_live_preview(key, render_html):
+    # Vista previa HTML en cada edición, desde el mismo modelo que el PDF
+    if not st.session_state.get('live_preview', True):
+        return
+    with st.expander("👁️ Vista previa", expanded=True):
+        try:
+            components.html(get_html_preview(key, render_html), height=600, scrolling=True)
+        except Exception as e:
+            st.warning(f"No se pudo generar la vista previa: {e}")
+
+def show_pdf(state_key, pdf_bytes, etag, file_name):
+    # PDF generado en la página: botón de descarga y miniatura de la
+    # primera página. El PDF solo viaja al navegador si se descarga.
+    st.download_button("⬇️ Descargar PDF", pdf_bytes, file_name=file_name, mime="application/pdf", type="primary", use_container_width=True, key=f"{state_key}_download")
+    if st.session_state.get('live_preview', True):
+        return  # La vista previa HTML ya muestra el documento
     try:
-        if isinstance(logo_source, str): # Ruta archivo
-            with open(logo_source, "rb") as f:
-                content = f.read()
-                logo_bytes_io = BytesIO(content)
-        else: # UploadedFile
-            content = logo_source.read()
-            logo_source.seek(0) # Reset
-            logo_bytes_io = BytesIO(content)
-
-        if logo_bytes_io:
-            img_stream_1 = BytesIO(logo_bytes_io.getvalue())
-            img_stream_2 = BytesIO(logo_bytes_io.getvalue())
-            
-            logo_img = Image(img_stream_1)
-            ir = ImageReader(img_stream_2)
-            
-            iw, ih = ir.getSize()
-            aspect = ih / float(iw)
-            
-            target_w = 1.5 * inch
-            target_h = target_w * aspect
-            if target_h > 0.8 * inch:
-                target_h = 0.8 * inch
-                target_w = target_h / aspect
-                
-            logo_img.drawWidth = target_w
-            logo_img.drawHeight = target_h
-            return logo_img
+        png, n_pages = get_pdf_preview(etag, pdf_bytes)
+        st.image(png, caption=f"Vista previa: página 1 de {n_pages}", width=450)
     except Exception as e:
-        st.warning(f"Error cargando logo: {e}")
-    return logo_paragraph
+        st.warning(f"No se pudo generar la vista previa: {e}")
+
+def submit_render(state_key, key, doc_type, destinatario, factura, df, file_name, options):
+    # Encola el documento y guarda el id del trabajo; el script sigue sin esperar
+    job_id = get_render_queue().submit(key, doc_type, destinatario, factura, df, options)
+    st.session_state[state_key] = (job_id, file_name)
+
+@st.fragment(run_every=1.0)
+def poll_render_job(job_id):
+    # Solo este fragmento se repite mientras el trabajo está en curso
+    status = get_render_queue().status(job_id)
+    if status.state != JOB_PENDING:
+        st.rerun()  # Rerun completo: la página muestra la descarga
+    st.info(f"⏳ Generando PDF... ({status.seconds:.0f} s)")
+
+def show_render_job(state_key):
+    # Estado del último trabajo de render de la página
+    if state_key not in st.session_state:
+        return
+    job_id, file_name = st.session_state[state_key]
+    queue = get_render_queue()
+    status = queue.status(job_id)
+    if status.state == JOB_PENDING:
+        poll_render_job(job_id)
+        return
+    if status.state == JOB_ERROR:
+        st.error(f"Error generando el PDF: {status.error}")
+        return
+    result = queue.result(job_id) if status.state != JOB_EXPIRED else None
+    if result is None:
+        st.warning("El PDF ya no está en memoria; vuelve a generarlo.")
+        return
+    show_pdf(state_key, *result, file_name)
 
 # ==========================================
 # GESTIÓN DE SESIONES COLABORATIVAS
 # ==========================================
-SESSIONS_DIR = "sessions"
-if not os.path.exists(SESSIONS_DIR):
-    os.makedirs(SESSIONS_DIR)
+@st.cache_resource
+def get_session_store():
+    # Base SQLite compartida por todas las sesiones del servidor (ver sesiones.py)
+    return SessionStore()
+
+@st.cache_resource
+def get_session_autosaver():
+    return SessionAutosaver(get_session_store())
 
 def get_available_sessions():
-    files = glob.glob(os.path.join(SESSIONS_DIR, "*.json"))
-    return [os.path.basename(f).replace(".json", "") for f in files]
+    return get_session_store().list()
 
 def load_session_data(session_name):
     try:
-        with open(os.path.join(SESSIONS_DIR, f"{session_name}.json"), "r", encoding="utf-8") as f:
-            return json.load(f)
+        return get_session_store().load(session_name)
     except Exception as e:
         st.error(f"Error cargando sesión: {e}")
         return None
 
 def save_session_data(session_name, data):
     try:
-        data['last_updated'] = datetime.now().isoformat()
-        with open(os.path.join(SESSIONS_DIR, f"{session_name}.json"), "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        get_session_store().save(session_name, data)
         return True
     except Exception as e:
         st.error(f"Error guardando sesión: {e}")
         return False
 
-# ==========================================
-# MODULO 1: CONDUCE SIMPLE (Original)
-# ==========================================
-def clean_model_name(model_name):
-    # Lista de colores simplificada para mantener codigo limpio
-    colors_to_remove = [
-        'negro', 'rojo', 'verde', 'azul', 'blanco', 'gris', 'plateado',
-        'dorado', 'púrpura', 'morado', 'lavanda', 'rosa', 'rosado', 'amarillo', 'naranja', 'marrón',
-        'cyan', 'magenta', 'grafito', 'sierra', 'black', 'red', 'green',
-        'blue', 'white', 'gray', 'silver', 'gold', 'purple', 'pink',
-        'yellow', 'orange', 'brown', 'graphite', 'midnight blue',
-        'desert gold', 'titanium', 'oro', 'arena', 'pantone', 'tapestry',
-        'arabesque', 'navy', 'violet', 'mint', 'cream', 'beige', 'charcoal',
-        'blaze', 'pure', 'tendril', 'polar', 'deep', 'space', 'rose'
-    ]
-    model = model_name
-    model = re.sub(r'\s*5g\b', '', model, flags=re.IGNORECASE)
-    model = re.sub(r'\s*\d+\.?\d*\"+\s*$', '', model, flags=re.IGNORECASE)
-    color_pattern = r'\b(' + '|'.join(map(re.escape, colors_to_remove)) + r')\b'
-    model = re.sub(color_pattern, '', model, flags=re.IGNORECASE)
-    model = re.sub(r'\(\s*\)', '', model)
-    model = re.sub(r'\s{2,}', ' ', model).strip()
-    return model
-
-def extract_conduce_info(pdf_file):
-    text = ""
-    with pdfplumber.open(pdf_file) as pdf:
-        text = "\n".join(page.extract_text(x_tolerance=2, y_tolerance=2) or "" for page in pdf.pages)
-    
-    cliente = ""
-    factura = ""
-    cliente_match = re.search(r"Cliente:\s*(.*?)(?=\s*(?:Dirección:|Vendedor:|$))", text, re.DOTALL | re.IGNORECASE)
-    factura_match = re.search(r"No Factura\s*(\w+)", text, re.IGNORECASE)
-    
-    if cliente_match: cliente = cliente_match.group(1).strip()
-    if factura_match: factura = factura_match.group(1).strip()
-
-    found_items_1 = re.findall(r"^(\d+\.\d{2})\s+(.*?)(?=\s+\d{1,3}(?:,?\d{3})*\.\d{2})", text, re.MULTILINE)
-    found_items_2 = re.findall(r"^(.+?)\s+\d{1,3}(?:,?\d{3})*\.\d{2}\s+0\.00\s+\d{1,3}(?:,?\d{3})*\.\d{2}\n\s*(\d+\.\d{2})\s*$", text, re.MULTILINE)
-    found_items_2 = [(qty, desc) for desc, qty in found_items_2]
-    
-    found_items = found_items_1 + found_items_2
-    
-    df = pd.DataFrame(found_items, columns=['Cantidad', 'Modelo'])
-    if not df.empty:
-        df['Cantidad'] = pd.to_numeric(df['Cantidad']).astype(int)
-        df['Modelo'] = df['Modelo'].apply(clean_model_name)
-        df = df[df['Modelo'] != ""]
-        df = df.groupby('Modelo', as_index=False)['Cantidad'].sum()
-    
-    return cliente, factura, df
-
-def generate_conduce_pdf(destinatario, factura, logo_source, data_df, accent_hex, show_total):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, 
-                            leftMargin=0.4*inch, rightMargin=0.4*inch, 
-                            topMargin=0.3*inch, bottomMargin=0.3*inch)
-    story = []
-    styles = getSampleStyleSheet()
+def sync_session(session_name, prefix, session_type):
+    # Trae la sesión a {prefix}_cli / _fac / _df. Al conectar (o con
+    # "Recargar") se carga completa; en modo tiempo real solo se piden los
+    # cambios desde la última versión vista. True si la tabla cambió.
+    seen_key = f'{prefix}_session_version'
+    seen = st.session_state.get(seen_key)
+    if st.session_state.get('trigger_load_session'):
+        seen = None
+    elif not st.session_state.get('live_mode'):
+        return False
 
-    logo_paragraph = get_logo_image_reader(logo_source)
+    delta = None
+    if seen is not None and seen[0] == session_name:
+        delta = get_session_store().changes_since(session_name, seen[1])
+    if delta is None:
+        session_data = load_session_data(session_name)
+        if not session_data or session_data.get('type') != session_type:
+            return False
+        st.session_state.trigger_load_session = False
+        st.session_state[f'{prefix}_cli'] = session_data.get('destinatario', '')
+        st.session_state[f'{prefix}_fac'] = session_data.get('factura', '')
+        st.session_state[f'{prefix}_df'] = pd.DataFrame(session_data.get('items', []))
+        st.session_state[seen_key] = (session_name, session_data['version'])
+        return True
 
-    title_style = ParagraphStyle('TitleCustom', parent=styles['Heading1'], alignment=2, fontSize=18, spaceAfter=5, textColor=colors.HexColor("#2C3E50"))
-    title = Paragraph("CONDUCE DE ENTREGA", title_style)
-    
-    header_table = Table([[logo_paragraph, title]], colWidths=[2.5*inch, 5.0*inch])
-    header_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'MIDDLE')]))
-    story.append(header_table)
-    story.append(Spacer(1, 0.1*inch))
-
-    info_data = [
-        [f"FECHA: {datetime.now().strftime('%d/%m/%Y')}", f"FACTURA N°: {factura}"],
-        [f"CLIENTE: {destinatario}", ""]
-    ]
-    info_table = Table(info_data, colWidths=[5.2*inch, 2.5*inch])
-    info_table.setStyle(TableStyle([
-        ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('TEXTCOLOR', (0,0), (-1,-1), colors.HexColor("#34495E")),
-        ('LINEBELOW', (0,0), (-1,0), 1, colors.HexColor(accent_hex)),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 0.1*inch))
-
-    data = data_df.sort_values(by="Modelo")
-    table_data = [[Paragraph("CANT", styles["Normal"]), Paragraph("DESCRIPCIÓN DEL MODELO / EQUIPO", styles["Normal"]), Paragraph("VERIF.", styles["Normal"])]]
-    
-    row_style = ParagraphStyle('Row', parent=styles['Normal'], fontSize=10, leading=11)
-    
-    for _, row in data.iterrows():
-        table_data.append([str(row['Cantidad']), Paragraph(str(row['Modelo']), row_style), "[      ]"])
-    
-    t = Table(table_data, colWidths=[0.8*inch, 6.1*inch, 0.8*inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor(accent_hex)),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.black if _is_light_color(accent_hex) else colors.white),
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('ALIGN', (0,1), (0,-1), 'CENTER'),
-        ('ALIGN', (2,0), (-1,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 9),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-    ]))
-    story.append(t)
-
-    if show_total:
-        story.append(Spacer(1, 0.05*inch))
-        total = data['Cantidad'].sum()
-        tot_style = ParagraphStyle('Tot', parent=styles['Normal'], alignment=2, fontSize=11, fontName='Helvetica-Bold')
-        story.append(Paragraph(f"TOTAL UNIDADES: {total}", tot_style))
-
-    story.append(Spacer(1, 0.2*inch))
-    
-    story.append(Paragraph("<b>Nota Importante:</b><br/>Recibido Conforme...", ParagraphStyle('Legal', fontSize=7, leading=8)))
-    story.append(Spacer(1, 0.3*inch))
-    
-    sig_data = [["_______________________", "_______________________"], ["Despachado por", "RECIBIDO CONFORME"]]
-    sig_table = Table(sig_data, colWidths=[3.75*inch, 3.75*inch])
-    sig_table.setStyle(TableStyle([('ALIGN', (0,0), (-1,-1), 'CENTER')]))
-    story.append(sig_table)
+    version, changes = delta
+    st.session_state[seen_key] = (session_name, version)
+    if not changes:
+        return False
+    for op, _, data in changes:
+        if op == OP_FIELDS:
+            st.session_state[f'{prefix}_cli'] = data.get('destinatario', '')
+            st.session_state[f'{prefix}_fac'] = data.get('factura', '')
+    st.session_state[f'{prefix}_df'] = apply_changes(st.session_state[f'{prefix}_df'], changes)
+    return True
+
+def autosave_session(session_name, data):
+    # Llamado en cada rerun: solo se escribe si el contenido cambió, y las
+    # ediciones seguidas se agrupan en una sola escritura
+    autosaver = get_session_autosaver()
+    autosaver.save(session_name, data)
+    error = autosaver.error(session_name)
+    if error:
+        st.warning(f"Error guardando sesión: {error}")
+        return False
+    return True
 
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+# ==========================================
+# MODULO 1: CONDUCE SIMPLE (Original)
+# ==========================================
+def get_extraction_strategy():
+    return STRATEGY_COLUMNS if st.session_state.get('column_parser') else STRATEGY_AUTO
+
+def conduce_job(destinatario, factura, df):
+    # (clave, opciones de render_document) del conduce simple con el render
+    # elegido en la configuración
+    logo = st.session_state.get('logo_active')
+    accent = st.session_state.accent_color
+    date_str = today_str()
+    fast = bool(st.session_state.get('fast_conduce'))
+    copies = COPIES_ORIGINAL_COPY if fast and st.session_state.get('conduce_copy') else None
+    key = document_key("conduce_rapido" if fast else "conduce", destinatario=destinatario, factura=factura,
+                       items=dataframe_digest(df), tema=accent, logo=logo_digest(logo), fecha=date_str, copias=copies)
+    options = dict(accent_hex=accent, logo=worker_logo(logo), date_str=date_str, fast=fast, copies=copies)
+    return key, options
+
+def batch_conduce_section():
+    with st.expander("📦 Procesamiento por Lotes (varias facturas)"):
+        uploaded_pdfs = st.file_uploader("Sube varias facturas (PDF)", type="pdf", accept_multiple_files=True, key="conduce_batch_pdfs")
+        
+        if uploaded_pdfs and st.button("Procesar Lote", use_container_width=True):
+            progress = st.progress(0.0, text="Procesando facturas...")
+            
+            def on_progress(done, total, result):
+                progress.progress(done / total, text=f"{done}/{total} · {result['archivo']}")
+            
+            st.session_state.c_batch = extract_batch(uploaded_pdfs, progress_callback=on_progress)
+            progress.empty()
+        
+        batch = st.session_state.get('c_batch')
+        if not batch:
+            return
+        
+        summary = pd.DataFrame([{
+            "Archivo": r['archivo'],
+            "Cliente": r['cliente'],
+            "Factura": r['factura'],
+            "Líneas": len(r['items']),
+            "Unidades": int(sum(float(qty) for qty, _ in r['items'])),
+            "Error": r['error'] or "",
+        } for r in batch])
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+        
+        ok_results = [r for r in batch if not r['error']]
+        if not ok_results:
+            return
+        
+        col_sel, col_load = st.columns([3, 1])
+        selected = col_sel.selectbox("Factura", range(len(ok_results)), format_func=lambda i: f"{ok_results[i]['archivo']} ({ok_results[i]['factura']})", label_visibility="collapsed")
+        if col_load.button("Cargar en editor", use_container_width=True):
+            r = ok_results[selected]
+            st.session_state.c_cli = r['cliente']
+            st.session_state.c_fac = r['factura']
+            st.session_state.c_df = items_to_conduce_df(r['items'])
+            st.session_state.data_version = st.session_state.get('data_version', 0) + 1 # Force editor update
+            st.rerun()
+        
+        if st.button("Generar todos los conduces (ZIP)", use_container_width=True):
+            zip_buffer = BytesIO()
+            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+                for r in ok_results:
+                    # El ZIP necesita todos los PDF: el lote se genera aquí mismo
+                    df = items_to_conduce_df(r['items'])
+                    key, options = conduce_job(r['cliente'], r['factura'], df)
+                    pdf_bytes, _ = render_cached(key, lambda: render_document(DOC_CONDUCE, r['cliente'], r['factura'], df, **options))
+                    zf.writestr(f"Conduce_{r['factura'] or os.path.splitext(r['archivo'])[0]}.pdf", pdf_bytes)
+            st.download_button("⬇️ Descargar ZIP", zip_buffer.getvalue(), file_name="conduces.zip", mime="application/zip", use_container_width=True)
 
 def page_conduce():
     st.header("🚚 Generador de Conduces")
     
+    batch_conduce_section()
+    
     uploaded_pdf = st.file_uploader("📂 Sube tu factura (PDF)", type="pdf", key="conduce_pdf")
     
     if uploaded_pdf:
-        if 'c_file' not in st.session_state or st.session_state.c_file != uploaded_pdf.name:
-            st.session_state.c_file = uploaded_pdf.name
-            cli, fac, df = extract_conduce_info(uploaded_pdf)
+        strategy = get_extraction_strategy()
+        pdf_key = f"{pdf_sha256(uploaded_pdf.getvalue())}-{strategy}"
+        if 'c_file' not in st.session_state or st.session_state.c_file != pdf_key:
+            st.session_state.c_file = pdf_key
+            cli, fac, df = extract_conduce_info(uploaded_pdf, strategy)
             st.session_state.c_cli = cli
             st.session_state.c_fac = fac
             st.session_state.c_df = df
@@ -412,27 +433,11 @@ def page_conduce():
         # Check active session for auto-sync
         active_session = st.session_state.get('active_session')
         
-        # Load from session if requested (via button or init)
-        if active_session and st.session_state.get('trigger_load_session'):
-            session_data = load_session_data(active_session)
-            if session_data and session_data.get('type') == 'conduce_simple':
-                st.session_state.c_cli = session_data.get('destinatario', '')
-                st.session_state.c_fac = session_data.get('factura', '')
-                st.session_state.c_df = pd.DataFrame(session_data.get('items', []))
-    if 'c_df' in st.session_state:
-        # Check active session for auto-sync
-        active_session = st.session_state.get('active_session')
-        
-        # Load from session if requested (via button or init)
-        if active_session and st.session_state.get('trigger_load_session'):
-            session_data = load_session_data(active_session)
-            if session_data and session_data.get('type') == 'conduce_simple':
-                st.session_state.c_cli = session_data.get('destinatario', '')
-                st.session_state.c_fac = session_data.get('factura', '')
-                st.session_state.c_df = pd.DataFrame(session_data.get('items', []))
-                st.session_state.trigger_load_session = False
-                st.session_state.data_version = st.session_state.get('data_version', 0) + 1 # Force editor update
-                st.rerun()
+        # Load from session if requested (via button or init), or only the
+        # changes since the last seen version in live mode
+        if active_session and sync_session(active_session, 'c', 'conduce_simple'):
+            st.session_state.data_version = st.session_state.get('data_version', 0) + 1 # Force editor update
+            st.rerun()
 
         # Dynamic key to force refresh when data updates from session
         editor_key = f"editor_simple_{st.session_state.get('data_version', 0)}"
@@ -446,82 +451,26 @@ def page_conduce():
                 "factura": factura,
                 "items": edited_df.to_dict('records')
             }
-            # Save on every interaction potentially heavy, but ensures real-time feel
-            save_session_data(active_session, current_data)
-            st.caption(f"☁️ Guardado en sesión: {active_session}")
+            if autosave_session(active_session, current_data):
+                st.caption(f"☁️ Guardado en sesión: {active_session}")
             
     else:
         edited_df = pd.DataFrame(columns=['Cantidad', 'Modelo'])
 
+    accent = st.session_state.accent_color
+    date_str = today_str()
+    show_live_preview(document_key("vista_conduce", destinatario=destinatario, factura=factura, items=dataframe_digest(edited_df), tema=accent, fecha=date_str),
+                      lambda: conduce_html(conduce_model(destinatario, factura, edited_df, True, date_str), accent))
+
     if st.button("Generar PDF", type="primary", use_container_width=True):
         if 'logo_active' in st.session_state:
-            pdf_bytes = generate_conduce_pdf(destinatario, factura, st.session_state.logo_active, edited_df, st.session_state.accent_color, True).getvalue()
-            b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-            st.markdown(f'<iframe src="data:application/pdf;base64,{b64_pdf}" width="100%" height="600"></iframe>', unsafe_allow_html=True)
+            key, options = conduce_job(destinatario, factura, edited_df)
+            submit_render('c_job', key, DOC_CONDUCE, destinatario, factura, edited_df, f"Conduce_{factura or 'sin_factura'}.pdf", options)
+    show_render_job('c_job')
 
 # ==========================================
 # MODULO 2: RECIBO DE GARANTÍA
 # ==========================================
-def generate_garantia_pdf(store_name, date_str, items_df, logo_source):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=0.4*inch, rightMargin=0.4*inch, topMargin=0.4*inch, bottomMargin=0.2*inch)
-    story = []
-    styles = getSampleStyleSheet()
-
-    # Logo
-    logo_obj = get_logo_image_reader(logo_source)
-    
-    # Address
-    address_text = "Calle Duarte, Esq Dr Ferry #54<br/>Sucursal La Romana<br/>RNC: 132872975"
-    address_para = Paragraph(address_text, ParagraphStyle('Right', parent=styles['Normal'], alignment=0, leading=14, fontSize=10))
-
-    t_header = Table([[logo_obj, address_para]], colWidths=[4*inch, 3.5*inch])
-    t_header.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP'), ('ALIGN', (1,0), (1,0), 'RIGHT')]))
-    story.append(t_header)
-    story.append(Spacer(1, 0.2*inch))
-
-    story.append(Paragraph("RECIBO DE GARANTIA", ParagraphStyle('TitleG', parent=styles['Heading1'], fontSize=24, textColor=colors.navy, spaceAfter=2)))
-    story.append(Paragraph(f"Fecha:  {date_str}", ParagraphStyle('Date', parent=styles['Normal'], fontSize=12, textColor=colors.deeppink, fontName='Helvetica-Bold')))
-    story.append(Paragraph(f"Tienda: {store_name}", ParagraphStyle('Store', parent=styles['Normal'], fontSize=12, fontName='Helvetica-Bold', spaceAfter=10)))
-
-    # Items Table
-    data_rows = [['CANT', 'DESCRIPCIÓN']]
-    total_cant = 0
-    
-    for _, row in items_df.iterrows():
-        qty = int(row['Cantidad']) if str(row['Cantidad']).isdigit() else 1
-        total_cant += qty
-        desc = f"<b>{row['Modelo']}</b>"
-        if row['IMEIs/Coment']:
-            desc += f"<br/><font size=10 color=grey>{row['IMEIs/Coment'].replace(',', '<br/>')}</font>"
-        
-        data_rows.append([str(qty), Paragraph(desc, ParagraphStyle('I', parent=styles['Normal'], fontSize=12))])
-
-    data_rows.append([str(total_cant), Paragraph("<b>TOTAL EQUIPOS</b>", styles['Normal'])])
-
-    t_items = Table(data_rows, colWidths=[1*inch, 6.5*inch])
-    t_items.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('GRID', (0,0), (-1,-1), 1, colors.black),
-        ('ALIGN', (0,0), (0,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-    ]))
-    story.append(t_items)
-    story.append(Spacer(1, 0.2*inch))
-
-    # Terms
-    terms = "La garantía quedará anulada si el equipo presenta daños físicos, humedad o mal uso."
-    story.append(Paragraph(terms, ParagraphStyle('Terms', fontSize=8)))
-    story.append(Spacer(1, 0.4*inch))
-    
-    story.append(Paragraph("___________________________________", ParagraphStyle('L', alignment=1)))
-    story.append(Paragraph("Firma", ParagraphStyle('S', alignment=1, textColor=colors.deeppink)))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
 def page_garantia():
     st.header("🛡️ Recibo de Garantía")
     
@@ -544,140 +493,25 @@ def page_garantia():
         }
     )
 
+    date_str = date_val.strftime("%d/%m/%Y")
+    if not edited_df.empty:
+        show_live_preview(document_key("vista_garantia", tienda=store, fecha=date_str, items=dataframe_digest(edited_df)),
+                          lambda: garantia_html(garantia_model(store, date_str, edited_df)))
+
     if st.button("🖨️ Generar Recibo", type="primary"):
         if edited_df.empty:
             st.error("Agrega items primero.")
         else:
             if 'logo_active' in st.session_state:
-                pdf_bytes = generate_garantia_pdf(store, date_val.strftime("%d/%m/%Y"), edited_df, st.session_state.logo_active).getvalue()
-                b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-                st.markdown(f'<iframe src="data:application/pdf;base64,{b64_pdf}" width="100%" height="600"></iframe>', unsafe_allow_html=True)
+                logo = st.session_state.logo_active
+                key = document_key("garantia", tienda=store, fecha=date_str, items=dataframe_digest(edited_df), logo=logo_digest(logo))
+                submit_render('g_job', key, DOC_GARANTIA, "", "", edited_df, f"Garantia_{store or 'tienda'}.pdf",
+                              dict(logo=worker_logo(logo), date_str=date_str, store=store))
+    show_render_job('g_job')
 
 # ==========================================
 # MODULO 3: CONDUCE CON IMEIS
 # ==========================================
-def generate_conduce_imeis_pdf(destinatario, factura, logo_source, data_df, accent_hex):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, 
-                            leftMargin=0.4*inch, rightMargin=0.4*inch, 
-                            topMargin=0.3*inch, bottomMargin=0.3*inch)
-    story = []
-    styles = getSampleStyleSheet()
-
-    # --- HEADER ---
-    logo_paragraph = get_logo_image_reader(logo_source)
-    
-    title_style = ParagraphStyle('TitleCustom', parent=styles['Heading1'], alignment=2, fontSize=18, spaceAfter=5, textColor=colors.HexColor("#2C3E50"))
-    title = Paragraph("CONDUCE DE ENTREGA (IMEIs)", title_style)
-    
-    header_table = Table([[logo_paragraph, title]], colWidths=[2.5*inch, 5.0*inch])
-    header_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'MIDDLE')]))
-    story.append(header_table)
-    story.append(Spacer(1, 0.1*inch))
-
-    # --- INFO ---
-    info_data = [
-        [f"FECHA: {datetime.now().strftime('%d/%m/%Y')}", f"FACTURA N°: {factura}"],
-        [f"CLIENTE: {destinatario}", ""]
-    ]
-    info_table = Table(info_data, colWidths=[5.2*inch, 2.5*inch])
-    info_table.setStyle(TableStyle([
-        ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('TEXTCOLOR', (0,0), (-1,-1), colors.HexColor("#34495E")),
-        ('LINEBELOW', (0,0), (-1,0), 1, colors.HexColor(accent_hex)),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-    ]))
-    story.append(info_table)
-    story.append(Spacer(1, 0.1*inch))
-
-    # --- TITLE GOODS ---
-    Story_Goods = [
-        [Paragraph("<b>DETALLE DE MERCANCÍA</b>", ParagraphStyle('H2Center', parent=styles['Normal'], fontSize=10, alignment=1, textColor=colors.black))]
-    ]
-    t_title_goods = Table(Story_Goods, colWidths=[7.7*inch])
-    t_title_goods.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,-1), colors.HexColor(accent_hex)),
-        ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-    ]))
-    story.append(t_title_goods)
-    
-    # --- GOODS TABLE ---
-    prod_data = [[Paragraph('<b>CANT</b>', styles['Normal']), Paragraph('<b>DESCRIPCIÓN DEL MODELO / EQUIPO</b>', styles['Normal'])]]
-    
-    data = data_df.sort_values(by="Modelo")
-    row_style = ParagraphStyle('Row', parent=styles['Normal'], fontSize=10, leading=11)
-    
-    for _, row in data.iterrows():
-        prod_data.append([str(row['Cantidad']), Paragraph(str(row['Modelo']), row_style)])
-        
-    t_products = Table(prod_data, colWidths=[0.8*inch, 6.9*inch])
-    t_products.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-        ('ALIGN', (0,0), (-1,0), 'CENTER'),
-        ('ALIGN', (0,1), (0,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 9),
-    ]))
-    story.append(t_products)
-    story.append(Spacer(1, 0.2*inch))
-
-    # --- IMEIS SECTION ---
-    # Check if any IMEIs exist
-    has_imeis = data['IMEIs'].str.strip().ne('').any()
-    
-    if has_imeis:
-        # Title IMEIs
-        Story_Imeis_Title = [
-            [Paragraph("<b>DETALLE DE IMEIS / SERIALES</b>", ParagraphStyle('H2Center', parent=styles['Normal'], fontSize=10, alignment=1, textColor=colors.black))]
-        ]
-        t_title_imeis = Table(Story_Imeis_Title, colWidths=[7.7*inch])
-        t_title_imeis.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,-1), colors.HexColor(accent_hex)),
-            ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ]))
-        story.append(t_title_imeis)
-
-        # IMEIs Content
-        imei_rows = []
-        style_imeis = ParagraphStyle('Imeis', parent=styles['Normal'], fontSize=8, leading=10)
-        
-        for _, row in data.iterrows():
-            imeis_text = str(row['IMEIs']).strip()
-            if imeis_text:
-                full_text = f"<b>{row['Modelo']}:</b> {imeis_text}"
-                imei_rows.append([Paragraph(full_text, style_imeis)])
-        
-        if imei_rows:
-            t_imeis_content = Table(imei_rows, colWidths=[7.7*inch])
-            t_imeis_content.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                ('topPadding', (0,0), (-1,-1), 3),
-                ('bottomPadding', (0,0), (-1,-1), 3),
-            ]))
-            story.append(t_imeis_content)
-        
-        story.append(Spacer(1, 0.2*inch))
-
-    # --- FOOTER ---
-    note_text = """<b>Nota Importante:</b> Al firmar como "Recibido Conforme", el cliente acepta las políticas de la empresa y certifica que ha recibido la mercancía detallada en este conduce, con los seriales/IMEIs aquí descritos. La mercancía viaja por cuenta y riesgo del comprador."""
-    story.append(Paragraph(note_text, ParagraphStyle('Note', parent=styles['Normal'], fontSize=7)))
-    story.append(Spacer(1, 0.4*inch))
-
-    sig_data = [["_______________________", "_______________________"], ["Despachado por", "RECIBIDO CONFORME"]]
-    sig_table = Table(sig_data, colWidths=[3.75*inch, 3.75*inch])
-    sig_table.setStyle(TableStyle([('ALIGN', (0,0), (-1,-1), 'CENTER')]))
-    story.append(sig_table)
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
-
 def page_conduce_imeis():
     st.header("📱 Generador de Conduces con IMEIs")
     
@@ -693,9 +527,11 @@ def page_conduce_imeis():
     uploaded_pdf = st.file_uploader("📂 Sube tu factura (PDF)", type="pdf", key="conduce_imeis_pdf")
     
     if uploaded_pdf:
-        if 'ci_file' not in st.session_state or st.session_state.ci_file != uploaded_pdf.name:
-            st.session_state.ci_file = uploaded_pdf.name
-            cli, fac, df = extract_conduce_info(uploaded_pdf)
+        strategy = get_extraction_strategy()
+        pdf_key = f"{pdf_sha256(uploaded_pdf.getvalue())}-{strategy}"
+        if 'ci_file' not in st.session_state or st.session_state.ci_file != pdf_key:
+            st.session_state.ci_file = pdf_key
+            cli, fac, df = extract_conduce_info(uploaded_pdf, strategy)
             st.session_state.ci_cli = cli
             st.session_state.ci_fac = fac
             # Add separate empty column for IMEIs if not present
@@ -710,16 +546,10 @@ def page_conduce_imeis():
     st.info("💡 Puedes pegar los IMEIs directamente en la columna 'IMEIs' al lado de cada modelo.")
     
     if 'ci_df' in st.session_state:
-        # Load logic for IMEIs page
-        if active_session and st.session_state.get('trigger_load_session'):
-            session_data = load_session_data(active_session)
-            if session_data and session_data.get('type') == 'conduce_imeis':
-                st.session_state.ci_cli = session_data.get('destinatario', '')
-                st.session_state.ci_fac = session_data.get('factura', '')
-                st.session_state.ci_df = pd.DataFrame(session_data.get('items', []))
-                st.session_state.trigger_load_session = False # Reset flag
-                st.session_state.data_version = st.session_state.get('data_version', 0) + 1 # Force editor update
-                st.rerun()
+        # Load logic for IMEIs page (full load or live-mode delta)
+        if active_session and sync_session(active_session, 'ci', 'conduce_imeis'):
+            st.session_state.data_version = st.session_state.get('data_version', 0) + 1 # Force editor update
+            st.rerun()
 
         # Dynamic key to force refresh
         editor_key = f"editor_imeis_{st.session_state.get('data_version', 0)}"
@@ -742,17 +572,28 @@ def page_conduce_imeis():
                 "factura": factura,
                 "items": edited_df.to_dict('records')
             }
-            save_session_data(active_session, current_data)
-            st.caption(f"☁️ Sincronizado con sesión: {active_session}")
+            if autosave_session(active_session, current_data):
+                st.caption(f"☁️ Sincronizado con sesión: {active_session}")
 
     else:
         edited_df = pd.DataFrame(columns=['Cantidad', 'Modelo', 'IMEIs'])
 
+    imei_format = st.radio("Formato de IMEIs en el PDF", ["Texto", "Grilla compacta"], horizontal=True, help="La grilla compacta ordena los IMEIs en columnas y usa muchas menos páginas en pedidos grandes.")
+    imei_layout = IMEI_LAYOUT_GRID if imei_format == "Grilla compacta" else IMEI_LAYOUT_TEXT
+
+    accent = st.session_state.accent_color
+    date_str = today_str()
+    show_live_preview(document_key("vista_conduce_imeis", destinatario=destinatario, factura=factura, items=dataframe_digest(edited_df), tema=accent, fecha=date_str, formato=imei_layout),
+                      lambda: conduce_imeis_html(conduce_imeis_model(destinatario, factura, edited_df, date_str), accent, imei_layout))
+
     if st.button("Generar PDF con IMEIs", type="primary", use_container_width=True):
         if 'logo_active' in st.session_state:
-            pdf_bytes = generate_conduce_imeis_pdf(destinatario, factura, st.session_state.logo_active, edited_df, st.session_state.accent_color).getvalue()
-            b64_pdf = base64.b64encode(pdf_bytes).decode('utf-8')
-            st.markdown(f'<iframe src="data:application/pdf;base64,{b64_pdf}" width="100%" height="600"></iframe>', unsafe_allow_html=True)
+            logo = st.session_state.logo_active
+            key = document_key("conduce_imeis", destinatario=destinatario, factura=factura, items=dataframe_digest(edited_df),
+                               tema=accent, logo=logo_digest(logo), fecha=date_str, formato=imei_layout)
+            submit_render('ci_job', key, DOC_CONDUCE_IMEIS, destinatario, factura, edited_df, f"Conduce_IMEIs_{factura or 'sin_factura'}.pdf",
+                          dict(accent_hex=accent, logo=worker_logo(logo), date_str=date_str, imei_layout=imei_layout))
+    show_render_job('ci_job')
 
 # ==========================================
 # APP MAIN
@@ -0,0 +1,220 @@
+"""Benchmark de escalabilidad de los generadores de PDF (web y escritorio).
+
+Renderiza cada documento con 1, 100, 1.000 y 10.000 filas, y los que
+llevan IMEIs con 0 a 5.000 IMEIs por modelo. Mide tiempo, pico de memoria
+(tracemalloc), bytes y páginas del PDF, y marca las entradas con las que
+ReportLab falla (p. ej. una celda de IMEIs más alta que una página).
+
+Las versiones de escritorio (create_pdf_pro, create_pdf_conduce,
+GarantiaApp.build_pdf) se llaman con un `self` falso; si customtkinter no
+está instalado se reportan como no disponibles.
+
+Uso:
+    python -m benchmarks.bench_documentos [--filas 1 100 1000 10000]
+        [--imeis 0 10 100 1000 5000] [--modelos 5] [--solo conduce_web ...]
+        [--sin-memoria] [--json resultados.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+
+from benchmarks.facturas_sinteticas import random_model
+from conduce_rapido import generate_conduce_fast, COPIES_ORIGINAL_COPY
+from documentos_pdf import generate_conduce_pdf, generate_conduce_imeis_pdf, generate_garantia_pdf, IMEI_LAYOUT_TEXT, IMEI_LAYOUT_GRID
+
+ACCENT = "#BDE5F8"
+DEFAULT_LOGO = "logo_cache_web.png"
+_PAGE = re.compile(rb"/Type\s*/Page\b(?!s)")
+
+
+def _random_imeis(rnd, n):
+    return [str(rnd.randrange(10**14, 10**15)) for _ in range(n)]
+
+
+def build_rows(n_rows, imeis_per_model, seed=0):
+    """[(cantidad, modelo, [imeis])] con modelos únicos."""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n_rows):
+        model = f"{random_model(rnd)} #{i + 1}"
+        qty = imeis_per_model or rnd.randint(1, 20)
+        rows.append((qty, model, _random_imeis(rnd, imeis_per_model)))
+    return rows
+
+
+# --- Adaptadores: cada uno recibe las filas y devuelve los bytes del PDF ---
+
+def _conduce_web(rows, logo):
+    df = pd.DataFrame([(q, m) for q, m, _ in rows], columns=["Cantidad", "Modelo"])
+    return generate_conduce_pdf("CLIENTE DEMO", "F000001", logo, df, ACCENT, True).getvalue()
+
+
+def _conduce_rapido(rows, logo, copies=None):
+    df = pd.DataFrame([(q, m) for q, m, _ in rows], columns=["Cantidad", "Modelo"])
+    return generate_conduce_fast("CLIENTE DEMO", "F000001", logo, df, ACCENT, True, copies).getvalue()
+
+
+def _conduce_imeis_web(rows, logo, imei_layout=IMEI_LAYOUT_TEXT):
+    df = pd.DataFrame([(q, m, ", ".join(imeis)) for q, m, imeis in rows], columns=["Cantidad", "Modelo", "IMEIs"])
+    return generate_conduce_imeis_pdf("CLIENTE DEMO", "F000001", logo, df, ACCENT, imei_layout).getvalue()
+
+
+def _garantia_web(rows, logo):
+    df = pd.DataFrame([(q, m, ",".join(imeis)) for q, m, imeis in rows], columns=["Cantidad", "Modelo", "IMEIs/Coment"])
+    return generate_garantia_pdf("TIENDA DEMO", "01/01/2025", df, logo).getvalue()
+
+
+def _render_to_file(render):
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        render(path)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def _create_pdf_pro(rows, logo):
+    from pdfconduce import PDFProcessorApp
+    df = pd.DataFrame([(q, m) for q, m, _ in rows], columns=["Cantidad", "Modelo"])
+    fake = SimpleNamespace(processed_data=df, show_total_var=SimpleNamespace(get=lambda: True))
+    fake._is_light_color = lambda hex_color: PDFProcessorApp._is_light_color(fake, hex_color)
+    return _render_to_file(lambda path: PDFProcessorApp.create_pdf_pro(fake, "CLIENTE DEMO", "F000001", logo, path, ACCENT))
+
+
+def _create_pdf_conduce(rows, logo, imei_layout=IMEI_LAYOUT_TEXT):
+    from pdfconduce_imeis import PDFProcessorApp
+    df = pd.DataFrame([(q, m) for q, m, _ in rows], columns=["Cantidad", "Modelo"])
+    fake = SimpleNamespace(processed_data=df, imeis_data={m: "\n".join(imeis) for _, m, imeis in rows})
+    return _render_to_file(lambda path: PDFProcessorApp.create_pdf_conduce(fake, "CLIENTE DEMO", "F000001", logo, path, imei_layout))
+
+
+def _garantia_tk(rows, logo):
+    from recibo_garantia import GarantiaApp
+    fake = SimpleNamespace(logo_path=logo, items_data=[{"Cantidad": q, "Modelo": m, "Imeis": "\n".join(imeis)} for q, m, imeis in rows])
+    return _render_to_file(lambda path: GarantiaApp.build_pdf(fake, path, "TIENDA DEMO", "01/01/2025"))
+
+
+# nombre: (adaptador, lleva IMEIs)
+DOCUMENTS = {
+    "conduce_web": (_conduce_web, False),
+    "conduce_rapido": (_conduce_rapido, False),
+    "conduce_rapido_copia": (lambda rows, logo: _conduce_rapido(rows, logo, COPIES_ORIGINAL_COPY), False),
+    "conduce_imeis_web": (_conduce_imeis_web, True),
+    "conduce_imeis_web_grilla": (lambda rows, logo: _conduce_imeis_web(rows, logo, IMEI_LAYOUT_GRID), True),
+    "garantia_web": (_garantia_web, True),
+    "create_pdf_pro": (_create_pdf_pro, False),
+    "create_pdf_conduce": (_create_pdf_conduce, True),
+    "create_pdf_conduce_grilla": (lambda rows, logo: _create_pdf_conduce(rows, logo, IMEI_LAYOUT_GRID), True),
+    "garantia_tk": (_garantia_tk, True),
+}
+
+
+def run_case(name, rows, logo, with_memory):
+    render, _ = DOCUMENTS[name]
+    result = {"segundos": None, "pico_mem_mb": None, "bytes": None, "paginas": None, "error": None}
+    try:
+        gc.collect()
+        t0 = time.perf_counter()
+        pdf_bytes = render(rows, logo)
+        result["segundos"] = round(time.perf_counter() - t0, 4)
+        result["bytes"] = len(pdf_bytes)
+        result["paginas"] = len(_PAGE.findall(pdf_bytes))
+        del pdf_bytes
+
+        if with_memory:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                render(rows, logo)
+                result["pico_mem_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+            finally:
+                tracemalloc.stop()
+    except ImportError as e:
+        result["error"] = f"no disponible ({e})"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {' '.join(str(e).split())[:200]}"
+    return result
+
+
+def iter_cases(documents, row_counts, imei_counts, models):
+    # Barrido de filas sin IMEIs, y barrido de IMEIs con pocos modelos
+    for name in documents:
+        for n_rows in row_counts:
+            yield name, n_rows, 0
+    for name in documents:
+        if DOCUMENTS[name][1]:
+            for n_imeis in imei_counts:
+                yield name, models, n_imeis
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--filas", type=int, nargs="+", default=[1, 100, 1000, 10000])
+    ap.add_argument("--imeis", type=int, nargs="+", default=[0, 10, 100, 1000, 5000], help="IMEIs por modelo")
+    ap.add_argument("--modelos", type=int, default=5, help="modelos en el barrido de IMEIs")
+    ap.add_argument("--solo", nargs="+", choices=sorted(DOCUMENTS), help="limitar a estos documentos")
+    ap.add_argument("--logo", default=DEFAULT_LOGO if os.path.exists(DEFAULT_LOGO) else None)
+    ap.add_argument("--sin-memoria", action="store_true", help="no medir pico de memoria (evita la segunda corrida)")
+    ap.add_argument("--json", metavar="RUTA", help="guardar resultados en JSON")
+    args = ap.parse_args()
+
+    documents = args.solo or list(DOCUMENTS)
+    results = []
+    unavailable = set()
+
+    print(f"{'documento':26} {'filas':>6} {'imeis':>6} {'seg':>8} {'pico MB':>8} {'KB':>8} {'pág':>5}  estado")
+    for name, n_rows, n_imeis in iter_cases(documents, args.filas, args.imeis, args.modelos):
+        if name in unavailable:
+            continue
+        rows = build_rows(n_rows, n_imeis)
+        result = run_case(name, rows, args.logo, not args.sin_memoria)
+        if result["error"] and result["error"].startswith("no disponible"):
+            unavailable.add(name)
+            print(f"{name:26} {'':>6} {'':>6} {'':>8} {'':>8} {'':>8} {'':>5}  {result['error']}")
+            continue
+        results.append(dict(documento=name, filas=n_rows, imeis_por_modelo=n_imeis, **result))
+
+        status = "FALLA: " + result["error"] if result["error"] else "ok"
+        seconds = f"{result['segundos']:.3f}" if result["segundos"] is not None else "-"
+        memory = f"{result['pico_mem_mb']:.1f}" if result["pico_mem_mb"] is not None else "-"
+        size = f"{result['bytes'] / 1024:.0f}" if result["bytes"] is not None else "-"
+        pages = result["paginas"] if result["paginas"] is not None else "-"
+        print(f"{name:26} {n_rows:>6} {n_imeis:>6} {seconds:>8} {memory:>8} {size:>8} {pages:>5}  {status}")
+
+    failures = [r for r in results if r["error"]]
+    if failures:
+        print(f"\n{len(failures)} entradas que ReportLab no pudo renderizar:")
+        for r in failures:
+            print(f"  {r['documento']} con {r['filas']} filas x {r['imeis_por_modelo']} IMEIs: {r['error']}")
+
+    if args.json:
+        report = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "no_disponibles": sorted(unavailable),
+            "resultados": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print(f"Resultados guardados en {args.json}")
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
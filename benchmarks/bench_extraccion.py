@@ -0,0 +1,163 @@
+"""Benchmark de extracción de facturas sobre el corpus sintético.
+
+Mide, por layout y número de páginas, tres etapas por separado:
+extracción de texto con pdfplumber, parseo de líneas (regex) y limpieza
+de nombres de modelo (el motor de clean_model_name). Reporta ms/página,
+líneas/s y pico de memoria (tracemalloc), y guarda o compara una línea
+base en JSON.
+
+Uso:
+    python -m benchmarks.bench_extraccion [--pages 1 10 50] [--lines 30] [--repeat 3]
+        [--guardar benchmarks/baseline_extraccion.json]
+        [--comparar benchmarks/baseline_extraccion.json] [--tolerancia 0.25]
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import pdfplumber
+
+from benchmarks.facturas_sinteticas import iter_corpus
+from extraccion import extract_text, parse_invoice_text
+from limpieza_modelos import ModelNameNormalizer
+
+DEFAULT_BASELINE = "benchmarks/baseline_extraccion.json"
+
+
+def _best_time(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        # La basura cíclica que deja pdfminer no debe cobrarse a la etapa
+        # que se está midiendo
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def _peak_memory(fn):
+    # Corrida aparte: tracemalloc hace mucho más lenta la ejecución
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _clean_models(descriptions):
+    # Normalizador nuevo en cada corrida: se mide con la cache en frío
+    normalizer = ModelNameNormalizer()
+    return [normalizer(desc) for desc in descriptions]
+
+
+def measure(layout, pages, pdf_bytes, expected, repeat):
+    text = extract_text(pdf_bytes)
+    n_lines = text.count("\n") + 1
+    _, _, items = parse_invoice_text(text)
+    descriptions = [desc for _, desc in items]
+
+    stages = [
+        ("pdfplumber", lambda: extract_text(pdf_bytes), n_lines),
+        ("parseo", lambda: parse_invoice_text(text), n_lines),
+        ("limpieza", lambda: _clean_models(descriptions), len(descriptions)),
+    ]
+    results = []
+    for stage, fn, n in stages:
+        seconds, _ = _best_time(fn, repeat)
+        results.append({
+            "layout": layout,
+            "paginas": pages,
+            "etapa": stage,
+            "ms": round(seconds * 1000, 3),
+            "ms_por_pagina": round(seconds * 1000 / pages, 3),
+            "lineas_por_seg": round(n / seconds) if seconds else None,
+            "pico_mem_mb": round(_peak_memory(fn) / 1e6, 3),
+            "items": len(items),
+            "esperados": len(expected),
+        })
+    return results
+
+
+def _key(row):
+    return f"{row['layout']}/{row['paginas']}p/{row['etapa']}"
+
+
+def compare(results, baseline, tolerance):
+    """Lista de regresiones (texto) respecto a la línea base."""
+    previous = {_key(row): row for row in baseline["resultados"]}
+    regressions = []
+    for row in results:
+        old = previous.get(_key(row))
+        if old is None:
+            continue
+        for field in ("ms", "pico_mem_mb"):
+            if old[field] and row[field] > old[field] * (1 + tolerance):
+                regressions.append(f"{_key(row)} {field}: {old[field]} -> {row[field]} (+{(row[field] / old[field] - 1) * 100:.0f}%)")
+        if row["items"] != old["items"]:
+            regressions.append(f"{_key(row)} items: {old['items']} -> {row['items']}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50])
+    ap.add_argument("--lines", type=int, default=30, help="filas de items por página")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--guardar", metavar="JSON", nargs="?", const=DEFAULT_BASELINE, help="guardar resultados como línea base")
+    ap.add_argument("--comparar", metavar="JSON", nargs="?", const=DEFAULT_BASELINE, help="comparar contra una línea base")
+    ap.add_argument("--tolerancia", type=float, default=0.25, help="regresión permitida (0.25 = 25%%)")
+    args = ap.parse_args()
+
+    if any(not 1 <= p <= 200 for p in args.pages):
+        ap.error("--pages debe estar entre 1 y 200")
+
+    results = []
+    print(f"{'layout':9} {'pág':>4} {'etapa':11} {'ms':>10} {'ms/pág':>8} {'líneas/s':>10} {'pico MB':>8} {'items':>9}")
+    for layout, pages, pdf_bytes, expected in iter_corpus(args.pages, args.lines, seed=args.seed):
+        for row in measure(layout, pages, pdf_bytes, expected, args.repeat):
+            results.append(row)
+            print(f"{row['layout']:9} {row['paginas']:>4} {row['etapa']:11} {row['ms']:>10.1f} {row['ms_por_pagina']:>8.2f} "
+                  f"{row['lineas_por_seg'] or 0:>10,} {row['pico_mem_mb']:>8.2f} {row['items']:>4}/{row['esperados']:<4}")
+
+    report = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "pdfplumber": pdfplumber.__version__,
+        "parametros": {"pages": args.pages, "lines": args.lines, "repeat": args.repeat, "seed": args.seed},
+        "resultados": results,
+    }
+
+    exit_code = 0
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerancia)
+        if regressions:
+            print(f"\n{len(regressions)} regresiones respecto a {args.comparar}:")
+            for line in regressions:
+                print(f"  {line}")
+            exit_code = 1
+        else:
+            print(f"\nSin regresiones respecto a {args.comparar}")
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print(f"Línea base guardada en {args.guardar}")
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compara el parser de líneas de una pasada con los dos findall anteriores.
+
+Uso:
+    python -m benchmarks.bench_parser [--lines 50000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import time
+
+from parser_lineas import parse_items
+
+# --- Implementación anterior (dos re.findall sobre todo el texto) ---
+LEGACY_STANDARD = r"^(\d+\.\d{2})\s+(.*?)(?=\s+\d{1,3}(?:,?\d{3})*\.\d{2})"
+LEGACY_INVERTED = r"^(.+?)\s+\d{1,3}(?:,?\d{3})*\.\d{2}\s+0\.00\s+\d{1,3}(?:,?\d{3})*\.\d{2}\n\s*(\d+\.\d{2})\s*$"
+
+
+def legacy_parse_items(text):
+    found_items_1 = re.findall(LEGACY_STANDARD, text, re.MULTILINE)
+    found_items_2 = re.findall(LEGACY_INVERTED, text, re.MULTILINE)
+    found_items_2 = [(qty, desc) for desc, qty in found_items_2]
+    return found_items_1 + found_items_2
+
+
+MODELS = [
+    "SAMSUNG GALAXY A15 NEGRO 128GB 5G", "IPHONE 13 MIDNIGHT BLUE 128GB", "MOTO G84 XT2347-2 GRAFITO 256GB",
+    "REDMI NOTE 13 PRO 6.67\"", "TECNO SPARK 20 (GRIS) 8GB 256GB", "ZTE BLADE A54 Z2336 64GB",
+]
+
+
+def synthetic_text(n_lines, layout, seed=0):
+    rnd = random.Random(seed)
+    lines = ["EMPRESA DEMO SRL", "Cliente: DISTRIBUIDORA EJEMPLO", "Dirección: Calle 1", "No Factura F000123"]
+    for _ in range(n_lines):
+        model = rnd.choice(MODELS)
+        qty = rnd.randint(1, 50)
+        price = rnd.randint(50, 1500)
+        total = f"{qty * price:,}.00"
+        if layout == "standard":
+            lines.append(f"{qty}.00 {model} {price:,}.00 0.00 {total}")
+        else:
+            lines.append(f"{model} {price:,}.00 0.00 {total}")
+            lines.append(f"{qty}.00")
+        if rnd.random() < 0.05:
+            lines.append("Página siguiente - continúa")
+    lines.append("Sub-Total 0.00")
+    lines.append("Total 0.00")
+    return "\n".join(lines)
+
+
+def _best_of(fn, text, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--lines", type=int, default=50000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    for layout in ("standard", "inverted"):
+        text = synthetic_text(args.lines, layout)
+        t_legacy, legacy = _best_of(legacy_parse_items, text, args.repeat)
+        t_new, new = _best_of(parse_items, text, args.repeat)
+        print(f"[{layout}] {args.lines} items, {len(text) / 1e6:.1f} MB de texto")
+        print(f"  findall x2 : {t_legacy * 1000:8.1f} ms  ({len(legacy)} items)")
+        print(f"  una pasada : {t_new * 1000:8.1f} ms  ({len(new)} items)")
+        print(f"  speedup    : {t_legacy / t_new:8.2f}x")
+        if len(legacy) != len(new):
+            # En el layout inverted el findall standard empareja cada línea de
+            # cantidad con la descripción siguiente (items duplicados)
+            print(f"  nota       : {len(legacy) - len(new)} items espurios en la versión anterior")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Genera facturas PDF sintéticas (layouts standard e inverted) con ReportLab.
+
+Uso:
+    python -m benchmarks.facturas_sinteticas --out corpus [--pages 1 10 200] [--lines 30]
+"""
+import argparse
+import os
+import random
+from io import BytesIO
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+LAYOUTS = ("standard", "inverted")
+
+# Piezas para armar nombres de modelo con el "ruido" real de las facturas:
+# colores, 5G, códigos de fabricante (SM-/XT-...) y tamaños de pantalla
+BRANDS = [
+    ("SAMSUNG GALAXY", ["A05", "A15", "A25", "A35", "S23", "S24 ULTRA"], ["SM-A155F", "SM-A256E", "SM-S921B"]),
+    ("MOTOROLA MOTO", ["G24", "G54", "G84", "E13"], ["XT2347-2", "XT2421-3", "XT2345-1"]),
+    ("XIAOMI REDMI", ["NOTE 13", "NOTE 13 PRO", "13C", "A3"], ["23129RAA4G", "2311DRK48G"]),
+    ("TECNO", ["SPARK 20", "SPARK 20 PRO", "CAMON 30", "POP 8"], ["KJ5", "BG6"]),
+    ("ZTE BLADE", ["A54", "A35", "V50"], ["Z2336", "Z2357"]),
+    ("IPHONE", ["13", "14", "15", "15 PRO MAX"], []),
+]
+COLORS = ["NEGRO", "AZUL", "MIDNIGHT BLUE", "GRAFITO", "VERDE", "BLANCO", "DESERT GOLD", "LAVANDA", "(GRIS)"]
+CAPACITIES = ["64GB", "128GB", "256GB", "512GB", "1TB"]
+SCREENS = ['6.1"', '6.5"', '6.67"', '6.8"']
+
+# Posiciones de columna (puntos) y alto de fila
+X_QTY = 40
+X_DESC = 80
+X_PRICE = 430
+X_DISCOUNT = 490
+X_TOTAL = 570
+ROW_HEIGHT = 13
+TOP_MARGIN = 60
+BOTTOM_MARGIN = 90
+
+
+def random_model(rnd, noise=True):
+    brand, models, codes = rnd.choice(BRANDS)
+    parts = [brand, rnd.choice(models)]
+    if noise and codes and rnd.random() < 0.4:
+        parts.append(rnd.choice(codes))
+    if noise and rnd.random() < 0.3:
+        parts.append("5G")
+    parts.append(rnd.choice(CAPACITIES))
+    if noise and rnd.random() < 0.6:
+        parts.append(rnd.choice(COLORS))
+    if noise and rnd.random() < 0.15:
+        parts.append(rnd.choice(SCREENS))
+    return " ".join(parts)
+
+
+def _money(value):
+    return f"{value:,.2f}"
+
+
+def generate_invoice(layout="standard", pages=1, lines_per_page=30, noise=True, seed=0):
+    """Devuelve (pdf_bytes, items_esperados) de una factura sintética.
+
+    `items_esperados` es la lista de (cantidad_texto, descripción) en el
+    orden en que aparecen, tal como debería devolverla el parser.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout desconocido: {layout}")
+
+    rnd = random.Random(seed)
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    width, height = letter
+    expected = []
+    subtotal = 0.0
+    factura = f"F{seed:06d}"
+
+    # En el layout inverted cada item ocupa dos filas
+    rows_per_item = 1 if layout == "standard" else 2
+    items_per_page = max(1, lines_per_page // rows_per_item)
+
+    for page_number in range(1, pages + 1):
+        y = height - TOP_MARGIN
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(X_QTY, y, "DISTRIBUIDORA DEMO SRL")
+        y -= 24
+        c.setFont("Helvetica", 9)
+        if page_number == 1:
+            for line in ("Cliente: TIENDA EJEMPLO MOVIL", "Dirección: Av. Principal 123", "Vendedor: CARLOS", f"No Factura {factura}"):
+                c.drawString(X_QTY, y, line)
+                y -= ROW_HEIGHT
+        else:
+            c.drawString(X_QTY, y, f"No Factura {factura} - continuación página {page_number}")
+            y -= ROW_HEIGHT
+        y -= ROW_HEIGHT
+
+        c.setFont("Helvetica", 8)
+        for _ in range(items_per_page):
+            if y < BOTTOM_MARGIN + ROW_HEIGHT * rows_per_item:
+                break
+            model = random_model(rnd, noise)
+            qty = rnd.randint(1, 50)
+            price = rnd.randint(40, 1500) + rnd.choice((0, 0.5, 0.99))
+            total = qty * price
+            subtotal += total
+            qty_text = f"{qty}.00"
+            expected.append((qty_text, model))
+
+            if layout == "standard":
+                c.drawString(X_QTY, y, qty_text)
+                c.drawString(X_DESC, y, model)
+            else:
+                c.drawString(X_QTY, y, model)
+            c.drawRightString(X_PRICE, y, _money(price))
+            c.drawRightString(X_DISCOUNT, y, "0.00")
+            c.drawRightString(X_TOTAL, y, _money(total))
+            y -= ROW_HEIGHT
+            if layout == "inverted":
+                c.drawString(X_QTY, y, qty_text)
+                y -= ROW_HEIGHT
+
+        if page_number == pages:
+            c.setFont("Helvetica-Bold", 9)
+            y -= ROW_HEIGHT
+            c.drawString(X_PRICE - 100, y, "Sub-Total")
+            c.drawRightString(X_TOTAL, y, _money(subtotal))
+            y -= ROW_HEIGHT
+            c.drawString(X_PRICE - 100, y, "Total")
+            c.drawRightString(X_TOTAL, y, _money(subtotal * 1.18))
+
+        # Pie legal (texto que el parser debe ignorar)
+        c.setFont("Helvetica", 6)
+        for i in range(4):
+            c.drawString(X_QTY, 30 + i * 8, f"Condiciones de venta {i + 1}: la mercancía viaja por cuenta y riesgo del comprador.")
+        c.showPage()
+
+    c.save()
+    return buffer.getvalue(), expected
+
+
+def iter_corpus(page_counts=(1, 10, 50), lines_per_page=30, noise=True, seed=0):
+    """Genera (layout, páginas, pdf_bytes, items_esperados) para cada combinación."""
+    for layout in LAYOUTS:
+        for pages in page_counts:
+            pdf_bytes, expected = generate_invoice(layout, pages, lines_per_page, noise, seed)
+            yield layout, pages, pdf_bytes, expected
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--out", default="corpus_facturas")
+    ap.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50])
+    ap.add_argument("--lines", type=int, default=30, help="filas de items por página")
+    ap.add_argument("--sin-ruido", action="store_true", help="nombres de modelo sin colores/códigos")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if any(not 1 <= p <= 200 for p in args.pages):
+        ap.error("--pages debe estar entre 1 y 200")
+
+    os.makedirs(args.out, exist_ok=True)
+    for layout, pages, pdf_bytes, expected in iter_corpus(args.pages, args.lines, not args.sin_ruido, args.seed):
+        path = os.path.join(args.out, f"factura_{layout}_{pages:03d}p.pdf")
+        with open(path, "wb") as f:
+            f.write(pdf_bytes)
+        print(f"{path}: {len(expected)} items, {len(pdf_bytes) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
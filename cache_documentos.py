@@ -0,0 +1,143 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import pandas as pd
+import pdfplumber
+
+# ==========================================
+# CACHE DE DOCUMENTOS GENERADOS
+# ==========================================
+# Los PDF se generan con fecha de creación e ID fijos (DETERMINISTIC_PDF en
+# documentos_pdf), así que las mismas entradas dan exactamente los mismos
+# bytes. La clave es un hash estable de todo lo que entra al documento
+# (tipo, destinatario, factura, items, tema, hash del logo, fecha...): si
+# nada cambió desde el último clic se devuelven los bytes guardados.
+#
+# Los bytes se guardan una sola vez por contenido (el ETag es su SHA-256),
+# aunque varias claves lleven al mismo PDF. El límite es por bytes totales,
+# no por cantidad de documentos: un conduce con miles de IMEIs pesa mucho
+# más que uno simple.
+
+MAX_DOCUMENT_BYTES = 64 * 1024 * 1024  # 64 MB
+
+# Subir este número cuando cambie el diseño de algún documento, para no
+# servir PDFs generados con el diseño viejo.
+DOCUMENT_VERSION = 1
+
+
+def document_key(doc_type, **fields):
+    """Hash estable del tipo de documento y de todo lo que va dentro."""
+    payload = {"tipo": doc_type, "version": DOCUMENT_VERSION, **fields}
+    # default=str cubre los enteros de numpy y las fechas de pandas
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def dataframe_digest(df):
+    """Hash del contenido de un DataFrame (columnas, valores y orden de filas).
+
+    Mucho más barato que serializar `to_dict('records')` en tablas grandes.
+    """
+    h = hashlib.sha256("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def document_etag(pdf_bytes):
+    return f'"{hashlib.sha256(pdf_bytes).hexdigest()}"'
+
+
+class DocumentCache:
+    """LRU de PDFs generados, acotada por bytes y deduplicada por contenido."""
+
+    def __init__(self, max_bytes=MAX_DOCUMENT_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._keys = OrderedDict()  # clave -> etag, en orden de uso
+        self._blobs = {}            # etag -> [bytes, claves que lo usan]
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(bytes, etag) o None."""
+        with self._lock:
+            etag = self._keys.get(key)
+            if etag is None:
+                return None
+            self._keys.move_to_end(key)
+            return self._blobs[etag][0], etag
+
+    def put(self, key, pdf_bytes):
+        etag = document_etag(pdf_bytes)
+        if len(pdf_bytes) > self.max_bytes:
+            return etag
+
+        with self._lock:
+            if key in self._keys:
+                self._release(self._keys.pop(key))
+            blob = self._blobs.get(etag)
+            if blob is None:
+                blob = self._blobs[etag] = [pdf_bytes, 0]
+                self.total_bytes += len(pdf_bytes)
+            blob[1] += 1
+            self._keys[key] = etag
+
+            # Desalojar primero los menos usados recientemente
+            while self.total_bytes > self.max_bytes:
+                _, old_etag = self._keys.popitem(last=False)
+                self._release(old_etag)
+        return etag
+
+    def get_or_render(self, key, render):
+        """(bytes, etag) desde la cache, o llamando a `render()` una vez."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        pdf_bytes = render()
+        return pdf_bytes, self.put(key, pdf_bytes)
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._blobs.clear()
+            self.total_bytes = 0
+
+    def _release(self, etag):
+        blob = self._blobs[etag]
+        blob[1] -= 1
+        if blob[1] == 0:
+            del self._blobs[etag]
+            self.total_bytes -= len(blob[0])
+
+
+# Cache del proceso, compartida por todas las sesiones del servidor
+_document_cache = DocumentCache()
+
+
+def get_document_cache():
+    return _document_cache
+
+
+def render_cached(key, render):
+    """(bytes, etag) del documento con clave `key`; `render()` devuelve los bytes."""
+    return _document_cache.get_or_render(key, render)
+
+
+# ==========================================
+# VISTA PREVIA
+# ==========================================
+# Miniatura PNG de la primera página (unos 20 KB a 72 dpi) para mostrar en
+# la página; el PDF completo solo viaja cuando se pide la descarga.
+PREVIEW_DPI = 72
+
+
+def pdf_preview_png(pdf_bytes, resolution=PREVIEW_DPI):
+    """(PNG de la primera página, número de páginas)."""
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        n_pages = len(pdf.pages)
+        image = pdf.pages[0].to_image(resolution=resolution).original
+    out = BytesIO()
+    image.save(out, "PNG", optimize=True)
+    return out.getvalue(), n_pages
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+# ==========================================
+# CACHE DE EXTRACCIÓN DE FACTURAS
+# ==========================================
+# La clave es el SHA-256 de los bytes del PDF, no el nombre del archivo:
+# dos facturas distintas con el mismo nombre no chocan, y la misma factura
+# subida por otro usuario (o abierta desde la app de escritorio) no se
+# vuelve a procesar.
+#
+# Nivel 1: LRU en memoria (por proceso, compartido por todas las sesiones
+#          del servidor Streamlit).
+# Nivel 2: un JSON por factura en disco, con desalojo por tamaño total.
+
+CACHE_DIR = "cache_facturas"
+MAX_MEMORY_ITEMS = 256
+MAX_DISK_BYTES = 50 * 1024 * 1024  # 50 MB
+
+# Subir este número cuando cambie la lógica de extracción, para que las
+# entradas viejas se ignoren en vez de devolver resultados obsoletos.
+EXTRACTION_VERSION = 3
+
+
+def pdf_sha256(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class ExtractionCache:
+    """Cache de dos niveles para (cliente, factura, items) por hash de PDF."""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_memory_items=MAX_MEMORY_ITEMS, max_disk_bytes=MAX_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, cliente, factura, items):
+        entry = (cliente, factura, [tuple(item) for item in items])
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+
+    # --- Nivel 1: memoria ---
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    # --- Nivel 2: disco ---
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"Cache de extracción corrupta ({path}): {e}")
+            return None
+
+        if payload.get("version") != EXTRACTION_VERSION:
+            return None
+
+        try:
+            os.utime(path)  # Marca de uso reciente para el desalojo
+        except OSError:
+            pass
+        return (payload["cliente"], payload["factura"], [tuple(item) for item in payload["items"]])
+
+    def _write_disk(self, key, entry):
+        cliente, factura, items = entry
+        payload = {"version": EXTRACTION_VERSION, "cliente": cliente, "factura": factura, "items": items}
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            # Escritura atómica: otro proceso nunca ve un JSON a medias
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except Exception as e:
+            logging.error(f"Error guardando cache de extracción: {e}")
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for de in it:
+                if not de.name.endswith(".json"):
+                    continue
+                try:
+                    st_ = de.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st_.st_mtime, st_.st_size, de.path))
+                total += st_.st_size
+
+        if total <= self.max_disk_bytes:
+            return
+
+        # Borrar primero las menos usadas recientemente
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
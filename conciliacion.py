@@ -0,0 +1,62 @@
+from parser_lineas import TOTAL_QTY, SUBTOTAL
+
+# ==========================================
+# CONCILIACIÓN DE FACTURAS
+# ==========================================
+# Comprueba lo que devolvió un parser contra la propia factura: cada fila
+# con importes debe haber dado un item, cantidad x precio - descuento debe
+# dar el total de la línea, y la suma de cantidades / totales de línea debe
+# cuadrar con las líneas de totales cuando la factura las trae. Si algo no
+# cuadra, el parser perdió o emparejó mal alguna línea.
+#
+# Funciona con cualquier parser que exponga items, amount_rows,
+# item_amounts, declared_totals y truncated (InvoiceLineParser,
+# ColumnInvoiceParser).
+
+
+def parse_amount(text):
+    return float(text.replace(",", ""))
+
+
+def _line_matches(qty, price, discount, total):
+    gross = qty * price
+    tolerance = 0.01 * max(1.0, qty)
+    # El descuento puede venir como importe o como porcentaje
+    return abs(gross - discount - total) <= tolerance or abs(gross * (1 - discount / 100) - total) <= tolerance
+
+
+def reconcile(parser):
+    """Lista de discrepancias (en texto) entre items y totales; vacía si cuadra."""
+    if not parser.items:
+        return ["sin items"]
+
+    problems = []
+
+    lost = parser.amount_rows - len(parser.item_amounts)
+    if lost > 0:
+        problems.append(f"{lost} filas con importes sin item")
+
+    if parser.truncated:
+        problems.append(f"{parser.truncated} descripciones cortadas por un número")
+
+    mismatched = 0
+    for qty, price, discount, total in parser.item_amounts:
+        if not _line_matches(parse_amount(qty), parse_amount(price), parse_amount(discount), parse_amount(total)):
+            mismatched += 1
+    if mismatched:
+        problems.append(f"{mismatched} líneas donde cantidad x precio no da el total")
+
+    declared = parser.declared_totals
+    if TOTAL_QTY in declared:
+        qty_sum = sum(parse_amount(qty) for qty, _ in parser.items)
+        if abs(qty_sum - parse_amount(declared[TOTAL_QTY])) > 0.005:
+            problems.append(f"cantidades suman {qty_sum:.2f}, la factura dice {declared[TOTAL_QTY]}")
+
+    # Solo si todos los items trajeron importes; el "Total" suele incluir
+    # impuestos, así que se compara contra el subtotal
+    if SUBTOTAL in declared and parser.item_amounts and len(parser.item_amounts) == len(parser.items):
+        lines_sum = sum(parse_amount(row[3]) for row in parser.item_amounts)
+        if abs(lines_sum - parse_amount(declared[SUBTOTAL])) > 0.01 * len(parser.item_amounts):
+            problems.append(f"totales de línea suman {lines_sum:,.2f}, el subtotal es {declared[SUBTOTAL]}")
+
+    return problems
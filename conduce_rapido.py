@@ -0,0 +1,278 @@
+import logging
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from documentos_pdf import is_light_color, load_logo, conduce_model, DETERMINISTIC_PDF, CONDUCE_NOTE, SIGNATURE_LABELS, CHECKBOX
+
+# ==========================================
+# CONDUCE RÁPIDO (canvas directo)
+# ==========================================
+# El conduce simple tiene un layout fijo, así que este render no arma
+# flowables ni pasa por el layout de platypus: dibuja con el canvas.
+#
+# - Lo que solo depende del tema y del logo se prepara una vez por proceso
+#   en ConduceTemplate: colores, geometría, la nota legal partida en líneas
+#   y el logo ya reducido en un ImageReader.
+# - Dentro de cada PDF las partes fijas (cabecera, cabecera de la tabla,
+#   nota y firmas) se dibujan una sola vez como Form XObjects y cada página
+#   y cada copia (ORIGINAL / COPIA) solo las referencia.
+# - Por documento solo se dibujan los datos: fecha, factura, cliente y las
+#   filas de la tabla.
+#
+# Un Form XObject no se puede compartir entre PDFs (los nombres de fuentes
+# se asignan por documento), por eso la cache entre documentos guarda la
+# plantilla y el logo, no el form ya dibujado.
+
+COPIES_ORIGINAL_COPY = ("ORIGINAL", "COPIA")
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+MARGIN_X = 0.4 * inch
+MARGIN_Y = 0.3 * inch
+COL_WIDTHS = (0.8 * inch, 6.1 * inch, 0.8 * inch)  # CANT, DESCRIPCIÓN, VERIF.
+TABLE_WIDTH = sum(COL_WIDTHS)
+CELL_PADDING_X = 6
+CELL_PADDING_Y = 3
+
+HEADER_HEIGHT = 0.8 * inch + 2 * CELL_PADDING_Y
+INFO_ROW_HEIGHT = 13
+TABLE_HEADER_HEIGHT = 18
+ROW_FONT = ("Helvetica", 10)
+ROW_LEADING = 11
+TITLE_COLOR = colors.HexColor("#2C3E50")
+INFO_COLOR = colors.HexColor("#34495E")
+
+NOTE_LINES = [("Helvetica-Bold", "Nota Importante:"), ("Helvetica", CONDUCE_NOTE)]
+NOTE_LEADING = 8
+
+MAX_TEMPLATES = 16
+
+
+class ConduceTemplate:
+    """Partes fijas del conduce para un (color de acento, logo)."""
+
+    def __init__(self, accent_hex, logo=None):
+        self.accent = colors.HexColor(accent_hex)
+        self.header_text_color = colors.black if is_light_color(accent_hex) else colors.white
+
+        # Geometría (y de arriba hacia abajo)
+        top = PAGE_HEIGHT - MARGIN_Y
+        self.header_bottom = top - HEADER_HEIGHT
+        self.info_top = self.header_bottom - 0.1 * inch
+        self.table_top = self.info_top - 2 * INFO_ROW_HEIGHT - 0.1 * inch
+        self.body_top = self.table_top - TABLE_HEADER_HEIGHT
+        self.footer_height = 0.2 * inch + len(NOTE_LINES) * NOTE_LEADING + 0.3 * inch + 2 * 14
+
+        # Logo ya reducido (documentos_pdf.load_logo); el ImageReader guarda
+        # los píxeles decodificados entre documentos
+        self.logo_reader = None
+        if logo is not None:
+            _, data, self.logo_width, self.logo_height = logo
+            self.logo_reader = ImageReader(BytesIO(data))
+
+    # --- Forms por documento ---
+
+    def build_forms(self, c, title):
+        """Dibuja en `c` los forms "cabecera", "tabla" y "pie"."""
+        x0 = MARGIN_X
+        x1 = MARGIN_X + TABLE_WIDTH
+
+        # Cabecera: logo, título y la línea del tema bajo la fila de fecha
+        c.beginForm("cabecera")
+        if self.logo_reader is not None:
+            # Dentro del form: el PDF lleva la imagen una sola vez
+            logo_x = x0 + 0.1 * inch + CELL_PADDING_X
+            logo_y = self.header_bottom + (HEADER_HEIGHT - self.logo_height) / 2
+            c.drawImage(self.logo_reader, logo_x, logo_y, self.logo_width, self.logo_height, mask='auto')
+        c.setFillColor(TITLE_COLOR)
+        c.setFont("Helvetica-Bold", 18)
+        c.drawRightString(x1 - 0.1 * inch - CELL_PADDING_X, self.header_bottom + HEADER_HEIGHT / 2 - 6, title)
+        c.setStrokeColor(self.accent)
+        c.setLineWidth(1)
+        c.line(x0, self.info_top - INFO_ROW_HEIGHT, x1, self.info_top - INFO_ROW_HEIGHT)
+        c.endForm()
+
+        # Cabecera de la tabla (se repite en cada página con filas)
+        c.beginForm("tabla")
+        c.setFillColor(self.accent)
+        c.rect(x0, self.body_top, TABLE_WIDTH, TABLE_HEADER_HEIGHT, stroke=0, fill=1)
+        c.setFillColor(self.header_text_color)
+        c.setFont("Helvetica", 10)
+        baseline = self.body_top + (TABLE_HEADER_HEIGHT - 10) / 2 + 2
+        c.drawString(x0 + CELL_PADDING_X, baseline, "CANT")
+        c.drawString(x0 + COL_WIDTHS[0] + CELL_PADDING_X, baseline, "DESCRIPCIÓN DEL MODELO / EQUIPO")
+        c.drawCentredString(x1 - COL_WIDTHS[2] / 2, baseline, "VERIF.")
+        c.endForm()
+
+        # Pie: nota legal y firmas, dibujado con su borde superior en y=0
+        c.beginForm("pie", lowery=-self.footer_height, uppery=0)
+        c.setFillColor(colors.black)
+        y = -0.2 * inch
+        for font, line in NOTE_LINES:
+            y -= NOTE_LEADING
+            c.setFont(font, 7)
+            c.drawString(x0, y, line)
+        y -= 0.3 * inch + 12
+        c.setFont("Helvetica", 10)
+        for text_y, labels in ((y, ("_______________________",) * 2), (y - 14, SIGNATURE_LABELS)):
+            for i, label in enumerate(labels):
+                c.drawCentredString(x0 + 0.1 * inch + (i + 0.5) * 3.75 * inch, text_y, label)
+        c.endForm()
+
+
+_templates = OrderedDict()
+_templates_lock = threading.Lock()
+
+
+def get_conduce_template(accent_hex, logo_source=None):
+    """Plantilla cacheada para el tema y el logo (por hash de su contenido)."""
+    logo = None
+    if logo_source:
+        try:
+            logo = load_logo(logo_source)
+        except Exception as e:
+            logging.warning(f"Error cargando logo: {e}")
+
+    key = (accent_hex, logo[0] if logo else None)
+    with _templates_lock:
+        template = _templates.get(key)
+        if template is not None:
+            _templates.move_to_end(key)
+            return template
+
+    template = ConduceTemplate(accent_hex, logo)
+    with _templates_lock:
+        _templates[key] = template
+        while len(_templates) > MAX_TEMPLATES:
+            _templates.popitem(last=False)
+    return template
+
+
+# --- Datos ---
+
+def _table_rows(model_rows):
+    """[(cantidad, líneas de la descripción, alto de fila)] de las filas del modelo."""
+    font, size = ROW_FONT
+    desc_width = COL_WIDTHS[1] - 2 * CELL_PADDING_X
+    rows = []
+    for qty, modelo in model_rows:
+        lines = simpleSplit(modelo, font, size, desc_width) or [""]
+        rows.append((qty, lines, len(lines) * ROW_LEADING + 2 * CELL_PADDING_Y))
+    return rows
+
+
+def paginate(rows, template, total_height):
+    """Reparte las filas en páginas: lista de (inicio, fin) por página.
+
+    La última página debe tener lugar para el total y el pie; si no lo
+    tiene se agrega una página sin filas.
+    """
+    pages = []
+    start = 0
+    y = template.body_top
+    for i, (_, _, height) in enumerate(rows):
+        if y - height < MARGIN_Y and i > start:
+            pages.append((start, i))
+            start = i
+            y = template.body_top
+        y -= height
+    pages.append((start, len(rows)))
+    if y - total_height - template.footer_height < MARGIN_Y:
+        pages.append((len(rows), len(rows)))
+    return pages
+
+
+def _draw_rows(c, rows, top):
+    """Filas de la tabla desde `top` hacia abajo; devuelve el y final."""
+    font, size = ROW_FONT
+    x0 = MARGIN_X
+    x_desc = x0 + COL_WIDTHS[0]
+    x_check = x_desc + COL_WIDTHS[1]
+    x1 = x0 + TABLE_WIDTH
+
+    text = c.beginText()
+    text.setFont(font, size, ROW_LEADING)
+    rules = []
+    y = top
+    for qty, lines, height in rows:
+        middle = y - height / 2 - size * 0.35
+        text.setTextOrigin(x0 + (COL_WIDTHS[0] - stringWidth(qty, font, size)) / 2, middle)
+        text.textOut(qty)
+        text.setTextOrigin(x_desc + CELL_PADDING_X, y - CELL_PADDING_Y - size + 1)
+        text.textLines(lines)
+        text.setTextOrigin(x_check + (COL_WIDTHS[2] - stringWidth(CHECKBOX, font, size)) / 2, middle)
+        text.textOut(CHECKBOX)
+        y -= height
+        rules.append((x0, y, x1, y))
+    c.setFillColor(colors.black)
+    c.drawText(text)
+
+    # Grilla: verticales de todo el bloque + una línea bajo cada fila
+    rules.append((x0, top, x1, top))
+    for x in (x0, x_desc, x_check, x1):
+        rules.append((x, top + TABLE_HEADER_HEIGHT, x, y))
+    rules.append((x0, top + TABLE_HEADER_HEIGHT, x1, top + TABLE_HEADER_HEIGHT))
+    c.setStrokeColor(colors.grey)
+    c.setLineWidth(0.5)
+    c.lines(rules)
+    return y
+
+
+def generate_conduce_fast(destinatario, factura, logo_source, data_df, accent_hex, show_total, copies=None, date_str=None):
+    """Conduce simple dibujado directo con el canvas (ver generate_conduce_pdf).
+
+    `copies` es una lista de rótulos ("ORIGINAL", "COPIA"...): el documento
+    se repite una vez por rótulo reusando los mismos forms.
+    """
+    template = get_conduce_template(accent_hex, logo_source)
+    model = conduce_model(destinatario, factura, data_df, show_total, date_str)
+    rows = _table_rows(model.rows)
+    total_height = 0.05 * inch + 13 if show_total else 0
+    pages = paginate(rows, template, total_height)
+    info = (f"FECHA: {model.date}", f"FACTURA N°: {model.factura}", f"CLIENTE: {model.cliente}")
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter, invariant=DETERMINISTIC_PDF)
+    template.build_forms(c, model.title)
+
+    for label in copies or [None]:
+        for page_number, (start, end) in enumerate(pages, 1):
+            c.doForm("cabecera")
+            c.setFillColor(INFO_COLOR)
+            c.setFont("Helvetica-Bold", 9)
+            c.drawString(MARGIN_X + CELL_PADDING_X, template.info_top - INFO_ROW_HEIGHT + 3, info[0])
+            c.drawString(MARGIN_X + 5.2 * inch + CELL_PADDING_X, template.info_top - INFO_ROW_HEIGHT + 3, info[1])
+            c.drawString(MARGIN_X + CELL_PADDING_X, template.info_top - 2 * INFO_ROW_HEIGHT + 3, info[2])
+            if label or len(pages) > 1:
+                c.setFillColor(colors.grey)
+                c.setFont("Helvetica", 8)
+                footer = f"{label or ''}  {page_number}/{len(pages)}" if len(pages) > 1 else label
+                c.drawRightString(MARGIN_X + TABLE_WIDTH, MARGIN_Y / 2, footer.strip())
+
+            y = template.table_top
+            if end > start or page_number == 1:
+                c.doForm("tabla")
+                y = _draw_rows(c, rows[start:end], template.body_top)
+
+            if page_number == len(pages):
+                if show_total:
+                    y -= total_height
+                    c.setFillColor(colors.black)
+                    c.setFont("Helvetica-Bold", 11)
+                    c.drawRightString(MARGIN_X + TABLE_WIDTH - CELL_PADDING_X, y + 2, f"TOTAL UNIDADES: {model.total}")
+                c.saveState()
+                c.translate(0, y)
+                c.doForm("pie")
+                c.restoreState()
+            c.showPage()
+
+    c.save()
+    buffer.seek(0)
+    return buffer
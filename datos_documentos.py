@@ -0,0 +1,84 @@
+import json
+
+import pandas as pd
+
+from conduce_rapido import generate_conduce_fast
+from documentos_pdf import generate_conduce_pdf, generate_conduce_imeis_pdf, generate_garantia_pdf, today_str, DEFAULT_ACCENT, IMEI_LAYOUT_TEXT
+from extraccion import extract_invoice, STRATEGY_AUTO
+from limpieza_modelos import DEFAULT_COLORS_TO_REMOVE, ModelNameNormalizer
+
+# ==========================================
+# DATOS DE LOS DOCUMENTOS (compartido)
+# ==========================================
+# De factura PDF (o archivo de items) a la tabla Cantidad / Modelo que usan
+# los generadores. Sin Streamlit ni tkinter: lo usan app.py y la línea de
+# comandos (generar_documentos) y el servicio HTTP (servicio_documentos).
+
+DOC_CONDUCE = "conduce"
+DOC_CONDUCE_IMEIS = "conduce_imeis"
+DOC_GARANTIA = "garantia"
+DOC_TYPES = (DOC_CONDUCE, DOC_CONDUCE_IMEIS, DOC_GARANTIA)
+
+# Normalizador compilado una vez por proceso (compartido por todas las sesiones)
+_model_normalizer = ModelNameNormalizer(DEFAULT_COLORS_TO_REMOVE)
+
+
+def items_to_conduce_df(found_items):
+    df = pd.DataFrame(found_items, columns=['Cantidad', 'Modelo'])
+    if not df.empty:
+        df['Cantidad'] = pd.to_numeric(df['Cantidad']).astype(int)
+        df['Modelo'] = _model_normalizer.normalize_series(df['Modelo'])
+        df = df[df['Modelo'] != ""]
+        df = df.groupby('Modelo', as_index=False)['Cantidad'].sum()
+    return df
+
+
+def extract_conduce_info(pdf_file, strategy=STRATEGY_AUTO):
+    # Cache compartida por SHA-256 del PDF (memoria + disco)
+    cliente, factura, found_items = extract_invoice(pdf_file, strategy=strategy)
+    return cliente, factura, items_to_conduce_df(found_items)
+
+
+def read_items_file(path):
+    """(destinatario, factura, DataFrame) de un archivo de items JSON o CSV.
+
+    El JSON puede ser una sesión guardada por la app ({"destinatario",
+    "factura", "items": [...]}) o directamente la lista de items. El CSV
+    lleva las columnas de la tabla (Cantidad, Modelo y opcionalmente IMEIs).
+    """
+    if path.lower().endswith(".csv"):
+        return "", "", pd.read_csv(path, dtype={'IMEIs': str, 'IMEIs/Coment': str}, keep_default_na=False)
+
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if isinstance(payload, list):
+        return "", "", pd.DataFrame(payload)
+    if not isinstance(payload, dict) or not isinstance(payload.get('items'), list):
+        raise ValueError("se esperaba una lista de items o un objeto con 'items'")
+    return payload.get('destinatario', ''), payload.get('factura', ''), pd.DataFrame(payload['items'])
+
+
+def adapt_columns(df, doc_type):
+    """Copia de `df` con las columnas que espera el documento; las que falten van vacías."""
+    df = df.copy()
+    if doc_type == DOC_CONDUCE_IMEIS and 'IMEIs' not in df.columns:
+        df['IMEIs'] = ""
+    if doc_type == DOC_GARANTIA and 'IMEIs/Coment' not in df.columns:
+        df['IMEIs/Coment'] = df['IMEIs'] if 'IMEIs' in df.columns else ""
+    missing = {'Cantidad', 'Modelo'} - set(df.columns)
+    if missing:
+        raise ValueError(f"faltan columnas: {', '.join(sorted(missing))}")
+    return df
+
+
+def render_document(doc_type, destinatario, factura, df, accent_hex=DEFAULT_ACCENT, logo=None, date_str=None,
+                    imei_layout=IMEI_LAYOUT_TEXT, store="", fast=False, copies=None):
+    """Bytes del PDF del tipo pedido; `df` ya pasó por adapt_columns."""
+    date_str = date_str or today_str()
+    if doc_type == DOC_GARANTIA:
+        return generate_garantia_pdf(store, date_str, df, logo).getvalue()
+    if doc_type == DOC_CONDUCE_IMEIS:
+        return generate_conduce_imeis_pdf(destinatario, factura, logo, df, accent_hex, imei_layout, date_str=date_str).getvalue()
+    if fast:
+        return generate_conduce_fast(destinatario, factura, logo, df, accent_hex, True, copies, date_str).getvalue()
+    return generate_conduce_pdf(destinatario, factura, logo, df, accent_hex, True, date_str=date_str).getvalue()
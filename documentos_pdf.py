@@ -0,0 +1,657 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from types import SimpleNamespace
+
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, Image
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from PIL import Image as PILImage
+
+# ==========================================
+# DOCUMENTOS PDF DE LA APP WEB
+# ==========================================
+# Generadores de conduce, conduce con IMEIs y recibo de garantía. No
+# dependen de Streamlit, así que se pueden usar desde benchmarks y
+# scripts sin levantar la interfaz.
+
+# Listas largas de IMEIs: en vez de un solo Paragraph por modelo (una celda
+# más alta que la página -> LayoutError) cada modelo se parte en filas de
+# tamaño fijo dentro de un LongTable, que sí puede cortarse entre filas.
+IMEIS_PER_ROW = 42       # IMEIs por fila en los conduces (~6 líneas a 8pt)
+LINES_PER_ROW = 12       # líneas (IMEI / comentario) por fila en la garantía
+
+# Formatos de la sección de IMEIs: texto corrido o grilla compacta de
+# columnas monoespaciadas (mucho menos papel en pedidos grandes)
+IMEI_LAYOUT_TEXT = "texto"
+IMEI_LAYOUT_GRID = "grilla"
+GRID_FONT = "Courier"
+GRID_FONT_SIZE = 6.5
+GRID_LEADING = 7.5
+GRID_LINES_PER_ROW = 10  # líneas por fila de la grilla (cada fila es partible)
+GRID_GAP = 2             # espacios entre columnas
+
+DEFAULT_ACCENT = "#BDE5F8"
+PDF_THEMES = {
+    "Azul Clásico": "#BDE5F8",
+    "Verde Menta": "#C1E1C1",
+    "Gris Elegante": "#E0E0E0",
+    "Rojo Suave": "#FADBD8",
+    "Dorado": "#F9E79F"
+}
+
+# Fecha de creación e ID fijos en el PDF: las mismas entradas dan los mismos
+# bytes, y el resultado se puede cachear y servir con ETag (cache_documentos)
+DETERMINISTIC_PDF = 1
+
+# Hoja de estilos base (una por proceso; los estilos no se modifican al usarlos)
+_BASE_STYLES = getSampleStyleSheet()
+_STYLE_IMEIS = ParagraphStyle('Imeis', parent=_BASE_STYLES['Normal'], fontSize=8, leading=10)
+_STYLE_IMEI_MODEL = ParagraphStyle('ImeiModel', parent=_BASE_STYLES['Normal'], fontSize=8, leading=10)
+
+_IMEI_SEPARATORS = re.compile(r"[\s,;]+")
+_LINE_SEPARATORS = re.compile(r"[,\n]")
+
+
+def today_str():
+    return datetime.now().strftime('%d/%m/%Y')
+
+
+def _is_blank(value):
+    return value is None or value != value  # None o NaN de pandas
+
+
+def split_imeis(value):
+    """IMEIs/seriales de un texto pegado (separados por espacios, comas o saltos de línea)."""
+    if _is_blank(value):
+        return []
+    return [token for token in _IMEI_SEPARATORS.split(str(value)) if token]
+
+
+def split_lines(value):
+    """Líneas de un texto separado por comas o saltos de línea (IMEIs o comentarios)."""
+    if _is_blank(value):
+        return []
+    return [line.strip() for line in _LINE_SEPARATORS.split(str(value)) if line.strip()]
+
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def block_styles(blocks, line_width, line_color, padding=3):
+    """Comandos de TableStyle para que cada bloque de filas (start, end) se vea
+    como una sola celda: padding solo en los extremos y línea debajo del final.
+    """
+    commands = []
+    for start, end in blocks:
+        commands.append(('TOPPADDING', (0, start), (-1, start), padding))
+        commands.append(('BOTTOMPADDING', (0, end), (-1, end), padding))
+        commands.append(('LINEBELOW', (0, end), (-1, end), line_width, line_color))
+    return commands
+
+
+def _imei_text_rows(sections, rows, blocks):
+    for modelo, imeis in sections:
+        start = len(rows)
+        for i, chunk in enumerate(chunked(imeis, IMEIS_PER_ROW)):
+            prefix = f"<b>{modelo}:</b> " if i == 0 else ""
+            rows.append([Paragraph(prefix + ", ".join(chunk), _STYLE_IMEIS)])
+        blocks.append((start, len(rows) - 1))
+
+
+def grid_columns(width, imei_len=15):
+    """Cuántas columnas de `imei_len` caracteres monoespaciados caben en `width` puntos."""
+    chars = int(width // stringWidth("0", GRID_FONT, GRID_FONT_SIZE))
+    return max(1, (chars + GRID_GAP) // (imei_len + GRID_GAP))
+
+
+def grid_lines(imeis, n_cols, imei_len):
+    """Líneas de texto de una grilla de IMEIs, leídos columna por columna.
+
+    Con fuente monoespaciada cada línea de la grilla es un solo string
+    (IMEIs rellenados a ancho fijo), así ReportLab dibuja una cadena por
+    línea en vez de un objeto por IMEI.
+    """
+    gap = " " * GRID_GAP
+    band = GRID_LINES_PER_ROW * n_cols
+    bands = []
+    for offset in range(0, len(imeis), band):
+        chunk = imeis[offset:offset + band]
+        n_lines = min(GRID_LINES_PER_ROW, -(-len(chunk) // n_cols))
+        columns = [chunk[c * n_lines:(c + 1) * n_lines] for c in range(n_cols)]
+        lines = [gap.join(col[r].ljust(imei_len) for col in columns if r < len(col)).rstrip() for r in range(n_lines)]
+        bands.append("\n".join(lines))
+    return bands
+
+
+def grid_bands(imeis, width):
+    """Bandas de grid_lines para los IMEIs de un modelo en `width` puntos."""
+    imei_len = max(len(imei) for imei in imeis)
+    return grid_lines(imeis, grid_columns(width, imei_len), imei_len)
+
+
+def _imei_grid_rows(sections, width, rows, blocks, commands):
+    for modelo, imeis in sections:
+        start = len(rows)
+        rows.append([Paragraph(f"<b>{modelo}</b> ({len(imeis)})", _STYLE_IMEI_MODEL)])
+        commands.append(('BACKGROUND', (0, start), (0, start), colors.whitesmoke))
+        for band in grid_bands(imeis, width):
+            rows.append([band])
+        commands.append(('FONTNAME', (0, start + 1), (0, len(rows) - 1), GRID_FONT))
+        commands.append(('FONTSIZE', (0, start + 1), (0, len(rows) - 1), GRID_FONT_SIZE))
+        commands.append(('LEADING', (0, start + 1), (0, len(rows) - 1), GRID_LEADING))
+        blocks.append((start, len(rows) - 1))
+
+
+def imei_section_table(sections, width, title, title_bg, line_width, line_color, layout=IMEI_LAYOUT_TEXT):
+    """LongTable de la sección de IMEIs.
+
+    `sections` es una lista de (modelo, [imeis]). El título va como fila de
+    cabecera (se repite en cada página) y cada modelo ocupa un bloque de
+    filas de tamaño fijo, así la tabla se parte entre páginas. En modo
+    grilla los IMEIs van en columnas monoespaciadas.
+    """
+    rows = [[title]]
+    blocks = []
+    commands = [
+        ('BACKGROUND', (0,0), (-1,0), title_bg),
+        ('ALIGN', (0,0), (-1,0), 'CENTER'),
+        ('BOX', (0,0), (-1,-1), line_width, line_color),
+        ('LINEBELOW', (0,0), (-1,0), line_width, line_color),
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('TOPPADDING', (0,1), (-1,-1), 0),
+        ('BOTTOMPADDING', (0,1), (-1,-1), 0),
+    ]
+    if layout == IMEI_LAYOUT_GRID:
+        # Ancho útil de la celda (LEFTPADDING/RIGHTPADDING por defecto: 6)
+        _imei_grid_rows(sections, width - 12, rows, blocks, commands)
+    else:
+        _imei_text_rows(sections, rows, blocks)
+
+    table = LongTable(rows, colWidths=[width], repeatRows=1)
+    table.setStyle(TableStyle(commands + block_styles(blocks, line_width, line_color)))
+    return table
+
+
+def is_light_color(hex_color):
+    h = hex_color.lstrip('#')
+    try:
+        rgb = tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
+        brightness = (rgb[0] * 299 + rgb[1] * 587 + rgb[2] * 114) / 1000
+        return brightness > 125
+    except: return True
+
+# ==========================================
+# CACHE DE LOGOS
+# ==========================================
+# El logo se decodifica y se reduce una sola vez por contenido: la clave es
+# el SHA-256 de sus bytes más la caja de impresión, y se guarda una copia
+# reducida a LOGO_DPI dentro de esa caja. Cada render solo envuelve esos
+# bytes en un Image, y el PDF lleva la copia pequeña en vez del archivo
+# original (que puede pesar varios MB).
+
+LOGO_MAX_WIDTH = 1.5 * inch
+LOGO_MAX_HEIGHT = 0.8 * inch
+LOGO_DPI = 300
+MAX_LOGOS = 16
+
+
+def prepare_logo(content, max_width=LOGO_MAX_WIDTH, max_height=LOGO_MAX_HEIGHT):
+    """(bytes de imagen, ancho, alto) del logo ajustado a la caja, en puntos.
+
+    Sin `max_height` solo se limita el ancho. Si la imagen ya es más chica
+    que la caja a LOGO_DPI se devuelven los bytes originales.
+    """
+    with PILImage.open(BytesIO(content)) as img:
+        iw, ih = img.size
+        aspect = ih / float(iw)
+        width = max_width
+        height = width * aspect
+        if max_height and height > max_height:
+            height = max_height
+            width = height / aspect
+
+        target = (max(1, round(width / 72 * LOGO_DPI)), max(1, round(height / 72 * LOGO_DPI)))
+        if target[0] >= iw:
+            return content, width, height
+
+        fmt = img.format
+        img = img.resize(target, PILImage.LANCZOS)
+        out = BytesIO()
+        if fmt == "JPEG" and img.mode in ("RGB", "L", "CMYK"):
+            # ReportLab embebe los JPEG tal cual, sin recomprimir
+            img.save(out, "JPEG", quality=90)
+        else:
+            img.save(out, "PNG", optimize=True)
+        return out.getvalue(), width, height
+
+
+class LogoCache:
+    """Logos ya reducidos, por hash del contenido y caja de impresión."""
+
+    def __init__(self, max_items=MAX_LOGOS):
+        self.max_items = max_items
+        self._logos = OrderedDict()
+        self._paths = {}  # (ruta, mtime, tamaño) -> hash, para no releer el archivo
+        self._lock = threading.Lock()
+
+    def get(self, logo_source, max_width=LOGO_MAX_WIDTH, max_height=LOGO_MAX_HEIGHT):
+        digest, content = self._digest(logo_source)
+        key = (digest, max_width, max_height)
+        with self._lock:
+            if key in self._logos:
+                self._logos.move_to_end(key)
+                return self._logos[key]
+
+        if content is None:
+            with open(logo_source, "rb") as f:
+                content = f.read()
+        entry = (digest,) + prepare_logo(content, max_width, max_height)
+
+        with self._lock:
+            self._logos[key] = entry
+            while len(self._logos) > self.max_items:
+                self._logos.popitem(last=False)
+        return entry
+
+    def _digest(self, logo_source):
+        """(hash, contenido); el contenido es None si la ruta ya se conocía."""
+        if isinstance(logo_source, str): # Ruta archivo
+            st_ = os.stat(logo_source)
+            path_key = (logo_source, st_.st_mtime_ns, st_.st_size)
+            digest = self._paths.get(path_key)
+            if digest is not None:
+                return digest, None
+            with open(logo_source, "rb") as f:
+                content = f.read()
+            digest = hashlib.sha256(content).hexdigest()
+            with self._lock:
+                if len(self._paths) >= self.max_items:
+                    self._paths.clear()
+                self._paths[path_key] = digest
+            return digest, content
+
+        if isinstance(logo_source, bytes):
+            content = logo_source
+        else: # UploadedFile
+            content = logo_source.read()
+            logo_source.seek(0) # Reset
+        return hashlib.sha256(content).hexdigest(), content
+
+
+_logo_cache = LogoCache()
+
+
+def load_logo(logo_source, max_width=LOGO_MAX_WIDTH, max_height=LOGO_MAX_HEIGHT):
+    """(hash, bytes de imagen, ancho, alto) del logo reducido, desde la cache."""
+    return _logo_cache.get(logo_source, max_width, max_height)
+
+
+def logo_image(logo_source, max_width=LOGO_MAX_WIDTH, max_height=LOGO_MAX_HEIGHT, **kwargs):
+    """Image de ReportLab con la copia cacheada y reducida del logo."""
+    _, data, width, height = load_logo(logo_source, max_width, max_height)
+    return Image(BytesIO(data), width=width, height=height, **kwargs)
+
+
+def logo_digest(logo_source):
+    """Hash del logo para claves de cache, o None si no hay logo legible."""
+    if not logo_source:
+        return None
+    try:
+        return load_logo(logo_source)[0]
+    except Exception:
+        return None
+
+
+def get_logo_image_reader(logo_source):
+    """Logo para la cabecera, o un párrafo vacío si no hay logo o no se puede leer."""
+    if not logo_source:
+        return Paragraph("", _BASE_STYLES["Normal"])
+    try:
+        return logo_image(logo_source)
+    except Exception as e:
+        logging.warning(f"Error cargando logo: {e}")
+    return Paragraph("", _BASE_STYLES["Normal"])
+
+
+# ==========================================
+# REGISTRO DE ESTILOS
+# ==========================================
+# ParagraphStyles y TableStyles fijos de los tres documentos, armados una
+# sola vez por color de acento en vez de en cada render. Las partes que
+# dependen de los datos (bloques de IMEIs) se agregan con TableStyle(...,
+# parent=...).
+
+def build_document_styles(accent_hex):
+    """Estilos de párrafo y de tabla de los documentos para un color de acento."""
+    styles = _BASE_STYLES
+    accent = colors.HexColor(accent_hex)
+    normal = styles['Normal']
+    return SimpleNamespace(
+        accent=accent,
+        normal=normal,
+        # Párrafos
+        title=ParagraphStyle('TitleCustom', parent=styles['Heading1'], alignment=2, fontSize=18, spaceAfter=5, textColor=colors.HexColor("#2C3E50")),
+        row=ParagraphStyle('Row', parent=normal, fontSize=10, leading=11),
+        total=ParagraphStyle('Tot', parent=normal, alignment=2, fontSize=11, fontName='Helvetica-Bold'),
+        legal=ParagraphStyle('Legal', fontSize=7, leading=8),
+        note=ParagraphStyle('Note', parent=normal, fontSize=7),
+        h2_center=ParagraphStyle('H2Center', parent=normal, fontSize=10, alignment=1, textColor=colors.black),
+        address=ParagraphStyle('Right', parent=normal, alignment=0, leading=14, fontSize=10),
+        garantia_title=ParagraphStyle('TitleG', parent=styles['Heading1'], fontSize=24, textColor=colors.navy, spaceAfter=2),
+        garantia_date=ParagraphStyle('Date', parent=normal, fontSize=12, textColor=colors.deeppink, fontName='Helvetica-Bold'),
+        garantia_store=ParagraphStyle('Store', parent=normal, fontSize=12, fontName='Helvetica-Bold', spaceAfter=10),
+        garantia_item=ParagraphStyle('I', parent=normal, fontSize=12),
+        garantia_lines=ParagraphStyle('ILines', parent=normal, fontSize=10, textColor=colors.grey),
+        terms=ParagraphStyle('Terms', fontSize=8),
+        sign_line=ParagraphStyle('L', alignment=1),
+        sign_label=ParagraphStyle('S', alignment=1, textColor=colors.deeppink),
+        # Tablas
+        header_table=TableStyle([('VALIGN', (0,0), (-1,-1), 'MIDDLE')]),
+        info_table=TableStyle([
+            ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,-1), 9),
+            ('TEXTCOLOR', (0,0), (-1,-1), colors.HexColor("#34495E")),
+            ('LINEBELOW', (0,0), (-1,0), 1, accent),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 2),
+        ]),
+        conduce_table=TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), accent),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.black if is_light_color(accent_hex) else colors.white),
+            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+            ('ALIGN', (0,1), (0,-1), 'CENTER'),
+            ('ALIGN', (2,0), (-1,-1), 'CENTER'),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,0), 9),
+            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+        ]),
+        title_goods_table=TableStyle([
+            ('BACKGROUND', (0,0), (-1,-1), accent),
+            ('BOX', (0,0), (-1,-1), 0.5, colors.grey),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ]),
+        products_table=TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+            ('ALIGN', (0,0), (-1,0), 'CENTER'),
+            ('ALIGN', (0,1), (0,-1), 'CENTER'),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,0), 9),
+        ]),
+        garantia_header_table=TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP'), ('ALIGN', (1,0), (1,0), 'RIGHT')]),
+        garantia_items_table=TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+            ('BOX', (0,0), (-1,-1), 1, colors.black),
+            ('LINEAFTER', (0,0), (0,-1), 1, colors.black),
+            ('LINEBELOW', (0,0), (-1,0), 1, colors.black),
+            ('ALIGN', (0,0), (0,-1), 'CENTER'),
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('TOPPADDING', (0,1), (-1,-2), 0),
+            ('BOTTOMPADDING', (0,1), (-1,-2), 0),
+        ]),
+        signatures_table=TableStyle([('ALIGN', (0,0), (-1,-1), 'CENTER')]),
+    )
+
+
+# ==========================================
+# MODELO DE DOCUMENTOS
+# ==========================================
+# Contenido ya resuelto de cada documento: textos, filas ordenadas, total
+# y secciones de IMEIs. Los PDF (platypus y conduce_rapido) y la vista
+# previa HTML (vista_html) se arman desde el mismo modelo, así la vista
+# previa muestra exactamente lo que saldrá impreso.
+
+CONDUCE_TITLE = "CONDUCE DE ENTREGA"
+CONDUCE_IMEIS_TITLE = "CONDUCE DE ENTREGA (IMEIs)"
+CONDUCE_NOTE = "Recibido Conforme..."
+CONDUCE_IMEIS_NOTE = 'Al firmar como "Recibido Conforme", el cliente acepta las políticas de la empresa y certifica que ha recibido la mercancía detallada en este conduce, con los seriales/IMEIs aquí descritos. La mercancía viaja por cuenta y riesgo del comprador.'
+SIGNATURE_LABELS = ("Despachado por", "RECIBIDO CONFORME")
+CHECKBOX = "[      ]"
+GARANTIA_TITLE = "RECIBO DE GARANTIA"
+GARANTIA_ADDRESS = ("Calle Duarte, Esq Dr Ferry #54", "Sucursal La Romana", "RNC: 132872975")
+GARANTIA_TERMS = "La garantía quedará anulada si el equipo presenta daños físicos, humedad o mal uso."
+
+
+def conduce_model(destinatario, factura, data_df, show_total=True, date_str=None, title=CONDUCE_TITLE):
+    """Conduce simple: filas (cantidad, modelo) ordenadas por modelo y total."""
+    data = data_df.sort_values(by="Modelo")
+    return SimpleNamespace(
+        title=title,
+        date=date_str or today_str(),
+        factura=factura,
+        cliente=destinatario,
+        rows=[(str(qty), str(modelo)) for qty, modelo in zip(data['Cantidad'], data['Modelo'])],
+        total=data['Cantidad'].sum() if show_total else None,
+        note=CONDUCE_NOTE,
+    )
+
+
+def conduce_imeis_model(destinatario, factura, data_df, date_str=None):
+    """Conduce con IMEIs: el conduce simple (sin total) más (modelo, [imeis]) por modelo."""
+    model = conduce_model(destinatario, factura, data_df, False, date_str, CONDUCE_IMEIS_TITLE)
+    data = data_df.sort_values(by="Modelo")
+    model.has_imeis = bool(data['IMEIs'].str.strip().ne('').any())
+    sections = [(modelo, split_imeis(imeis)) for modelo, imeis in zip(data['Modelo'], data['IMEIs'])] if model.has_imeis else []
+    model.sections = [(modelo, imeis) for modelo, imeis in sections if imeis]
+    model.note = CONDUCE_IMEIS_NOTE
+    return model
+
+
+def garantia_model(store_name, date_str, items_df):
+    """Recibo de garantía: filas (cantidad, modelo, [líneas]) y total de equipos."""
+    rows = []
+    for qty, modelo, lines in zip(items_df['Cantidad'], items_df['Modelo'], items_df['IMEIs/Coment']):
+        rows.append((int(qty) if str(qty).isdigit() else 1, modelo, split_lines(lines)))
+    return SimpleNamespace(
+        title=GARANTIA_TITLE,
+        date=date_str,
+        store=store_name,
+        rows=rows,
+        total=sum(qty for qty, _, _ in rows),
+        address=GARANTIA_ADDRESS,
+        terms=GARANTIA_TERMS,
+    )
+
+
+# Registro del proceso: un juego de estilos por color de acento. Cada
+# proceso tiene el suyo; los workers de render de la app web y del
+# servicio lo llenan al arrancar con los temas de PDF_THEMES, y escritorio
+# y scripts lo llenan con el primer documento de cada color.
+get_document_styles = lru_cache(maxsize=32)(build_document_styles)
+
+
+# --- CONDUCE SIMPLE ---
+def generate_conduce_pdf(destinatario, factura, logo_source, data_df, accent_hex, show_total, styles=None, date_str=None):
+    styles = styles or get_document_styles(accent_hex)
+    model = conduce_model(destinatario, factura, data_df, show_total, date_str)
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, 
+                            leftMargin=0.4*inch, rightMargin=0.4*inch, 
+                            topMargin=0.3*inch, bottomMargin=0.3*inch,
+                            invariant=DETERMINISTIC_PDF)
+    story = []
+
+    logo_paragraph = get_logo_image_reader(logo_source)
+
+    title = Paragraph(model.title, styles.title)
+    
+    header_table = Table([[logo_paragraph, title]], colWidths=[2.5*inch, 5.0*inch])
+    header_table.setStyle(styles.header_table)
+    story.append(header_table)
+    story.append(Spacer(1, 0.1*inch))
+
+    info_data = [
+        [f"FECHA: {model.date}", f"FACTURA N°: {model.factura}"],
+        [f"CLIENTE: {model.cliente}", ""]
+    ]
+    info_table = Table(info_data, colWidths=[5.2*inch, 2.5*inch])
+    info_table.setStyle(styles.info_table)
+    story.append(info_table)
+    story.append(Spacer(1, 0.1*inch))
+
+    table_data = [[Paragraph("CANT", styles.normal), Paragraph("DESCRIPCIÓN DEL MODELO / EQUIPO", styles.normal), Paragraph("VERIF.", styles.normal)]]
+    
+    for qty, modelo in model.rows:
+        table_data.append([qty, Paragraph(modelo, styles.row), CHECKBOX])
+    
+    t = Table(table_data, colWidths=[0.8*inch, 6.1*inch, 0.8*inch])
+    t.setStyle(styles.conduce_table)
+    story.append(t)
+
+    if model.total is not None:
+        story.append(Spacer(1, 0.05*inch))
+        story.append(Paragraph(f"TOTAL UNIDADES: {model.total}", styles.total))
+
+    story.append(Spacer(1, 0.2*inch))
+    
+    story.append(Paragraph(f"<b>Nota Importante:</b><br/>{model.note}", styles.legal))
+    story.append(Spacer(1, 0.3*inch))
+    
+    sig_data = [["_______________________", "_______________________"], list(SIGNATURE_LABELS)]
+    sig_table = Table(sig_data, colWidths=[3.75*inch, 3.75*inch])
+    sig_table.setStyle(styles.signatures_table)
+    story.append(sig_table)
+
+    doc.build(story)
+    buffer.seek(0)
+    return buffer
+
+
+# --- RECIBO DE GARANTÍA ---
+def generate_garantia_pdf(store_name, date_str, items_df, logo_source, styles=None):
+    # La garantía no usa el color de acento: cualquier juego de estilos sirve
+    styles = styles or get_document_styles(DEFAULT_ACCENT)
+    model = garantia_model(store_name, date_str, items_df)
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=0.4*inch, rightMargin=0.4*inch, topMargin=0.4*inch, bottomMargin=0.2*inch, invariant=DETERMINISTIC_PDF)
+    story = []
+
+    # Logo
+    logo_obj = get_logo_image_reader(logo_source)
+    
+    # Address
+    address_para = Paragraph("<br/>".join(model.address), styles.address)
+
+    t_header = Table([[logo_obj, address_para]], colWidths=[4*inch, 3.5*inch])
+    t_header.setStyle(styles.garantia_header_table)
+    story.append(t_header)
+    story.append(Spacer(1, 0.2*inch))
+
+    story.append(Paragraph(model.title, styles.garantia_title))
+    story.append(Paragraph(f"Fecha:  {model.date}", styles.garantia_date))
+    story.append(Paragraph(f"Tienda: {model.store}", styles.garantia_store))
+
+    # Items Table: una fila con el modelo y, debajo, los IMEIs/comentarios
+    # en trozos de LINES_PER_ROW líneas (cada trozo es una fila partible)
+    data_rows = [['CANT', 'DESCRIPCIÓN']]
+    blocks = []
+    
+    for qty, modelo, lines in model.rows:
+        start = len(data_rows)
+        data_rows.append([str(qty), Paragraph(f"<b>{modelo}</b>", styles.garantia_item)])
+        for chunk in chunked(lines, LINES_PER_ROW):
+            data_rows.append(["", Paragraph("<br/>".join(chunk), styles.garantia_lines)])
+        blocks.append((start, len(data_rows) - 1))
+
+    data_rows.append([str(model.total), Paragraph("<b>TOTAL EQUIPOS</b>", styles.normal)])
+
+    t_items = LongTable(data_rows, colWidths=[1*inch, 6.5*inch], repeatRows=1)
+    t_items.setStyle(TableStyle(block_styles(blocks, 1, colors.black), parent=styles.garantia_items_table))
+    story.append(t_items)
+    story.append(Spacer(1, 0.2*inch))
+
+    # Terms
+    story.append(Paragraph(model.terms, styles.terms))
+    story.append(Spacer(1, 0.4*inch))
+    
+    story.append(Paragraph("___________________________________", styles.sign_line))
+    story.append(Paragraph("Firma", styles.sign_label))
+
+    doc.build(story)
+    buffer.seek(0)
+    return buffer
+
+
+# --- CONDUCE CON IMEIS ---
+def generate_conduce_imeis_pdf(destinatario, factura, logo_source, data_df, accent_hex, imei_layout=IMEI_LAYOUT_TEXT, styles=None, date_str=None):
+    styles = styles or get_document_styles(accent_hex)
+    model = conduce_imeis_model(destinatario, factura, data_df, date_str)
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, 
+                            leftMargin=0.4*inch, rightMargin=0.4*inch, 
+                            topMargin=0.3*inch, bottomMargin=0.3*inch,
+                            invariant=DETERMINISTIC_PDF)
+    story = []
+
+    # --- HEADER ---
+    logo_paragraph = get_logo_image_reader(logo_source)
+    
+    title = Paragraph(model.title, styles.title)
+    
+    header_table = Table([[logo_paragraph, title]], colWidths=[2.5*inch, 5.0*inch])
+    header_table.setStyle(styles.header_table)
+    story.append(header_table)
+    story.append(Spacer(1, 0.1*inch))
+
+    # --- INFO ---
+    info_data = [
+        [f"FECHA: {model.date}", f"FACTURA N°: {model.factura}"],
+        [f"CLIENTE: {model.cliente}", ""]
+    ]
+    info_table = Table(info_data, colWidths=[5.2*inch, 2.5*inch])
+    info_table.setStyle(styles.info_table)
+    story.append(info_table)
+    story.append(Spacer(1, 0.1*inch))
+
+    # --- TITLE GOODS ---
+    Story_Goods = [
+        [Paragraph("<b>DETALLE DE MERCANCÍA</b>", styles.h2_center)]
+    ]
+    t_title_goods = Table(Story_Goods, colWidths=[7.7*inch])
+    t_title_goods.setStyle(styles.title_goods_table)
+    story.append(t_title_goods)
+    
+    # --- GOODS TABLE ---
+    prod_data = [[Paragraph('<b>CANT</b>', styles.normal), Paragraph('<b>DESCRIPCIÓN DEL MODELO / EQUIPO</b>', styles.normal)]]
+    
+    for qty, modelo in model.rows:
+        prod_data.append([qty, Paragraph(modelo, styles.row)])
+        
+    t_products = LongTable(prod_data, colWidths=[0.8*inch, 6.9*inch], repeatRows=1)
+    t_products.setStyle(styles.products_table)
+    story.append(t_products)
+    story.append(Spacer(1, 0.2*inch))
+
+    # --- IMEIS SECTION ---
+    if model.has_imeis:
+        title_imeis = Paragraph("<b>DETALLE DE IMEIS / SERIALES</b>", styles.h2_center)
+        if model.sections:
+            story.append(imei_section_table(model.sections, 7.7*inch, title_imeis, styles.accent, 0.5, colors.grey, imei_layout))
+        
+        story.append(Spacer(1, 0.2*inch))
+
+    # --- FOOTER ---
+    story.append(Paragraph(f"<b>Nota Importante:</b> {model.note}", styles.note))
+    story.append(Spacer(1, 0.4*inch))
+
+    sig_data = [["_______________________", "_______________________"], list(SIGNATURE_LABELS)]
+    sig_table = Table(sig_data, colWidths=[3.75*inch, 3.75*inch])
+    sig_table.setStyle(styles.signatures_table)
+    story.append(sig_table)
+
+    doc.build(story)
+    buffer.seek(0)
+    return buffer
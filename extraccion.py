@@ -0,0 +1,269 @@
+import logging
+import re
+from io import BytesIO
+
+import pdfplumber
+
+from cache_extraccion import ExtractionCache, pdf_sha256
+from conciliacion import reconcile
+from parser_columnas import ColumnInvoiceParser, WORD_SETTINGS
+from parser_lineas import InvoiceLineParser
+from plantillas_factura import TemplateRegistry, layout_fingerprint
+
+# ==========================================
+# EXTRACCIÓN DE FACTURAS (compartida)
+# ==========================================
+# Usada por app.py, pdfconduce.py y pdfconduce_imeis.py. Devuelve los items
+# "crudos" (cantidad, descripción) sin limpiar: cada herramienta aplica su
+# propia limpieza de nombres, así la misma entrada de cache sirve a todas.
+
+_extraction_cache = ExtractionCache()
+_template_registry = TemplateRegistry()
+
+
+def get_extraction_cache():
+    return _extraction_cache
+
+
+def read_pdf_bytes(pdf_source):
+    """Acepta una ruta, bytes o un archivo subido (UploadedFile / file-like)."""
+    if isinstance(pdf_source, (bytes, bytearray)):
+        return bytes(pdf_source)
+    if isinstance(pdf_source, str):
+        with open(pdf_source, "rb") as f:
+            return f.read()
+    if hasattr(pdf_source, "getvalue"):
+        return pdf_source.getvalue()
+    content = pdf_source.read()
+    pdf_source.seek(0)  # Reset
+    return content
+
+
+# Patrones de cabecera (precompilados una sola vez por proceso)
+CLIENTE_PATTERN = re.compile(r"Cliente:\s*(.*?)(?=\s*(?:Dirección:|Vendedor:|$))", re.DOTALL | re.IGNORECASE)
+FACTURA_PATTERN = re.compile(r"No Factura\s*(\w+)", re.IGNORECASE)
+
+
+def _page_text(page):
+    return page.extract_text(x_tolerance=2, y_tolerance=2) or ""
+
+
+def _open_pdf(pdf_bytes):
+    return pdfplumber.open(BytesIO(pdf_bytes))
+
+
+def _iter_texts(pdf, templates=None, fingerprint=None):
+    for index, page in enumerate(pdf.pages):
+        text = None
+        if index == 0 and templates is not None:
+            if fingerprint is None:
+                fingerprint = layout_fingerprint(page)
+            text = templates.extract_first_page(page, fingerprint)
+            if text is None:
+                text = _page_text(page)
+                templates.learn(page, fingerprint)
+        if text is None:
+            text = _page_text(page)
+        page.flush_cache()
+        yield text
+
+
+def iter_page_texts(pdf_bytes, templates=None):
+    """Genera el texto de cada página, una a la vez.
+
+    Con un registro de `templates`, la primera página se lee solo en las
+    regiones aprendidas para su layout; si no cuadra se lee completa, y si
+    el layout no tenía plantilla se aprende para la próxima vez. Libera la
+    cache de layout de cada página al terminar con ella, así la memoria no
+    crece con el número de páginas.
+    """
+    with _open_pdf(pdf_bytes) as pdf:
+        yield from _iter_texts(pdf, templates)
+
+
+def extract_text(pdf_bytes):
+    return "\n".join(iter_page_texts(pdf_bytes))
+
+
+def parse_invoice_header(text):
+    cliente = ""
+    factura = ""
+    cliente_match = CLIENTE_PATTERN.search(text)
+    factura_match = FACTURA_PATTERN.search(text)
+
+    if cliente_match: cliente = cliente_match.group(1).strip()
+    if factura_match: factura = factura_match.group(1).strip()
+    return cliente, factura
+
+
+class InvoiceStreamParser:
+    """Parser incremental: recibe el texto de la factura página por página.
+
+    Los items salen del parser de líneas de una sola pasada, cuyo estado
+    sobrevive al salto de página (un item "inverted" puede quedar partido
+    entre dos páginas). `done` se activa cuando ya hubo items y apareció
+    la línea de totales.
+    """
+
+    def __init__(self):
+        self.pages = []
+        self.lines = InvoiceLineParser()
+        self.done = False
+
+    @property
+    def items(self):
+        return self.lines.items
+
+    def feed_page(self, page_text):
+        self.pages.append(page_text)
+        self.lines.feed_text(page_text)
+        if self.lines.items and self.lines.totals_seen:
+            self.done = True
+
+    def result(self):
+        cliente, factura = parse_invoice_header("\n".join(self.pages))
+        return cliente, factura, self.items
+
+
+def parse_invoice_text(text):
+    parser = InvoiceStreamParser()
+    parser.feed_page(text)
+    return parser.result()
+
+
+def _parse_text_pages(pdf, stop_early=True, templates=None, fingerprint=None):
+    parser = InvoiceStreamParser()
+    pages = _iter_texts(pdf, templates, fingerprint)
+    try:
+        for page_text in pages:
+            parser.feed_page(page_text)
+            if stop_early and parser.done:
+                break
+    finally:
+        pages.close()
+    return parser.result(), parser.lines
+
+
+def parse_invoice_pdf(pdf_bytes, stop_early=True, use_templates=True):
+    """Extrae y parsea la factura página por página.
+
+    Con `stop_early` no se procesan las páginas que siguen a los totales
+    (términos, anexos...), que son las más caras y no aportan items. Con
+    `use_templates` la primera página se recorta a las regiones aprendidas
+    del layout.
+    """
+    with _open_pdf(pdf_bytes) as pdf:
+        result, _ = _parse_text_pages(pdf, stop_early, _template_registry if use_templates else None)
+    return result
+
+
+def _iter_words(pdf):
+    for page in pdf.pages:
+        words = page.extract_words(**WORD_SETTINGS)
+        page.flush_cache()
+        yield words
+
+
+def iter_page_words(pdf_bytes):
+    """Como iter_page_texts, pero con las palabras y sus coordenadas."""
+    with _open_pdf(pdf_bytes) as pdf:
+        yield from _iter_words(pdf)
+
+
+def _parse_column_pages(pdf, stop_early=True):
+    parser = ColumnInvoiceParser()
+    pages = _iter_words(pdf)
+    try:
+        for words in pages:
+            parser.feed_page_words(words)
+            if stop_early and parser.items and parser.totals_seen:
+                break
+    finally:
+        pages.close()
+    cliente, factura = parse_invoice_header(parser.text())
+    return (cliente, factura, parser.items), parser
+
+
+def parse_invoice_pdf_columns(pdf_bytes, stop_early=True):
+    """Parser por columnas: sin reconstruir el texto de la página."""
+    with _open_pdf(pdf_bytes) as pdf:
+        result, _ = _parse_column_pages(pdf, stop_early)
+    return result
+
+
+STRATEGY_TEXT = "texto"
+STRATEGY_COLUMNS = "columnas"
+STRATEGY_AUTO = "auto"
+
+# Niveles de la cascada, del más barato al más caro
+PARSER_TIERS = [STRATEGY_TEXT, STRATEGY_COLUMNS]
+
+
+def parse_invoice_auto(pdf_bytes):
+    """Cascada de parsers con conciliación contra los totales de la factura.
+
+    Empieza por el nivel que funcionó la última vez para este layout (el
+    más barato si es nuevo) y solo sube al siguiente si la conciliación
+    falla. El nivel ganador se guarda en la plantilla del layout. Si
+    ningún nivel cuadra se devuelve el resultado con menos discrepancias
+    y se deja constancia en el log.
+    """
+    with _open_pdf(pdf_bytes) as pdf:
+        if not pdf.pages:
+            return "", "", []
+        # La huella se calcula sobre la página ya cargada: el nivel de
+        # texto la reutiliza sin volver a parsear la primera página
+        fingerprint = layout_fingerprint(pdf.pages[0])
+        template = _template_registry.get(fingerprint) or {}
+        start = PARSER_TIERS.index(template["tier"]) if template.get("tier") in PARSER_TIERS else 0
+        tiers = PARSER_TIERS[start:] + PARSER_TIERS[:start]
+
+        best = None
+        for tier in tiers:
+            if tier == STRATEGY_TEXT:
+                result, checked = _parse_text_pages(pdf, templates=_template_registry, fingerprint=fingerprint)
+            else:
+                result, checked = _parse_column_pages(pdf)
+            problems = reconcile(checked)
+            if not problems:
+                if template.get("tier") != tier:
+                    _template_registry.update(fingerprint, tier=tier)
+                return result
+            logging.info(f"Factura {result[1] or '?'}: nivel '{tier}' no concilia ({'; '.join(problems)})")
+            if best is None or len(problems) < len(best[1]):
+                best = (result, problems)
+
+    result, problems = best
+    logging.warning(f"Factura {result[1] or '?'}: ningún parser concilia con los totales ({'; '.join(problems)})")
+    return result
+
+
+_STRATEGIES = {
+    STRATEGY_AUTO: parse_invoice_auto,
+    STRATEGY_TEXT: parse_invoice_pdf,
+    STRATEGY_COLUMNS: parse_invoice_pdf_columns,
+}
+
+
+def extract_invoice(pdf_source, use_cache=True, strategy=STRATEGY_AUTO):
+    """Devuelve (cliente, factura, items) de una factura PDF.
+
+    `items` es una lista de tuplas (cantidad_texto, descripcion) tal como
+    aparecen en la factura. Con `use_cache` se consulta primero la cache
+    por SHA-256 del contenido. `strategy` elige el parser: la cascada con
+    conciliación (por defecto), solo texto + regex o solo columnas.
+    """
+    pdf_bytes = read_pdf_bytes(pdf_source)
+    key = pdf_sha256(pdf_bytes)
+    if strategy != STRATEGY_AUTO:
+        key = f"{key}-{strategy}"
+
+    if use_cache:
+        cached = _extraction_cache.get(key)
+        if cached is not None:
+            return cached
+
+    cliente, factura, items = _STRATEGIES[strategy](pdf_bytes)
+    if use_cache:
+        _extraction_cache.put(key, cliente, factura, items)
+    return cliente, factura, items
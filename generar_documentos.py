@@ -0,0 +1,220 @@
+"""Genera conduces, conduces con IMEIs o recibos de garantía sin interfaz.
+
+Lee facturas PDF y/o archivos de items (JSON de sesión o lista de items,
+CSV con columnas Cantidad, Modelo[, IMEIs]) y escribe un PDF por entrada
+en --out. No importa Streamlit ni tkinter, así que arranca rápido y corre
+en servidores sin pantalla (cron). El progreso va a stderr y al final se
+imprime un resumen JSON en stdout.
+
+Códigos de salida: 0 todo generado, 1 algún documento falló, 3 no se
+generó ninguno (2 lo usa argparse para argumentos inválidos).
+
+Uso:
+    python -m generar_documentos conduce facturas/ otra.pdf items.json [--out conduces]
+        [--workers 4] [--tema "Verde Menta" | --acento "#C1E1C1"] [--logo logo.png]
+        [--rapido] [--copia] [--formato-imeis grilla] [--fecha 01/01/2025]
+        [--destinatario X] [--factura Y] [--tienda ANGELO] [--json resumen.json]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from conduce_rapido import COPIES_ORIGINAL_COPY
+from datos_documentos import (items_to_conduce_df, read_items_file, adapt_columns, render_document,
+                              DOC_CONDUCE, DOC_CONDUCE_IMEIS, DOC_GARANTIA, DOC_TYPES)
+from documentos_pdf import today_str, PDF_THEMES, DEFAULT_ACCENT, IMEI_LAYOUT_TEXT, IMEI_LAYOUT_GRID
+from lote_facturas import extract_batch
+
+FILE_PREFIXES = {DOC_CONDUCE: "Conduce", DOC_CONDUCE_IMEIS: "Conduce_IMEIs", DOC_GARANTIA: "Garantia"}
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_NOTHING = 3
+
+INPUT_EXTENSIONS = (".pdf", ".json", ".csv")
+DEFAULT_LOGO = "logo_cache_web.png"
+_HEX_COLOR = re.compile(r"^#[0-9A-Fa-f]{6}$")
+_UNSAFE_CHARS = re.compile(r"[^\w.-]+")
+
+
+def expand_inputs(paths):
+    """Archivos de entrada: las carpetas aportan sus PDF, JSON y CSV."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = [p for p in glob.glob(os.path.join(path, "*")) if p.lower().endswith(INPUT_EXTENSIONS)]
+            files.extend(sorted(found))
+        else:
+            files.append(path)
+    return files
+
+
+def load_jobs(files, doc_type, args):
+    """(trabajos, errores): un trabajo por entrada con sus datos ya listos."""
+    jobs = []
+    errors = []
+    pdfs = [path for path in files if path.lower().endswith(".pdf")]
+    extracted = {}
+    if pdfs:
+        for path, result in zip(pdfs, extract_batch(pdfs, max_workers=args.workers)):
+            extracted[path] = result
+
+    for path in files:
+        name = os.path.basename(path)
+        try:
+            if path in extracted:
+                result = extracted[path]
+                if result['error']:
+                    raise ValueError(result['error'])
+                destinatario, factura, df = result['cliente'], result['factura'], items_to_conduce_df(result['items'])
+            elif path.lower().endswith((".json", ".csv")):
+                destinatario, factura, df = read_items_file(path)
+            else:
+                raise ValueError("formato no soportado (se esperaba PDF, JSON o CSV)")
+            jobs.append({
+                "archivo": name,
+                "destinatario": destinatario or args.destinatario,
+                "factura": factura or args.factura,
+                "df": adapt_columns(df, doc_type),
+            })
+        except Exception as e:
+            errors.append({"archivo": name, "salida": None, "bytes": None, "segundos": None, "error": str(e)})
+    return jobs, errors
+
+
+def _output_name(doc_type, job, used):
+    stem = job["factura"] or os.path.splitext(job["archivo"])[0]
+    base = f"{FILE_PREFIXES[doc_type]}_{_UNSAFE_CHARS.sub('_', str(stem)).strip('_') or 'documento'}"
+    name = f"{base}.pdf"
+    n = 2
+    while name in used:
+        name = f"{base}_{n}.pdf"
+        n += 1
+    used.add(name)
+    return name
+
+
+def render_job(job, options):
+    """Genera y escribe un documento. Corre en el proceso principal o en un worker."""
+    t0 = time.perf_counter()
+    result = {"archivo": job["archivo"], "salida": job["salida"], "bytes": None, "segundos": None, "error": None}
+    try:
+        pdf_bytes = render_document(options["tipo"], job["destinatario"], job["factura"], job["df"], options["acento"], options["logo"],
+                                    options["fecha"], options["formato_imeis"], options["tienda"], options["rapido"], options["copias"])
+        # Escritura atómica: un cron que lea la carpeta nunca ve un PDF a medias
+        tmp_path = f"{job['salida']}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, job["salida"])
+        result["bytes"] = len(pdf_bytes)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["segundos"] = round(time.perf_counter() - t0, 4)
+    return result
+
+
+def render_all(jobs, options, workers):
+    # Un solo documento (o --workers 1) no justifica arrancar procesos
+    if len(jobs) <= 1 or workers == 1:
+        for job in jobs:
+            yield render_job(job, options)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(render_job, job, options) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _accent(args, ap):
+    if args.acento:
+        if not _HEX_COLOR.match(args.acento):
+            ap.error("--acento debe ser un color #RRGGBB")
+        return args.acento
+    if args.tema:
+        if args.tema not in PDF_THEMES:
+            ap.error(f"--tema debe ser uno de: {', '.join(PDF_THEMES)}")
+        return PDF_THEMES[args.tema]
+    return DEFAULT_ACCENT
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("tipo", choices=DOC_TYPES)
+    ap.add_argument("entradas", nargs="+", help="facturas PDF, archivos JSON/CSV de items o carpetas")
+    ap.add_argument("--out", default="documentos_generados", help="carpeta de salida")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="procesos para extraer y generar")
+    ap.add_argument("--tema", help="tema de la app web (p. ej. \"Verde Menta\")")
+    ap.add_argument("--acento", help="color de acento #RRGGBB (tiene prioridad sobre --tema)")
+    ap.add_argument("--logo", default=DEFAULT_LOGO if os.path.exists(DEFAULT_LOGO) else None)
+    ap.add_argument("--sin-logo", action="store_true")
+    ap.add_argument("--rapido", action="store_true", help="conduce simple con el render rápido (conduce_rapido)")
+    ap.add_argument("--copia", action="store_true", help="con --rapido: copias ORIGINAL y COPIA")
+    ap.add_argument("--formato-imeis", choices=[IMEI_LAYOUT_TEXT, IMEI_LAYOUT_GRID], default=IMEI_LAYOUT_TEXT)
+    ap.add_argument("--fecha", help="fecha impresa (dd/mm/aaaa); por defecto hoy")
+    ap.add_argument("--destinatario", default="", help="para entradas que no lo traen")
+    ap.add_argument("--factura", default="", help="para entradas que no la traen")
+    ap.add_argument("--tienda", default="", help="tienda del recibo de garantía")
+    ap.add_argument("--json", metavar="RUTA", help="guardar también el resumen en un archivo")
+    args = ap.parse_args()
+
+    if args.workers < 1:
+        ap.error("--workers debe ser al menos 1")
+    if args.logo and not args.sin_logo and not os.path.exists(args.logo):
+        ap.error(f"no existe el logo {args.logo}")
+    options = {
+        "tipo": args.tipo,
+        "acento": _accent(args, ap),
+        "logo": None if args.sin_logo else args.logo,
+        "rapido": args.rapido,
+        "copias": COPIES_ORIGINAL_COPY if args.copia else None,
+        "formato_imeis": args.formato_imeis,
+        "fecha": args.fecha or today_str(),
+        "tienda": args.tienda,
+    }
+
+    t0 = time.perf_counter()
+    files = expand_inputs(args.entradas)
+    jobs, results = load_jobs(files, args.tipo, args)
+    for r in results:
+        print(f"ERROR {r['archivo']}: {r['error']}", file=sys.stderr)
+
+    os.makedirs(args.out, exist_ok=True)
+    used = set()
+    for job in jobs:
+        job["salida"] = os.path.join(args.out, _output_name(args.tipo, job, used))
+
+    for r in render_all(jobs, options, min(args.workers, len(jobs) or 1)):
+        results.append(r)
+        status = f"ERROR {r['error']}" if r["error"] else f"{r['bytes'] / 1024:.0f} KB en {r['segundos']:.2f} s"
+        print(f"{r['archivo']} -> {r['salida']}: {status}", file=sys.stderr)
+
+    generated = sum(1 for r in results if not r["error"])
+    failed = len(results) - generated
+    summary = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "tipo": args.tipo,
+        "salida": os.path.abspath(args.out),
+        "entradas": len(files),
+        "generados": generated,
+        "fallidos": failed,
+        "segundos": round(time.perf_counter() - t0, 3),
+        "documentos": results,
+    }
+    print(json.dumps(summary, indent=4, ensure_ascii=False))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=4, ensure_ascii=False)
+
+    if generated == 0:
+        sys.exit(EXIT_NOTHING)
+    sys.exit(EXIT_PARTIAL if failed else EXIT_OK)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import re
+from functools import lru_cache
+
+# ==========================================
+# NORMALIZACIÓN DE NOMBRES DE MODELO
+# ==========================================
+# Las reglas se compilan una sola vez. Los colores se quitan con una sola
+# pasada por tokens contra un trie de palabras (en vez de un regex con ~60
+# alternativas), y el resultado se memoiza: los mismos SKUs se repiten en
+# miles de líneas de factura. Las tres herramientas (web, conduce de
+# escritorio y conduce con IMEIs) usan el mismo juego de reglas.
+
+DEFAULT_COLORS_TO_REMOVE = [
+    'negro', 'rojo', 'verde', 'azul', 'blanco', 'gris', 'plateado',
+    'dorado', 'púrpura', 'morado', 'lavanda', 'rosa', 'rosado', 'amarillo', 'naranja', 'marrón',
+    'cyan', 'magenta', 'grafito', 'sierra', 'black', 'red', 'green',
+    'blue', 'white', 'gray', 'silver', 'gold', 'purple', 'pink',
+    'yellow', 'orange', 'brown', 'graphite', 'midnight blue',
+    'desert gold', 'titanium', 'oro', 'arena', 'pantone', 'tapestry',
+    'arabesque', 'navy', 'violet', 'mint', 'cream', 'beige', 'charcoal',
+    'blaze', 'pure', 'tendril', 'polar', 'deep', 'space', 'rose'
+]
+
+# Marcador del paso de colores dentro de la lista de reglas
+COLORS = "colores"
+
+# Reglas comunes a las tres herramientas: (patrón, reemplazo, flags) o el
+# marcador COLORS. Se aplican en orden y tras cada una se hace strip(),
+# igual que la cadena de str.replace(...).str.strip() original.
+MODEL_CLEANING_RULES = [
+    (r'\s*5g\b', '', re.IGNORECASE),
+    (r'\s*\d+\.?\d*\"+\s*$', '', re.IGNORECASE),
+    COLORS,
+    (r'\(\s*\)', '', 0),
+    # Códigos de fabricante
+    (r'\s+XT\w+-\w+', '', re.IGNORECASE),
+    (r'\s+A\w+L\b', '', re.IGNORECASE),
+    (r'\s+S\w+B\b', '', re.IGNORECASE),
+    (r'\s+PB\w+\b', '', re.IGNORECASE),
+    (r'\s+T\d+[A-Z]\b', '', re.IGNORECASE),
+    (r'\s+SM-\w+\b', '', re.IGNORECASE),
+    (r'\bBLADE\b', '', re.IGNORECASE),
+    (r'\s+Z\d+\b', '', re.IGNORECASE),
+    # Todo lo que sigue a la capacidad (128GB, 1TB...) sobra
+    (r'(\d+[GT]B)\b.*', r'\1', re.IGNORECASE),
+]
+
+_TOKEN = re.compile(r'\w+|\W+')
+_MULTI_SPACE = re.compile(r'\s{2,}')
+
+
+def _compile_rules(rules):
+    compiled = []
+    for rule in rules:
+        if rule == COLORS:
+            compiled.append(COLORS)
+        else:
+            pattern, repl, flags = rule
+            compiled.append((re.compile(pattern, flags), repl))
+    return compiled
+
+
+def map_unique(series, func):
+    """Aplica `func` una vez por valor distinto y lo mapea de vuelta a la serie."""
+    mapping = {value: func(value) for value in series.unique()}
+    return series.map(mapping)
+
+
+def build_color_trie(colors):
+    """{primera_palabra: [secuencias de tokens, la más larga primero]}"""
+    trie = {}
+    for color in colors:
+        tokens = _TOKEN.findall(color.lower())
+        if not tokens:
+            continue
+        trie.setdefault(tokens[0], []).append(tokens)
+    for seqs in trie.values():
+        seqs.sort(key=len, reverse=True)
+    return trie
+
+
+def strip_colors(text, trie):
+    """Equivale a re.sub(r'\\b(c1|c2|...)\\b', '', text, flags=re.I) en una pasada."""
+    if not trie:
+        return text
+    tokens = _TOKEN.findall(text)
+    lowered = [t.lower() for t in tokens]
+    out = []
+    i = 0
+    n = len(tokens)
+    while i < n:
+        seqs = trie.get(lowered[i])
+        if seqs:
+            for seq in seqs:
+                k = len(seq)
+                if lowered[i:i + k] == seq:
+                    i += k
+                    break
+            else:
+                out.append(tokens[i])
+                i += 1
+        else:
+            out.append(tokens[i])
+            i += 1
+    return "".join(out)
+
+
+class ModelNameNormalizer:
+    """Limpia nombres de modelo con un juego de reglas compilado una vez.
+
+    `set_colors` solo recompila si la lista de colores cambió de verdad.
+    """
+
+    def __init__(self, colors=DEFAULT_COLORS_TO_REMOVE, rules=MODEL_CLEANING_RULES, cache_size=4096):
+        self._rules = _compile_rules(rules)
+        self._cache_size = cache_size
+        self._colors_key = None
+        self.set_colors(colors)
+
+    def set_colors(self, colors):
+        key = tuple(colors)
+        if key == self._colors_key:
+            return
+        self._colors_key = key
+        self._trie = build_color_trie(key)
+        self._normalize_cached = lru_cache(maxsize=self._cache_size)(self._normalize)
+
+    def _normalize(self, model_name):
+        model = model_name
+        for rule in self._rules:
+            if rule is COLORS:
+                model = strip_colors(model, self._trie).strip()
+            else:
+                pattern, repl = rule
+                model = pattern.sub(repl, model).strip()
+        return _MULTI_SPACE.sub(' ', model).strip()
+
+    def __call__(self, model_name):
+        return self._normalize_cached(model_name)
+
+    def normalize_series(self, series):
+        """Normaliza una columna de pandas en una pasada por modelo distinto."""
+        return map_unique(series, self)
+
+    def cache_info(self):
+        return self._normalize_cached.cache_info()
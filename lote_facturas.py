@@ -0,0 +1,125 @@
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from cache_extraccion import pdf_sha256
+from extraccion import get_extraction_cache, parse_invoice_auto, read_pdf_bytes
+
+# ==========================================
+# PROCESAMIENTO DE FACTURAS POR LOTES
+# ==========================================
+# pdfplumber es Python puro y queda limitado por el GIL, así que el lote se
+# reparte entre procesos. El proceso principal consulta la cache antes de
+# despachar y guarda los resultados nuevos, de modo que los workers no
+# necesitan compartir estado.
+#
+# Los archivos se leen a medida que se despachan y nunca hay más de
+# IN_FLIGHT_PER_WORKER extracciones por worker en curso: la memoria queda
+# acotada por los workers, no por el tamaño de la carpeta.
+
+IN_FLIGHT_PER_WORKER = 2
+
+
+def list_pdfs_in_folder(folder):
+    paths = glob.glob(os.path.join(folder, "*.pdf")) + glob.glob(os.path.join(folder, "*.PDF"))
+    return sorted(set(paths))
+
+
+def _extract_worker(pdf_bytes):
+    # Corre en un proceso hijo: sin cache, solo extracción + parseo
+    return parse_invoice_auto(pdf_bytes)
+
+
+def _source_name(source):
+    if isinstance(source, str):
+        return os.path.basename(source)
+    return getattr(source, "name", "factura.pdf")
+
+
+def extract_batch(sources, max_workers=None, progress_callback=None):
+    """Extrae (cliente, factura, items) de muchas facturas en paralelo.
+
+    `sources` puede mezclar rutas, bytes y archivos subidos. Devuelve una
+    lista de dicts en el mismo orden de entrada con las claves 'archivo',
+    'cliente', 'factura', 'items' y 'error'. `progress_callback(hechos,
+    total, resultado)` se llama una vez por factura al terminar. Las
+    rutas se leen recién al despacharlas, así un lote grande no tiene
+    todos los PDFs en memoria a la vez.
+    """
+    cache = get_extraction_cache()
+    total = len(sources)
+    results = [None] * total
+    done = 0
+
+    def finish(index, result):
+        nonlocal done
+        results[index] = result
+        done += 1
+        if progress_callback:
+            progress_callback(done, total, result)
+
+    def finish_extraction(index, name, key, extract, *args):
+        try:
+            cliente, factura, items = extract(*args)
+            cache.put(key, cliente, factura, items)
+            finish(index, {"archivo": name, "cliente": cliente, "factura": factura, "items": items, "error": None})
+        except Exception as e:
+            logging.error(f"Error procesando {name}: {e}")
+            finish(index, {"archivo": name, "cliente": "", "factura": "", "items": [], "error": str(e)})
+
+    workers = max_workers or os.cpu_count() or 1
+    in_flight = {}  # future -> (índice, nombre, clave); sin los bytes
+    executor = None
+    held = None     # primera factura sin cache: si es la única no se arrancan procesos
+
+    def collect(limit):
+        # Espera resultados hasta que queden menos de `limit` en curso
+        while len(in_flight) >= limit:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, name, key = in_flight.pop(future)
+                finish_extraction(index, name, key, future.result)
+
+    try:
+        for index, source in enumerate(sources):
+            name = _source_name(source)
+            try:
+                pdf_bytes = read_pdf_bytes(source)
+            except Exception as e:
+                finish(index, {"archivo": name, "cliente": "", "factura": "", "items": [], "error": str(e)})
+                continue
+
+            key = pdf_sha256(pdf_bytes)
+            cached = cache.get(key)
+            if cached is not None:
+                cliente, factura, items = cached
+                finish(index, {"archivo": name, "cliente": cliente, "factura": factura, "items": items, "error": None})
+                continue
+
+            if workers == 1:
+                finish_extraction(index, name, key, _extract_worker, pdf_bytes)
+                continue
+            if executor is None:
+                if held is None:
+                    held = (index, name, key, pdf_bytes)
+                    continue
+                # Hay al menos dos: ahora sí vale la pena arrancar procesos
+                executor = ProcessPoolExecutor(max_workers=max_workers)
+                held_index, held_name, held_key, held_bytes = held
+                held = None
+                in_flight[executor.submit(_extract_worker, held_bytes)] = (held_index, held_name, held_key)
+                del held_bytes
+            collect(IN_FLIGHT_PER_WORKER * workers)
+            in_flight[executor.submit(_extract_worker, pdf_bytes)] = (index, name, key)
+            del pdf_bytes
+
+        if held is not None:
+            index, name, key, pdf_bytes = held
+            finish_extraction(index, name, key, _extract_worker, pdf_bytes)
+        collect(1)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    return results
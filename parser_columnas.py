@@ -0,0 +1,147 @@
+import re
+from statistics import median
+
+from parser_lineas import LINE_TOTALS, MONEY_TOKEN as MONEY, declared_total
+
+# ==========================================
+# PARSER POR COLUMNAS (coordenadas de palabras)
+# ==========================================
+# Vía rápida alternativa al texto reconstruido + regex: parte de
+# page.extract_words(), agrupa las palabras en filas por su `top` y las
+# reparte en columnas (cantidad, descripción, precio, descuento, total)
+# por su coordenada x. El layout "inverted" (cantidad en la fila de abajo)
+# queda como una simple consulta a la columna de cantidad de la fila
+# siguiente, sin regex multilínea.
+
+QTY = re.compile(r"\d+\.\d{2}")
+
+ROW_TOLERANCE = 3    # puntos de diferencia en `top` dentro de una fila
+COLUMN_TOLERANCE = 4  # holgura al comparar con el borde de una columna
+
+WORD_SETTINGS = dict(x_tolerance=2, y_tolerance=2)
+
+
+def group_rows(words, tolerance=ROW_TOLERANCE):
+    """Agrupa palabras (dicts de extract_words) en filas ordenadas por x."""
+    rows = []
+    current = []
+    current_top = None
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if current and word["top"] - current_top > tolerance:
+            rows.append(sorted(current, key=lambda w: w["x0"]))
+            current = []
+        if not current:
+            current_top = word["top"]
+        current.append(word)
+    if current:
+        rows.append(sorted(current, key=lambda w: w["x0"]))
+    return rows
+
+
+def _trailing_amounts(row):
+    """Cuántas palabras al final de la fila son importes (máx. 3)."""
+    count = 0
+    for word in reversed(row):
+        if count == 3 or not MONEY.fullmatch(word["text"]):
+            break
+        count += 1
+    return count
+
+
+def learn_price_column(rows):
+    """(x0, x1) de la columna de precio, o None si no hay filas de items.
+
+    Se toma de las filas que terminan en tres importes (precio, descuento,
+    total); la mediana evita que una fila rara mueva los bordes. Se guardan
+    ambos bordes porque la columna puede estar alineada a la izquierda o a
+    la derecha.
+    """
+    prices = [row[-3] for row in rows if len(row) >= 4 and _trailing_amounts(row) == 3]
+    if not prices:
+        return None
+    x0 = median(w["x0"] for w in prices)
+    x1 = median(w["x1"] for w in prices)
+
+    # Si los precios no están alineados en ninguno de los dos bordes no hay
+    # columnas reales (texto corrido): se usa el corte por importes finales
+    def aligned(edge, value):
+        return sum(abs(w[edge] - value) <= COLUMN_TOLERANCE for w in prices) >= 0.8 * len(prices)
+
+    if not (aligned("x0", x0) or aligned("x1", x1)):
+        return None
+    return x0, x1
+
+
+def _in_amount_columns(word, price_column):
+    x0, x1 = price_column
+    return word["x0"] >= x0 - COLUMN_TOLERANCE or word["x1"] >= x1 - COLUMN_TOLERANCE
+
+
+class ColumnInvoiceParser:
+    """Convierte filas de palabras en items (cantidad, descripción)."""
+
+    def __init__(self):
+        self.items = []
+        self.lines = []
+        self.totals_seen = False
+        # Mismos datos de conciliación que InvoiceLineParser
+        self.amount_rows = 0
+        self.item_amounts = []
+        self.declared_totals = {}
+        self.truncated = 0
+        self._pending_desc = None
+        self._pending_amounts = None
+
+    def feed_page_words(self, words):
+        rows = group_rows(words)
+        price_column = learn_price_column(rows)
+        for row in rows:
+            self.feed_row(row, price_column)
+
+    def feed_row(self, row, price_column=None):
+        texts = [w["text"] for w in row]
+        line = " ".join(texts)
+        self.lines.append(line)
+
+        # Continuación "inverted": la fila solo trae la cantidad
+        if self._pending_desc is not None:
+            pending, self._pending_desc = self._pending_desc, None
+            if len(row) == 1 and QTY.fullmatch(texts[0]):
+                self.items.append((texts[0], pending))
+                self.item_amounts.append((texts[0],) + self._pending_amounts)
+                return
+
+        if LINE_TOTALS.match(line):
+            self.totals_seen = True
+            declared = declared_total(line)
+            if declared:
+                self.declared_totals[declared[0]] = declared[1]
+            return
+
+        if _trailing_amounts(row) == 3:
+            self.amount_rows += 1
+
+        if price_column is not None:
+            # Columnas por coordenada: lo que queda antes del precio es
+            # cantidad/descripción, aunque la descripción traiga números
+            left = [w["text"] for w in row if not _in_amount_columns(w, price_column)]
+            amounts = [w["text"] for w in row if _in_amount_columns(w, price_column)]
+            if amounts and not all(MONEY.fullmatch(a) for a in amounts):
+                return
+        else:
+            n = _trailing_amounts(row)
+            left, amounts = texts[:len(texts) - n], texts[len(texts) - n:]
+
+        if not amounts or not left:
+            return
+
+        if len(left) >= 2 and QTY.fullmatch(left[0]):
+            self.items.append((left[0], " ".join(left[1:])))
+            if len(amounts) == 3:
+                self.item_amounts.append((left[0], amounts[0], amounts[1], amounts[2]))
+        elif len(amounts) == 3 and amounts[1] == "0.00":
+            self._pending_desc = " ".join(left)
+            self._pending_amounts = tuple(amounts)
+
+    def text(self):
+        return "\n".join(self.lines)
@@ -0,0 +1,143 @@
+import re
+
+# ==========================================
+# PARSER DE LÍNEAS DE FACTURA (una sola pasada)
+# ==========================================
+# Reemplaza los dos re.findall sobre todo el texto ("standard" e
+# "inverted"). Cada línea se clasifica una sola vez y los items salen en
+# orden, en un único recorrido lineal. El estado (descripción pendiente
+# de un item "inverted") sobrevive a los saltos de página.
+#
+# Diferencia con los findall anteriores: el patrón standard permitía que
+# el `\s+` tras la cantidad cruzara un salto de línea, así que en facturas
+# "inverted" la línea de cantidad se pegaba a la descripción del item
+# siguiente (o a la línea de totales) y se contaba dos veces.
+
+MONEY = r"\d{1,3}(?:,?\d{3})*\.\d{2}"
+
+MONEY_TOKEN = re.compile(MONEY)
+LINE_STANDARD = re.compile(r"(\d+\.\d{2})\s+(.*?)\s+" + MONEY)
+LINE_QTY_ONLY = re.compile(r"\s*(\d+\.\d{2})\s*")
+LINE_AMOUNTS_TAIL = re.compile(rf"\s+({MONEY})\s+({MONEY})\s+({MONEY})\s*")
+LINE_TOTALS = re.compile(r"\s*(?:sub\s*-?\s*total|total)\b", re.IGNORECASE)
+LINE_HEADER = re.compile(r"\s*(?:cliente:|no factura|dirección:|vendedor:)", re.IGNORECASE)
+
+# Tipos de línea de totales declarados por la factura
+TOTAL_QTY = "cantidad"
+SUBTOTAL = "subtotal"
+TOTAL = "total"
+
+# Clases de línea
+HEADER = "header"
+ITEM_STANDARD = "item-standard"
+ITEM_INVERTED = "item-inverted"
+INVERTED_DESC = "inverted-desc"
+TOTALS = "totals"
+NOISE = "noise"
+
+
+def trailing_amounts(line):
+    """[resto, precio, descuento, total] si la línea termina en tres importes."""
+    if not line[-1:].isdigit():
+        return None
+    parts = line.rsplit(None, 3)
+    if len(parts) == 4 and MONEY_TOKEN.fullmatch(parts[1]) and MONEY_TOKEN.fullmatch(parts[2]) and MONEY_TOKEN.fullmatch(parts[3]):
+        return parts
+    return None
+
+
+def declared_total(line):
+    """(tipo, importe) de una línea de totales, o None si no trae importe."""
+    amounts = MONEY_TOKEN.findall(line)
+    if not amounts:
+        return None
+    lowered = line.lower()
+    if "cant" in lowered or "unid" in lowered:
+        return TOTAL_QTY, amounts[-1]
+    if "sub" in lowered:
+        return SUBTOTAL, amounts[-1]
+    return TOTAL, amounts[-1]
+
+
+class InvoiceLineParser:
+    """Máquina de estados que recibe líneas y acumula (cantidad, descripción)."""
+
+    def __init__(self):
+        self.items = []
+        self.totals_seen = False
+        # Datos para conciliar contra los totales de la propia factura
+        self.amount_rows = 0       # filas que terminan en precio/descuento/total
+        self.item_amounts = []     # (cantidad, precio, descuento, total) por item
+        self.declared_totals = {}  # {tipo: importe} de las líneas de totales
+        self.truncated = 0         # descripciones cortadas por un número
+        self._pending_desc = None
+        self._pending_amounts = None
+
+    def feed_line(self, line):
+        first = line[:1]
+
+        if not line.strip():
+            # Las líneas en blanco no rompen un item "inverted" pendiente
+            return NOISE
+
+        if self._pending_desc is not None:
+            m = LINE_QTY_ONLY.fullmatch(line)
+            if m:
+                self.items.append((m.group(1), self._pending_desc))
+                self.item_amounts.append((m.group(1),) + self._pending_amounts)
+                self._pending_desc = None
+                return ITEM_INVERTED
+            self._pending_desc = None
+
+        if first.isdigit():
+            m = LINE_STANDARD.match(line)
+            if m:
+                qty, desc = m.groups()
+                self.items.append((qty, desc))
+                # Caso común: tras la descripción vienen justo los tres
+                # importes (un fullmatch sobre la cola de la línea)
+                tail = LINE_AMOUNTS_TAIL.fullmatch(line, m.end(2))
+                if tail:
+                    self.amount_rows += 1
+                    self.item_amounts.append((qty,) + tail.groups())
+                else:
+                    parts = trailing_amounts(line)
+                    if parts:
+                        # El regex corta la descripción en el primer importe:
+                        # "TV 55.00 PULGADAS ..." se queda en "TV"
+                        self.amount_rows += 1
+                        self.item_amounts.append((qty, parts[1], parts[2], parts[3]))
+                        self.truncated += 1
+                return ITEM_STANDARD
+
+        if LINE_TOTALS.match(line):
+            self.totals_seen = True
+            declared = declared_total(line)
+            if declared:
+                self.declared_totals[declared[0]] = declared[1]
+            return TOTALS
+
+        # "DESCRIPCIÓN  precio  0.00  total": se mira desde la derecha con
+        # split en vez de un regex con .+? que retrocede por toda la línea
+        parts = trailing_amounts(line)
+        if parts:
+            self.amount_rows += 1
+            if parts[2] == "0.00":
+                self._pending_desc = parts[0]
+                self._pending_amounts = (parts[1], parts[2], parts[3])
+                return INVERTED_DESC
+
+        if LINE_HEADER.match(line):
+            return HEADER
+
+        return NOISE
+
+    def feed_text(self, text):
+        for line in text.split("\n"):
+            self.feed_line(line)
+
+
+def parse_items(text):
+    parser = InvoiceLineParser()
+    parser.feed_text(text)
+    return parser.items
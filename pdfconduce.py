@@ -1,8 +1,6 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox, ttk
 import pandas as pd
-import pdfplumber
-import re
 import os
 import platform
 import json
@@ -10,14 +8,20 @@ import logging
 import subprocess
 import webbrowser
 from datetime import datetime
+from functools import lru_cache
+from types import SimpleNamespace
 
 # Importar librerías de ReportLab
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
+
+from documentos_pdf import logo_image
+from extraccion import extract_invoice
+from limpieza_modelos import DEFAULT_COLORS_TO_REMOVE, ModelNameNormalizer, map_unique
+from lote_facturas import extract_batch, list_pdfs_in_folder
 
 # --- CONFIGURACIÓN DE LOGGING ---
 logging.basicConfig(
@@ -39,17 +43,44 @@ PDF_THEMES = {
     "Dorado": "#F9E79F"
 }
 
-# Lista base de colores a eliminar (se puede extender en config)
-DEFAULT_COLORS_TO_REMOVE = [
-    'negro', 'rojo', 'verde', 'azul', 'blanco', 'gris', 'plateado',
-    'dorado', 'púrpura', 'morado', 'lavanda', 'rosa', 'rosado', 'amarillo', 'naranja', 'marrón',
-    'cyan', 'magenta', 'grafito', 'sierra', 'black', 'red', 'green',
-    'blue', 'white', 'gray', 'silver', 'gold', 'purple', 'pink',
-    'yellow', 'orange', 'brown', 'graphite', 'midnight blue',
-    'desert gold', 'titanium', 'oro', 'arena', 'pantone', 'tapestry',
-    'arabesque', 'navy', 'violet', 'mint', 'cream', 'beige', 'charcoal',
-    'blaze', 'pure', 'tendril', 'polar', 'deep', 'space', 'rose'
-]
+# --- ESTILOS DEL PDF ---
+# Compilados una vez por proceso y por tema (color de acento + color del
+# texto de cabecera), no en cada conduce generado
+@lru_cache(maxsize=None)
+def _pdf_styles(accent_hex, light_header):
+    styles = getSampleStyleSheet()
+    return SimpleNamespace(
+        normal=styles["Normal"],
+        title=ParagraphStyle('TitleCustom', parent=styles['Heading1'], alignment=2, fontSize=18, spaceAfter=5, textColor=colors.HexColor("#2C3E50")),
+        row=ParagraphStyle('Row', parent=styles['Normal'], fontSize=10, leading=11), # Fuente 10, Leading 11
+        total=ParagraphStyle('Tot', parent=styles['Normal'], alignment=2, fontSize=11, fontName='Helvetica-Bold'),
+        legal=ParagraphStyle('Legal', fontSize=7, leading=8, textColor=colors.black), # Fuente legal reducida a 7
+        header_table=TableStyle([('VALIGN', (0,0), (-1,-1), 'MIDDLE')]),
+        info_table=TableStyle([
+            ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,-1), 9), # Fuente 9
+            ('TEXTCOLOR', (0,0), (-1,-1), colors.HexColor("#34495E")),
+            ('LINEBELOW', (0,0), (-1,0), 1, colors.HexColor(accent_hex)),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 2), # Padding reducido
+        ]),
+        items_table=TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.HexColor(accent_hex)),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.black if light_header else colors.white),
+            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+            ('ALIGN', (0,1), (0,-1), 'CENTER'),
+            ('ALIGN', (2,0), (-1,-1), 'CENTER'),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0,0), (-1,0), 9), # Header tabla fuente 9
+            ('BOTTOMPADDING', (0,0), (-1,-1), 3), # Padding muy reducido
+            ('TOPPADDING', (0,0), (-1,-1), 3),
+            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+        ]),
+        signatures_table=TableStyle([
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('FONTSIZE', (0,0), (-1,-1), 9)
+        ]),
+    )
 
 class ConfigManager:
     """Maneja la carga y guardado de la configuración en JSON."""
@@ -97,6 +128,7 @@ class PDFProcessorApp(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.cfg = ConfigManager()
+        self.normalizer = ModelNameNormalizer(self.cfg.config.get("colors_to_remove", []))
 
         # --- Configuración de la ventana ---
         self.title("Generador de Conduces Pro")
@@ -189,6 +221,7 @@ class PDFProcessorApp(ctk.CTk):
         self.load_button = ctk.CTkButton(toolbar, text="🔄 Cargar Datos PDF", command=self.process_pdf_for_preview, state="disabled", fg_color="#2ecc71", text_color="white")
         self.load_button.pack(side="left", padx=5)
         
+        ctk.CTkButton(toolbar, text="📁 Lote (Carpeta)", command=self.process_folder_batch, fg_color="transparent", border_width=1).pack(side="left", padx=5)
         ctk.CTkButton(toolbar, text="+ Agregar Item Manual", command=self.add_manual_item, fg_color="#3498db").pack(side="left", padx=5)
         ctk.CTkButton(toolbar, text="✎ Editar", command=self.edit_selected_row, width=80).pack(side="left", padx=5)
         ctk.CTkButton(toolbar, text="🗑 Eliminar", command=self.delete_selected_row, width=80, fg_color="#e74c3c").pack(side="left", padx=5)
@@ -279,42 +312,21 @@ class PDFProcessorApp(ctk.CTk):
         self.update_idletasks()
         
         try:
-            raw_text = self.extract_text_from_pdf()
-            
-            # 1. Extracción de Metadatos (Cliente, Factura)
-            cliente_match = re.search(r"Cliente:\s*(.*?)(?=\s*(?:Dirección:|Vendedor:|$))", raw_text, re.DOTALL | re.IGNORECASE)
-            factura_match = re.search(r"No Factura\s*(\w+)", raw_text, re.IGNORECASE)
+            # Extracción compartida con la app web (cache por SHA-256 del PDF)
+            cliente, factura, found_items = extract_invoice(self.pdf_path)
             
-            if cliente_match:
+            # 1. Metadatos (Cliente, Factura)
+            if cliente:
                 self.destinatario_entry.delete(0, 'end')
-                self.destinatario_entry.insert(0, cliente_match.group(1).strip())
-            if factura_match:
+                self.destinatario_entry.insert(0, cliente)
+            if factura:
                 self.factura_entry.delete(0, 'end')
-                self.factura_entry.insert(0, factura_match.group(1).strip())
-
-            # 2. Extracción de Productos
-            # Pattern 1: Standard
-            found_items_1 = re.findall(r"^(\d+\.\d{2})\s+(.*?)(?=\s+\d{1,3}(?:,?\d{3})*\.\d{2})", raw_text, re.MULTILINE)
-            # Pattern 2: Inverted
-            found_items_2 = re.findall(r"^(.+?)\s+\d{1,3}(?:,?\d{3})*\.\d{2}\s+0\.00\s+\d{1,3}(?:,?\d{3})*\.\d{2}\n\s*(\d+\.\d{2})\s*$", raw_text, re.MULTILINE)
-            found_items_2 = [(qty, desc) for desc, qty in found_items_2] # Swap
-            
-            found_items = found_items_1 + found_items_2
-            
+                self.factura_entry.insert(0, factura)
+
             if not found_items:
                 messagebox.showinfo("Aviso", "No se encontraron productos automáticamente. Puede agregarlos manualmente.")
             
-            df = pd.DataFrame(found_items, columns=['Cantidad', 'Modelo'])
-            if not df.empty:
-                df['Cantidad'] = pd.to_numeric(df['Cantidad']).astype(int)
-                df['Modelo'] = df['Modelo'].apply(self.clean_model_name)
-                
-                # Agrupar
-                df = df[df['Modelo'] != ""]
-                df = df.groupby('Modelo', as_index=False)['Cantidad'].sum()
-                self.processed_data = df
-            else:
-                self.processed_data = pd.DataFrame(columns=['Cantidad', 'Modelo'])
+            self.processed_data = self.build_items_df(found_items)
 
             self.populate_treeview()
             self.check_buttons_state()
@@ -325,35 +337,72 @@ class PDFProcessorApp(ctk.CTk):
             messagebox.showerror("Error", f"Error procesando PDF: {e}")
             self.status_label.configure(text="Error al procesar.", text_color="red")
 
-    def extract_text_from_pdf(self):
-        with pdfplumber.open(self.pdf_path) as pdf:
-            return "\n".join(page.extract_text(x_tolerance=2, y_tolerance=2) or "" for page in pdf.pages)
+    def build_items_df(self, found_items):
+        df = pd.DataFrame(found_items, columns=['Cantidad', 'Modelo'])
+        if df.empty:
+            return pd.DataFrame(columns=['Cantidad', 'Modelo'])
+        
+        df['Cantidad'] = pd.to_numeric(df['Cantidad']).astype(int)
+        df['Modelo'] = map_unique(df['Modelo'], self.clean_model_name)
+        
+        # Agrupar
+        df = df[df['Modelo'] != ""]
+        return df.groupby('Modelo', as_index=False)['Cantidad'].sum()
+
+    def process_folder_batch(self):
+        """Procesa todas las facturas de una carpeta y genera un conduce por cada una."""
+        folder = filedialog.askdirectory(title="Carpeta con facturas PDF")
+        if not folder: return
+        pdf_paths = list_pdfs_in_folder(folder)
+        if not pdf_paths:
+            messagebox.showinfo("Lote", "No se encontraron PDFs en la carpeta.")
+            return
+
+        output_dir = filedialog.askdirectory(title="Carpeta de salida para los conduces", initialdir=self.cfg.config.get("last_output_dir") or folder)
+        if not output_dir: return
+        self.cfg.config["last_output_dir"] = output_dir
+        self.cfg.save_config()
+
+        def on_progress(done, total, result):
+            self.status_label.configure(text=f"Procesando {done}/{total}: {result['archivo']}", text_color="cyan")
+            self.update_idletasks()
+
+        try:
+            results = extract_batch(pdf_paths, progress_callback=on_progress)
+        except Exception as e:
+            logging.error(f"Error procesando lote: {e}")
+            messagebox.showerror("Error", f"Error procesando lote: {e}")
+            return
+
+        accent_color = PDF_THEMES.get(self.cfg.config.get("pdf_theme", "Azul Clásico"), DEFAULT_THEME_COLOR)
+        generated, failed = 0, []
+        for result in results:
+            df = self.build_items_df(result['items']) if not result['error'] else None
+            if df is None or df.empty:
+                failed.append(result['archivo'])
+                continue
+            base_name = result['factura'] or os.path.splitext(result['archivo'])[0]
+            try:
+                self.create_pdf_pro(result['cliente'], result['factura'], self.cfg.config["logo_path"],
+                                    os.path.join(output_dir, f"Conduce_{base_name}.pdf"), accent_color, data=df)
+                generated += 1
+            except Exception as e:
+                logging.error(f"Error generando conduce de {result['archivo']}: {e}")
+                failed.append(result['archivo'])
+
+        self.status_label.configure(text=f"Lote terminado: {generated} conduces generados.", text_color="lightgreen")
+        summary = f"Conduces generados: {generated} de {len(results)}"
+        if failed:
+            summary += "\n\nSin productos o con error:\n" + "\n".join(failed[:20])
+        messagebox.showinfo("Lote", summary)
+        if generated:
+            self.open_file(output_dir)
 
     def clean_model_name(self, model_name):
-        model = model_name
-        
-        # 1. Comprobar diccionario de correcciones aprendidas
-        # Buscamos coincidencias aproximadas o exactas? Por ahora exactas pre-limpieza o post-limpieza
-        # Haremos una limpieza básica, y luego checamos si hay rename.
-        
-        # Limpieza básica regex
-        model = re.sub(r'\s*5g\b', '', model, flags=re.IGNORECASE)
-        model = re.sub(r'\s*\d+\.?\d*\"+\s*$', '', model, flags=re.IGNORECASE)
-        
-        colors = self.cfg.config.get("colors_to_remove", [])
-        color_pattern = r'\b(' + '|'.join(map(re.escape, colors)) + r')\b'
-        model = re.sub(color_pattern, '', model, flags=re.IGNORECASE)
-        
-        model = re.sub(r'\(\s*\)', '', model)
-        model = re.sub(r'\s+XT\w+-\w+', '', model, flags=re.IGNORECASE)
-        model = re.sub(r'\s+A\w+L\b', '', model, flags=re.IGNORECASE)
-        # Otros cleanups del usuario anterior
-        model = re.sub(r'\s+SM-\w+\b', '', model, flags=re.IGNORECASE)
-        model = re.sub(r'\bBLADE\b', '', model, flags=re.IGNORECASE)
-        model = re.sub(r'\s+Z\d+\b', '', model, flags=re.IGNORECASE)
-        model = re.sub(r'(\d+[GT]B)\b.*', r'\1', model, flags=re.IGNORECASE)
-        
-        model = re.sub(r'\s{2,}', ' ', model).strip()
+        # 1. Limpieza regex (compilada una vez; solo se recompila si cambia
+        #    la lista de colores de la configuración)
+        self.normalizer.set_colors(self.cfg.config.get("colors_to_remove", []))
+        model = self.normalizer(model_name)
 
         # 2. Aplicar corrección aprendida (si existe)
         if model in self.cfg.config["learned_corrections"]:
@@ -506,40 +555,28 @@ class PDFProcessorApp(ctk.CTk):
             logging.error(f"Error generando PDF: {e}")
             messagebox.showerror("Error Critico", f"No se pudo generar el PDF: {e}")
 
-    def create_pdf_pro(self, destinatario, factura, logo_path, filename, accent_hex):
+    def create_pdf_pro(self, destinatario, factura, logo_path, filename, accent_hex, data=None):
         # MÁRGENES REDUCIDOS para aprovechar la hoja al máximo
         doc = SimpleDocTemplate(filename, pagesize=letter, 
                                 leftMargin=0.4*inch, rightMargin=0.4*inch, 
                                 topMargin=0.3*inch, bottomMargin=0.3*inch)
         story = []
-        styles = getSampleStyleSheet()
+        styles = _pdf_styles(accent_hex, self._is_light_color(accent_hex))
 
         # 1. Cabecera Compacta
-        logo = Paragraph("", styles["Normal"])
+        logo = Paragraph("", styles.normal)
         if logo_path and os.path.exists(logo_path):
             try:
-                img = Image(logo_path)
-                # Ajuste dinámico de tamaño (Más pequeño para ahorrar espacio)
-                ir = ImageReader(logo_path)
-                iw, ih = ir.getSize()
-                aspect = ih / float(iw)
-                target_w = 1.5 * inch # Reducido de 2.0
-                target_h = target_w * aspect
-                if target_h > 0.8 * inch: # Reducido de 1.2
-                    target_h = 0.8 * inch
-                    target_w = target_h / aspect
-                img.drawWidth = target_w
-                img.drawHeight = target_h
-                logo = img
+                # Copia reducida y cacheada del logo (máx. 1.5in x 0.8in)
+                logo = logo_image(logo_path)
             except: pass
 
         # Título más pequeño y con menos espacio
-        title_style = ParagraphStyle('TitleCustom', parent=styles['Heading1'], alignment=2, fontSize=18, spaceAfter=5, textColor=colors.HexColor("#2C3E50"))
-        title = Paragraph("CONDUCE DE ENTREGA", title_style)
+        title = Paragraph("CONDUCE DE ENTREGA", styles.title)
         
         # Tabla de cabecera ajustada
         header_table = Table([[logo, title]], colWidths=[2.5*inch, 5.0*inch])
-        header_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'MIDDLE')]))
+        header_table.setStyle(styles.header_table)
         story.append(header_table)
         story.append(Spacer(1, 0.1*inch)) # Spacer reducido
 
@@ -549,50 +586,28 @@ class PDFProcessorApp(ctk.CTk):
             [f"CLIENTE: {destinatario}", ""]
         ]
         info_table = Table(info_data, colWidths=[5.2*inch, 2.5*inch])
-        info_table.setStyle(TableStyle([
-            ('FONTNAME', (0,0), (-1,-1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,-1), 9), # Fuente 9
-            ('TEXTCOLOR', (0,0), (-1,-1), colors.HexColor("#34495E")),
-            ('LINEBELOW', (0,0), (-1,0), 1, colors.HexColor(accent_hex)),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 2), # Padding reducido
-        ]))
+        info_table.setStyle(styles.info_table)
         story.append(info_table)
         story.append(Spacer(1, 0.1*inch)) # Spacer reducido
 
         # 3. Lista de Productos Compacta
-        data = self.processed_data.sort_values(by="Modelo")
-        table_data = [[Paragraph("CANT", styles["Normal"]), Paragraph("DESCRIPCIÓN DEL MODELO / EQUIPO", styles["Normal"]), Paragraph("VERIF.", styles["Normal"])]]
-        
-        # Estilos filas más compactos
-        row_style = ParagraphStyle('Row', parent=styles['Normal'], fontSize=10, leading=11) # Fuente 10, Leading 11
+        data = (self.processed_data if data is None else data).sort_values(by="Modelo")
+        table_data = [[Paragraph("CANT", styles.normal), Paragraph("DESCRIPCIÓN DEL MODELO / EQUIPO", styles.normal), Paragraph("VERIF.", styles.normal)]]
         
         checkbox_symbol = "[      ]" 
         
         for _, row in data.iterrows():
-            table_data.append([str(row['Cantidad']), Paragraph(row['Modelo'], row_style), checkbox_symbol])
+            table_data.append([str(row['Cantidad']), Paragraph(row['Modelo'], styles.row), checkbox_symbol])
         
         t = Table(table_data, colWidths=[0.8*inch, 6.1*inch, 0.8*inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor(accent_hex)),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.black if self._is_light_color(accent_hex) else colors.white),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('ALIGN', (0,1), (0,-1), 'CENTER'),
-            ('ALIGN', (2,0), (-1,-1), 'CENTER'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,0), 9), # Header tabla fuente 9
-            ('BOTTOMPADDING', (0,0), (-1,-1), 3), # Padding muy reducido
-            ('TOPPADDING', (0,0), (-1,-1), 3),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ]))
+        t.setStyle(styles.items_table)
         story.append(t)
 
         # 4. Total compactado
         if self.show_total_var.get():
             story.append(Spacer(1, 0.05*inch))
             total = data['Cantidad'].sum()
-            tot_style = ParagraphStyle('Tot', parent=styles['Normal'], alignment=2, fontSize=11, fontName='Helvetica-Bold')
-            story.append(Paragraph(f"TOTAL UNIDADES: {total}", tot_style))
+            story.append(Paragraph(f"TOTAL UNIDADES: {total}", styles.total))
 
         # 5. Footer Legal y Firmas (Pegado al contenido)
         story.append(Spacer(1, 0.2*inch)) # Spacer reducido
@@ -602,17 +617,13 @@ class PDFProcessorApp(ctk.CTk):
         Al firmar como "Recibido Conforme", el cliente acepta las políticas de la empresa y certifica que ha recibido la mercancía detallada.<br/>
         Cualquier reclamo debe realizarse antes de retirar la mercancía. No nos hacemos responsables tras la salida.
         """
-        # Fuente legal reducida a 7
-        story.append(Paragraph(note_text, ParagraphStyle('Legal', fontSize=7, leading=8, textColor=colors.black)))
+        story.append(Paragraph(note_text, styles.legal))
         
         story.append(Spacer(1, 0.3*inch))
         
         sig_data = [["_______________________", "_______________________"], ["Despachado por", "RECIBIDO CONFORME"]]
         sig_table = Table(sig_data, colWidths=[3.75*inch, 3.75*inch])
-        sig_table.setStyle(TableStyle([
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('FONTSIZE', (0,0), (-1,-1), 9)
-        ]))
+        sig_table.setStyle(styles.signatures_table)
         story.append(sig_table)
 
         doc.build(story)
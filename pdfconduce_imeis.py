@@ -2,35 +2,70 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox, ttk
 import pandas as pd
-import pdfplumber
-import re
 import os
 import platform
 from datetime import datetime
+from functools import lru_cache
+from types import SimpleNamespace
 
 # Importar las librerías necesarias de ReportLab para crear el PDF
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, KeepTogether
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, KeepTogether
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
+
+from documentos_pdf import IMEI_LAYOUT_TEXT, IMEI_LAYOUT_GRID, split_imeis, imei_section_table, logo_image
+from extraccion import extract_invoice
+from limpieza_modelos import DEFAULT_COLORS_TO_REMOVE, ModelNameNormalizer
 
 # --- Nombres de archivos de configuración y salida ---
 OUTPUT_FILE = 'conduce_imeis.pdf'
 CONFIG_FILE = 'app_config.txt'
 
-# --- Lista de colores a eliminar (Misma que original) ---
-COLORS_TO_REMOVE = [
-    'negro', 'rojo', 'verde', 'azul', 'blanco', 'gris', 'plateado',
-    'dorado', 'púrpura', 'morado', 'lavanda', 'rosa', 'rosado', 'amarillo', 'naranja', 'marrón',
-    'cyan', 'magenta', 'grafito', 'sierra', 'black', 'red', 'green',
-    'blue', 'white', 'gray', 'silver', 'gold', 'purple', 'pink',
-    'yellow', 'orange', 'brown', 'graphite', 'midnight blue',
-    'desert gold', 'titanium', 'oro', 'arena', 'pantone', 'tapestry',
-    'arabesque', 'navy', 'violet', 'mint', 'cream', 'beige', 'charcoal',
-    'blaze', 'pure', 'tendril', 'polar', 'deep', 'space', 'rose'
-]
+# Normalizador de modelos compartido (reglas compiladas una vez)
+_model_normalizer = ModelNameNormalizer(DEFAULT_COLORS_TO_REMOVE)
+
+# Color de las cabeceras del conduce
+ACCENT_COLOR = '#BDE5F8'
+
+# Estilos del PDF, compilados una sola vez por proceso
+@lru_cache(maxsize=None)
+def _pdf_styles():
+    styles = getSampleStyleSheet()
+    return SimpleNamespace(
+        normal=styles['Normal'],
+        bold=ParagraphStyle('Bold', parent=styles['Normal'], fontName='Helvetica-Bold'),
+        title=ParagraphStyle('Title', parent=styles['h1'], alignment=1, fontSize=16, spaceAfter=20),
+        h2_center=ParagraphStyle('H2Center', parent=styles['Normal'], fontSize=10, alignment=1, textColor=colors.black),
+        note=ParagraphStyle('Note', parent=styles['Normal'], fontSize=7),
+        header_table=TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('ALIGN', (1,0), (1,0), 'RIGHT'),
+        ]),
+        client_table=TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
+        ]),
+        title_goods_table=TableStyle([
+            ('BACKGROUND', (0,0), (-1,-1), colors.HexColor(ACCENT_COLOR)),
+            ('BOX', (0,0), (-1,-1), 1, colors.black),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ]),
+        products_table=TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey), # Subheader gris
+            ('ALIGN', (0,0), (-1,0), 'CENTER'), # Centrar titulos
+            ('ALIGN', (0,1), (0,-1), 'CENTER'), # Centrar cantidades
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('GRID', (0,0), (-1,-1), 1, colors.black),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ]),
+        signatures_table=TableStyle([
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('LEFTPADDING', (0,0), (-1,-1), 20),
+            ('RIGHTPADDING', (0,0), (-1,-1), 20),
+        ]),
+    )
 
 class PDFProcessorApp(ctk.CTk):
     def __init__(self):
@@ -78,6 +113,10 @@ class PDFProcessorApp(ctk.CTk):
         self.factura_entry = ctk.CTkEntry(info_frame, placeholder_text="Se completará desde el PDF...")
         self.factura_entry.grid(row=1, column=1, padx=(0, 20), pady=5, sticky="ew")
 
+        # Grilla compacta: IMEIs en columnas monoespaciadas (menos páginas)
+        self.imei_grid_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(info_frame, text="IMEIs en grilla compacta", variable=self.imei_grid_var).grid(row=2, column=1, padx=(0, 20), pady=5, sticky="w")
+
         # --- FRAME 3: BOTÓN DE CARGA ---
         self.load_button = ctk.CTkButton(self, text="Cargar Datos del PDF a la Vista Previa", command=self.process_pdf_for_preview, state="disabled")
         self.load_button.grid(row=2, column=0, padx=20, pady=10, sticky="ew")
@@ -186,28 +225,16 @@ class PDFProcessorApp(ctk.CTk):
         self.update_idletasks()
 
         try:
-            raw_text = self.extract_text_from_pdf()
-            
-            # --- Extracción básica de Cliente/Factura (igual que v1) ---
-            cliente_match = re.search(r"Cliente:\s*(.*?)(?=\s*(?:Dirección:|Vendedor:|$))", raw_text, re.DOTALL | re.IGNORECASE)
-            factura_match = re.search(r"No Factura\s*(\w+)", raw_text, re.IGNORECASE)
+            # Extracción compartida con la app web (cache por SHA-256 del PDF)
+            cliente, factura, found_items = extract_invoice(self.pdf_path)
 
-            if cliente_match:
+            if cliente:
                 self.destinatario_entry.delete(0, 'end')
-                self.destinatario_entry.insert(0, cliente_match.group(1).strip())
-            if factura_match:
+                self.destinatario_entry.insert(0, cliente)
+            if factura:
                 self.factura_entry.delete(0, 'end')
-                self.factura_entry.insert(0, factura_match.group(1).strip())
+                self.factura_entry.insert(0, factura)
 
-            # --- Extracción de Productos (Lógica de limpieza v1) ---
-            product_pattern = re.compile(r"^(\d+\.\d{2})\s+(.*?)(?=\s+\d{1,3}(?:,?\d{3})*\.\d{2})", re.MULTILINE)
-            found_items_1 = product_pattern.findall(raw_text)
-            
-            type2_pattern = re.compile(r"^(.+?)\s+\d{1,3}(?:,?\d{3})*\.\d{2}\s+0\.00\s+\d{1,3}(?:,?\d{3})*\.\d{2}\n\s*(\d+\.\d{2})\s*$", re.MULTILINE)
-            found_items_2 = [(qty, desc) for desc, qty in type2_pattern.findall(raw_text)]
-            
-            found_items = found_items_1 + found_items_2
-            
             if not found_items:
                 messagebox.showinfo("Sin Resultados", "No se encontraron productos.")
                 self.status_label.configure(text="No se encontraron datos.")
@@ -217,21 +244,8 @@ class PDFProcessorApp(ctk.CTk):
             df['Cantidad'] = pd.to_numeric(df['Cantidad']).astype(int)
 
             # --- Limpieza de Nombres de Modelos ---
-            df['Modelo'] = df['Modelo'].str.replace(r'\s*5g\b', '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\s*\d+\.?\d*\"+\s*$', '', regex=True, flags=re.IGNORECASE).str.strip()
-            color_pattern = r'\b(' + '|'.join(COLORS_TO_REMOVE) + r')\b'
-            df['Modelo'] = df['Modelo'].str.replace(color_pattern, '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\(\s*\)', '', regex=True).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\s+XT\w+-\w+', '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\s+A\w+L\b', '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\s+S\w+B\b', '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\s+PB\w+\b', '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\s+T\d+[A-Z]\b', '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\s+SM-\w+\b', '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\bBLADE\b', '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\s+Z\d+\b', '', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'(\d+[GT]B)\b.*', r'\1', regex=True, flags=re.IGNORECASE).str.strip()
-            df['Modelo'] = df['Modelo'].str.replace(r'\s{2,}', ' ', regex=True).str.strip()
+            # Mismas reglas que app.py y pdfconduce.py, una vez por modelo distinto
+            df['Modelo'] = _model_normalizer.normalize_series(df['Modelo'])
 
             self.processed_data = df.groupby('Modelo', as_index=False)['Cantidad'].sum()
             self.imeis_data = {} # Resetear IMEIs al cargar nuevo PDF
@@ -244,10 +258,6 @@ class PDFProcessorApp(ctk.CTk):
             messagebox.showerror("Error", f"Error al procesar PDF: {e}")
             self.status_label.configure(text="Error de procesamiento", text_color="red")
 
-    def extract_text_from_pdf(self):
-        with pdfplumber.open(self.pdf_path) as pdf:
-            return "\n".join(page.extract_text(x_tolerance=2, y_tolerance=2) or "" for page in pdf.pages)
-
     def populate_treeview(self):
         self.clear_treeview()
         sorted_data = self.processed_data.sort_values(by="Modelo")
@@ -418,7 +428,8 @@ class PDFProcessorApp(ctk.CTk):
         if not file_path: return
 
         try:
-            self.create_pdf_conduce(destinatario, factura_num, self.logo_path, file_path)
+            imei_layout = IMEI_LAYOUT_GRID if self.imei_grid_var.get() else IMEI_LAYOUT_TEXT
+            self.create_pdf_conduce(destinatario, factura_num, self.logo_path, file_path, imei_layout)
             
             if messagebox.askyesno("Éxito", f"PDF generado: {os.path.basename(file_path)}\n¿Abrir ahora?"):
                 if platform.system() == "Windows": os.startfile(file_path)
@@ -427,39 +438,34 @@ class PDFProcessorApp(ctk.CTk):
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo generar el PDF: {e}")
 
-    def create_pdf_conduce(self, destinatario, factura_num, logo_path, output_file):
+    def create_pdf_conduce(self, destinatario, factura_num, logo_path, output_file, imei_layout=IMEI_LAYOUT_TEXT):
         doc = SimpleDocTemplate(output_file, pagesize=letter, leftMargin=inch, rightMargin=inch, topMargin=0.5*inch, bottomMargin=0.5*inch)
-        styles = getSampleStyleSheet()
+        styles = _pdf_styles()
         story = []
 
         # --- HEADER ---
         if logo_path and os.path.exists(logo_path):
             try:
-                img_reader = ImageReader(logo_path)
-                w, h = img_reader.getSize()
-                aspect = h / float(w)
-                logo = Image(logo_path, width=1.5*inch, height=1.5*inch*aspect, hAlign='LEFT')
+                # Copia reducida y cacheada, 1.5in de ancho
+                logo = logo_image(logo_path, max_height=None, hAlign='LEFT')
             except:
-                logo = Paragraph("LOGO ERROR", styles['Normal'])
+                logo = Paragraph("LOGO ERROR", styles.normal)
         else:
-            logo = Paragraph("", styles['Normal'])
+            logo = Paragraph("", styles.normal)
 
-        title = Paragraph("CONDUCE", ParagraphStyle('Title', parent=styles['h1'], alignment=1, fontSize=16, spaceAfter=20))
+        title = Paragraph("CONDUCE", styles.title)
         
         # Tabla Header (Logo + Titulo/Datos)
         # Usamos una tabla simple alineada
         header_data = [[logo, title]]
         t_header = Table(header_data, colWidths=[2.5*inch, 4*inch])
-        t_header.setStyle(TableStyle([
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('ALIGN', (1,0), (1,0), 'RIGHT'),
-        ]))
+        t_header.setStyle(styles.header_table)
         story.append(t_header)
         story.append(Spacer(1, 0.2*inch))
 
         # --- DATOS DEL CLIENTE ---
-        style_bold = ParagraphStyle('Bold', parent=styles['Normal'], fontName='Helvetica-Bold')
-        style_normal = styles['Normal']
+        style_bold = styles.bold
+        style_normal = styles.normal
         
         client_data = [
             [Paragraph("<b>FECHA:</b>", style_normal), Paragraph(datetime.now().strftime("%d/%m/%Y"), style_normal)],
@@ -468,24 +474,17 @@ class PDFProcessorApp(ctk.CTk):
         ]
         
         t_client = Table(client_data, colWidths=[1.5*inch, 5*inch])
-        t_client.setStyle(TableStyle([
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-            ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-        ]))
+        t_client.setStyle(styles.client_table)
         story.append(t_client)
         story.append(Spacer(1, 0.3*inch))
 
         # --- TABLA DE MERCANCIA ---
         # Header azul
         Story_Goods = [
-            [Paragraph("<b>DETALLE DE MERCANCÍA</b>", ParagraphStyle('H2Center', parent=styles['Normal'], fontSize=10, alignment=1, textColor=colors.black))]
+            [Paragraph("<b>DETALLE DE MERCANCÍA</b>", styles.h2_center)]
         ]
         t_title_goods = Table(Story_Goods, colWidths=[6.5*inch])
-        t_title_goods.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#BDE5F8')),
-            ('BOX', (0,0), (-1,-1), 1, colors.black),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ]))
+        t_title_goods.setStyle(styles.title_goods_table)
         story.append(t_title_goods)
         
         # Columnas
@@ -495,59 +494,20 @@ class PDFProcessorApp(ctk.CTk):
         for _, row in sorted_df.iterrows():
             prod_data.append([str(row['Cantidad']), Paragraph(row['Modelo'], style_normal)])
             
-        t_products = Table(prod_data, colWidths=[1.5*inch, 5*inch])
-        t_products.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey), # Subheader gris
-            ('ALIGN', (0,0), (-1,0), 'CENTER'), # Centrar titulos
-            ('ALIGN', (0,1), (0,-1), 'CENTER'), # Centrar cantidades
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('GRID', (0,0), (-1,-1), 1, colors.black),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ]))
+        t_products = LongTable(prod_data, colWidths=[1.5*inch, 5*inch], repeatRows=1)
+        t_products.setStyle(styles.products_table)
         story.append(t_products)
         story.append(Spacer(1, 0.3*inch))
 
         # --- TABLA DE IMEIS ---
         # Solo si hay algún IMEI registrado
         if any(self.imeis_data.values()):
-            # Header Title
-            Story_Imeis_Title = [
-                [Paragraph("<b>DETALLE DE IMEIS</b>", ParagraphStyle('H2Center', parent=styles['Normal'], fontSize=10, alignment=1, textColor=colors.black))]
-            ]
-            t_title_imeis = Table(Story_Imeis_Title, colWidths=[6.5*inch])
-            t_title_imeis.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,-1), colors.HexColor('#BDE5F8')),
-                ('BOX', (0,0), (-1,-1), 1, colors.black),
-                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ]))
-            story.append(t_title_imeis)
-
-            # Contenido de IMEIs
-            # Lo haremos como una tabla de 1 columna con multiples filas, una por modelo
-            imei_rows = []
-            
-            # Estilo pequeño para los IMEIs
-            style_imeis = ParagraphStyle('Imeis', parent=styles['Normal'], fontSize=8, leading=10)
-            
-            for _, row in sorted_df.iterrows():
-                modelo = row['Modelo']
-                if modelo in self.imeis_data and self.imeis_data[modelo].strip():
-                    imei_text = self.imeis_data[modelo]
-                    # Formato: "Modelo: imeis..."
-                    # Usamos negrita para el modelo
-                    full_text = f"<b>{modelo}:</b> {imei_text}"
-                    p = Paragraph(full_text, style_imeis)
-                    imei_rows.append([p])
-            
-            if imei_rows:
-                t_imeis_content = Table(imei_rows, colWidths=[6.5*inch])
-                t_imeis_content.setStyle(TableStyle([
-                    ('GRID', (0,0), (-1,-1), 1, colors.black),
-                    ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                    ('topPadding', (0,0), (-1,-1), 3),
-                    ('bottomPadding', (0,0), (-1,-1), 3),
-                ]))
-                story.append(t_imeis_content)
+            # Una sección por modelo con IMEIs (texto corrido o grilla compacta)
+            title_imeis = Paragraph("<b>DETALLE DE IMEIS</b>", styles.h2_center)
+            sections = [(row['Modelo'], split_imeis(self.imeis_data.get(row['Modelo']))) for _, row in sorted_df.iterrows()]
+            sections = [(modelo, imeis) for modelo, imeis in sections if imeis]
+            if sections:
+                story.append(imei_section_table(sections, 6.5*inch, title_imeis, colors.HexColor(ACCENT_COLOR), 1, colors.black, imei_layout))
             
             story.append(Spacer(1, 0.3*inch))
 
@@ -558,7 +518,7 @@ class PDFProcessorApp(ctk.CTk):
         # (Usando el texto legal corto por ahora, se puede expandir si el OCR lo permite o usar el genérico)
         note_text = """<b>Nota Importante:</b> Al firmar como "Recibido Conforme", el cliente acepta las políticas de la empresa y certifica que ha recibido la mercancía detallada en este conduce, con los seriales/IMEIs aquí descritos. La mercancía viaja por cuenta y riesgo del comprador."""
         
-        story.append(Paragraph(note_text, ParagraphStyle('Note', parent=styles['Normal'], fontSize=7)))
+        story.append(Paragraph(note_text, styles.note))
         story.append(Spacer(1, 0.6*inch))
 
         # Firmas
@@ -567,11 +527,7 @@ class PDFProcessorApp(ctk.CTk):
             ["Despachado por", "RECIBIDO CONFORME Y CONTADO"]
         ]
         t_sigs = Table(sig_data, colWidths=[3*inch, 3*inch])
-        t_sigs.setStyle(TableStyle([
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('LEFTPADDING', (0,0), (-1,-1), 20),
-            ('RIGHTPADDING', (0,0), (-1,-1), 20),
-        ]))
+        t_sigs.setStyle(styles.signatures_table)
         story.append(t_sigs)
 
         doc.build(story)
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos, pero se sigue fusionando
+    fcntl = None
+
+from parser_lineas import InvoiceLineParser, parse_items, LINE_HEADER, LINE_TOTALS, HEADER, ITEM_STANDARD, ITEM_INVERTED, INVERTED_DESC, TOTALS
+
+# ==========================================
+# PLANTILLAS DE FACTURA (extracción por regiones)
+# ==========================================
+# Para cada layout conocido se aprenden, en la primera página, la franja de
+# la cabecera (Cliente / No Factura) y la de la tabla de items. Las facturas
+# siguientes del mismo layout solo extraen texto de page.crop(bbox) de esas
+# franjas, saltándose logos, membretes y el texto legal del pie. Si el
+# resultado no cuadra se vuelve a la extracción de página completa.
+# Cada layout se aprende una sola vez: si una factura no cuadra con su
+# plantilla no se vuelve a aprender (las facturas de largo distinto se
+# pisarían la plantilla unas a otras y ninguna acertaría).
+# Cada plantilla guarda además el nivel de parser ('tier') que concilió
+# con los totales la última vez (ver extraccion.parse_invoice_auto).
+#
+# El registro se guarda junto a pdfconduce_config.json. Varios procesos
+# (los workers de lote_facturas) pueden aprender a la vez: cada cambio se
+# fusiona con lo que hay en disco bajo un lock, en vez de reescribir el
+# archivo con la copia en memoria de un solo proceso.
+
+TEMPLATES_FILE = 'plantillas_factura.json'
+
+# Franja superior usada como "huella" del layout (membrete del emisor)
+FINGERPRINT_BAND = 0.15
+# Margen vertical alrededor de las regiones aprendidas (puntos)
+REGION_PADDING = 6
+# Líneas de pie de página: por debajo de esta fracción de la página
+FOOTER_ZONE = 0.75
+
+_DIGITS = re.compile(r'\d')
+_TEXT_SETTINGS = dict(x_tolerance=2, y_tolerance=2)
+
+
+def _clamp_bbox(page, x0, top, x1, bottom):
+    px0, ptop, px1, pbottom = page.bbox
+    return (max(px0, x0), max(ptop, top), min(px1, x1), min(pbottom, bottom))
+
+
+def layout_fingerprint(page):
+    """Huella del layout: tamaño de página + texto del membrete sin dígitos."""
+    band = page.crop(_clamp_bbox(page, 0, 0, page.width, page.height * FINGERPRINT_BAND))
+    text = band.extract_text(**_TEXT_SETTINGS) or ""
+    normalized = _DIGITS.sub('#', " ".join(text.split())).lower()
+    raw = f"{round(page.width)}x{round(page.height)}|{normalized}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def learn_regions(page):
+    """Calcula las regiones de cabecera e items a partir de una página ya leída.
+
+    Devuelve un dict con 'header_bbox' y 'items_bbox', o None si la página
+    no tiene ambas cosas (p. ej. una portada sin items).
+    """
+    lines = page.extract_text_lines(return_chars=False, **_TEXT_SETTINGS)
+    parser = InvoiceLineParser()
+
+    header_top = header_bottom = None
+    items_top = items_bottom = None
+    footer_top = None
+    totals_seen = False
+
+    for line in lines:
+        kind = parser.feed_line(line["text"])
+        if kind == HEADER:
+            header_top = line["top"] if header_top is None else min(header_top, line["top"])
+            header_bottom = line["bottom"] if header_bottom is None else max(header_bottom, line["bottom"])
+        elif kind in (ITEM_STANDARD, ITEM_INVERTED, INVERTED_DESC):
+            if items_top is None:
+                items_top = line["top"]
+            items_bottom = line["bottom"]
+        elif kind == TOTALS and items_top is not None:
+            items_bottom = line["bottom"]
+            totals_seen = True
+        elif totals_seen and footer_top is None and line["top"] >= page.height * FOOTER_ZONE:
+            # Primer bloque anclado al pie tras los totales: texto legal
+            footer_top = line["top"]
+
+    if header_top is None or items_top is None or not parser.items:
+        return None
+
+    # La tabla crece con el número de items: la región llega hasta el pie
+    # (o hasta el final de la página si no se detectó pie)
+    items_end = footer_top - REGION_PADDING if footer_top is not None else page.height
+    return {
+        "page_size": [round(page.width, 1), round(page.height, 1)],
+        "header_bbox": [0, header_top - REGION_PADDING, page.width, header_bottom + REGION_PADDING],
+        "items_bbox": [0, items_top - REGION_PADDING, page.width, max(items_end, items_bottom + REGION_PADDING)],
+    }
+
+
+class TemplateRegistry:
+    """Registro persistente {huella_de_layout: regiones}."""
+
+    def __init__(self, path=TEMPLATES_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._templates = None
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.error(f"Error cargando plantillas de factura: {e}")
+            return {}
+
+    def _load(self):
+        if self._templates is None:
+            self._templates = self._read()
+
+    def _save(self, fingerprint, fields):
+        # Relee el archivo bajo el lock y aplica solo este cambio: lo que
+        # aprendieron otros procesos mientras tanto no se pierde
+        try:
+            with open(f"{self.path}.lock", 'w') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                templates = self._read()
+                templates.setdefault(fingerprint, {}).update(fields)
+                tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(templates, f, indent=4, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            self._templates = templates
+        except Exception as e:
+            logging.error(f"Error guardando plantillas de factura: {e}")
+
+    def get(self, fingerprint):
+        with self._lock:
+            self._load()
+            return self._templates.get(fingerprint)
+
+    def update(self, fingerprint, **fields):
+        with self._lock:
+            self._load()
+            self._templates.setdefault(fingerprint, {}).update(fields)
+            self._save(fingerprint, fields)
+
+    def extract_first_page(self, page, fingerprint):
+        """Texto de la página usando solo las regiones de la plantilla.
+
+        Devuelve None si no hay plantilla para este layout o si el texto
+        recortado no trae cabecera e items (hay que leer la página entera).
+        """
+        template = self.get(fingerprint)
+        if not template or not template.get("items_bbox"):
+            return None
+        if template["page_size"] != [round(page.width, 1), round(page.height, 1)]:
+            return None
+
+        header_bbox = list(template["header_bbox"])
+        items_bbox = list(template["items_bbox"])
+        # Con el margen las dos franjas pueden solaparse: se parten a la
+        # mitad para que la primera línea de items no salga dos veces
+        if header_bbox[3] > items_bbox[1]:
+            cut = (header_bbox[3] + items_bbox[1]) / 2
+            header_bbox[3] = items_bbox[1] = cut
+
+        header_text = page.crop(_clamp_bbox(page, *header_bbox)).extract_text(**_TEXT_SETTINGS) or ""
+        items_text = page.crop(_clamp_bbox(page, *items_bbox)).extract_text(**_TEXT_SETTINGS) or ""
+
+        if not any(LINE_HEADER.match(line) for line in header_text.split("\n")):
+            return None
+        if not parse_items(items_text):
+            return None
+        # La franja aprendida termina donde empezaba el pie de la primera
+        # factura de este layout (lo que solo se corta si ahí hubo totales).
+        # En una factura más larga las filas pueden seguir por esa zona: si
+        # los totales no quedaron dentro del recorte, página completa.
+        footer_cut = items_bbox[3] < page.height - REGION_PADDING
+        if footer_cut and not any(LINE_TOTALS.match(line) for line in items_text.split("\n")):
+            return None
+        return header_text + "\n" + items_text
+
+    def learn(self, page, fingerprint):
+        """Aprende las regiones de un layout que aún no tiene plantilla.
+
+        Devuelve las regiones aprendidas, o None si el layout ya tenía
+        plantilla o la página no trae cabecera e items.
+        """
+        template = self.get(fingerprint)
+        if template is not None and "items_bbox" in template:
+            return None
+        regions = learn_regions(page)
+        # Sin regiones también se recuerda (items_bbox None): así no se
+        # vuelve a recorrer la página en cada factura de este layout
+        self.update(fingerprint, **(regions or {"items_bbox": None}))
+        return regions
@@ -6,14 +6,17 @@ import os
 import platform
 import shutil
 from datetime import datetime
+from functools import lru_cache
+from types import SimpleNamespace
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
 import re
 
+from documentos_pdf import IMEIS_PER_ROW, split_lines, chunked, block_styles, logo_image
+
 # --- Configuración y Constantes ---
 OUTPUT_FILE = 'recibo_garantia.pdf'
 CONFIG_FILE = 'garantia_config.txt'
@@ -36,6 +39,49 @@ Agradecemos su comprensión y cumplimiento con estas condiciones para ofrecerle
 DEFAULT_ADDRESS = "Calle Duarte, Esq Dr Ferry #54\nSucursal La Romana\nRNC: 132872975"
 DEFAULT_STORE = "ANGELO"
 
+# Estilos del recibo, compilados una sola vez por proceso. La tabla de items
+# solo agrega los bordes de cada bloque (TableStyle con parent)
+@lru_cache(maxsize=None)
+def _pdf_styles():
+    styles = getSampleStyleSheet()
+    style_item = ParagraphStyle('Item', parent=styles['Normal'], fontSize=14, leading=16)
+    return SimpleNamespace(
+        normal=styles["Normal"],
+        right=ParagraphStyle('Right', parent=styles['Normal'], alignment=0, leading=14, fontSize=10, textColor=colors.black),
+        title=ParagraphStyle('TitleGarantia', parent=styles['h1'], fontSize=24, textColor=colors.navy, spaceAfter=2),
+        date=ParagraphStyle('DateStyle', parent=styles['Normal'], fontSize=12, textColor=colors.deeppink, spaceAfter=5, fontName='Helvetica-Bold'),
+        store=ParagraphStyle('StoreStyle', parent=styles['Normal'], fontSize=12, textColor=colors.black, spaceAfter=10, fontName='Helvetica-Bold'),
+        item=style_item,
+        imei_list=ParagraphStyle('ImeiList', parent=styles['Normal'], fontSize=12, leading=14, textColor=colors.black),
+        center=ParagraphStyle('ItemCenter', parent=style_item, alignment=1),
+        terms=ParagraphStyle('Terms', parent=styles['Normal'], fontSize=8, leading=10),
+        line=ParagraphStyle('Line', alignment=1),
+        sig=ParagraphStyle('Sig', parent=styles['Normal'], alignment=1, textColor=colors.deeppink, fontSize=12),
+        header_table=TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('ALIGN', (1,0), (1,0), 'RIGHT'), # Alineamos el texto a la derecha? No, el bloque a la derecha, pero el texto interno está align=0 left. 
+            # El screenshot pone el texto a la derecha de la pagina.
+        ]),
+        items_table=TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+            ('ALIGN', (0,0), (0,-1), 'CENTER'), # Cantidad centrada
+            # Cada item (modelo + filas de IMEIs) se ve como una sola celda
+            ('BOX', (0,0), (-1,-1), 1, colors.black),
+            ('LINEAFTER', (0,0), (0,-1), 1, colors.black),
+            ('LINEBELOW', (0,0), (-1,0), 1, colors.black),
+            ('BOTTOMPADDING', (0,0), (-1,0), 6),
+            ('TOPPADDING', (0,0), (-1,0), 6),
+            ('BOTTOMPADDING', (0,-1), (-1,-1), 6),
+            ('TOPPADDING', (0,-1), (-1,-1), 6),
+            ('TOPPADDING', (0,1), (-1,-2), 0),
+            ('BOTTOMPADDING', (0,1), (-1,-2), 0),
+        ]),
+    )
+
 class GarantiaApp(ctk.CTk):
     def __init__(self):
         super().__init__()
@@ -295,6 +341,85 @@ class GarantiaApp(ctk.CTk):
 
 
 
+    def build_pdf(self, file_path, store, date_str):
+        """Arma el PDF del recibo con los items actuales (sin diálogos)."""
+        doc = SimpleDocTemplate(file_path, pagesize=letter, leftMargin=0.4*inch, rightMargin=0.4*inch, topMargin=0.4*inch, bottomMargin=0.2*inch)
+        styles = _pdf_styles()
+        story = []
+
+        # --- HEADER (GRID LAYOUT) ---
+        # Col 1: Logo, Col 2: Info Dirección
+        
+        # Prepare Logo
+        logo_obj = Paragraph("", styles.normal)
+        if self.logo_path and os.path.exists(self.logo_path):
+            logo_obj = logo_image(self.logo_path, max_height=None, hAlign='LEFT')
+
+        # Prepare Address Text
+        address_text = DEFAULT_ADDRESS.replace("\n", "<br/>")
+        address_para = Paragraph(address_text, styles.right)
+
+        header_data = [[logo_obj, address_para]]
+        t_header = Table(header_data, colWidths=[4*inch, 3.5*inch])
+        t_header.setStyle(styles.header_table)
+        story.append(t_header)
+        story.append(Spacer(1, 0.2*inch))
+
+        # --- TITULO PRINCIPAL ---
+        story.append(Paragraph("RECIBO DE GARANTIA", styles.title))
+        
+        # --- FECHA ---
+        story.append(Paragraph(f"Fecha:  {date_str}", styles.date))
+
+        # --- TIENDA ---
+        story.append(Paragraph(f"Tienda: {store}", styles.store))
+
+        # if client:
+        #     story.append(Paragraph(f"<b>Cliente:</b> {client}", styles['Normal']))
+        #     story.append(Spacer(1, 0.2*inch))
+
+        # --- TABLA ITEMS ---
+        # Si tiene IMEIs, los mostramos debajo del modelo
+        
+        data_rows = []
+        blocks = []
+        # Header
+        data_rows.append(['CANT', 'DESCRIPCIÓN'])
+        
+        # Items
+        total_cant = 0
+        for item in self.items_data:
+            qty = item['Cantidad']
+            total_cant += int(qty)
+            start = len(data_rows)
+            data_rows.append([str(qty), Paragraph(f"<b>{item['Modelo']}</b>", styles.item)])
+            # IMEIs en filas aparte de IMEIS_PER_ROW (tamaño 12, como antes)
+            # para que un pedido grande pueda partirse entre páginas
+            for chunk in chunked(split_lines(item.get('Imeis')), IMEIS_PER_ROW):
+                data_rows.append(["", Paragraph(", ".join(chunk), styles.imei_list)])
+            blocks.append((start, len(data_rows) - 1))
+
+        # Fila de Total
+        data_rows.append([Paragraph(f"<b>{total_cant}</b>", styles.center), Paragraph("<b>TOTAL EQUIPOS</b>", styles.item)])
+
+        t_items = LongTable(data_rows, colWidths=[1*inch, 6.5*inch], repeatRows=1)
+        t_items.setStyle(TableStyle(block_styles(blocks, 1, colors.black, padding=6), parent=styles.items_table))
+        story.append(t_items)
+        story.append(Spacer(1, 0.2*inch))
+
+        # --- TERMS ---
+        # Reemplazar saltos de linea simples por <br/>
+        formatted_terms = DEFAULT_TERMS.replace("\n", "<br/>")
+        story.append(Paragraph(formatted_terms, styles.terms))
+        
+        story.append(Spacer(1, 0.4*inch))
+
+        # --- FIRMA ---
+        story.append(Paragraph("___________________________________", styles.line))
+        story.append(Paragraph("Firma", styles.sig))
+
+        doc.build(story)
+
     def generate_pdf(self):
         if not self.items_data:
             messagebox.showwarning("Error", "No hay items para generar.")
@@ -307,109 +432,7 @@ class GarantiaApp(ctk.CTk):
         if not file_path: return
 
         try:
-            doc = SimpleDocTemplate(file_path, pagesize=letter, leftMargin=0.4*inch, rightMargin=0.4*inch, topMargin=0.4*inch, bottomMargin=0.2*inch)
-            styles = getSampleStyleSheet()
-            story = []
-
-            # --- HEADER (GRID LAYOUT) ---
-            # Col 1: Logo, Col 2: Info Dirección
-            
-            # Prepare Logo
-            logo_obj = Paragraph("", styles["Normal"])
-            if self.logo_path and os.path.exists(self.logo_path):
-                img = ImageReader(self.logo_path)
-                w, h = img.getSize()
-                aspect = h / float(w)
-                logo_obj = Image(self.logo_path, width=1.5*inch, height=1.5*inch*aspect, hAlign='LEFT')
-
-            # Prepare Address Text
-            style_right = ParagraphStyle('Right', parent=styles['Normal'], alignment=0, leading=14, fontSize=10, textColor=colors.black)
-            address_text = DEFAULT_ADDRESS.replace("\n", "<br/>")
-            address_para = Paragraph(address_text, style_right)
-
-            header_data = [[logo_obj, address_para]]
-            t_header = Table(header_data, colWidths=[4*inch, 3.5*inch])
-            t_header.setStyle(TableStyle([
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                ('ALIGN', (1,0), (1,0), 'RIGHT'), # Alineamos el texto a la derecha? No, el bloque a la derecha, pero el texto interno está align=0 left. 
-                # El screenshot pone el texto a la derecha de la pagina.
-            ]))
-            story.append(t_header)
-            story.append(Spacer(1, 0.2*inch))
-
-            # --- TITULO PRINCIPAL ---
-            title_style = ParagraphStyle('TitleGarantia', parent=styles['h1'], fontSize=24, textColor=colors.navy, spaceAfter=2)
-            story.append(Paragraph("RECIBO DE GARANTIA", title_style))
-            
-            # --- FECHA ---
-            date_style = ParagraphStyle('DateStyle', parent=styles['Normal'], fontSize=12, textColor=colors.deeppink, spaceAfter=5, fontName='Helvetica-Bold')
-            story.append(Paragraph(f"Fecha:  {date_str}", date_style))
-
-            # --- TIENDA ---
-            store_style = ParagraphStyle('StoreStyle', parent=styles['Normal'], fontSize=12, textColor=colors.black, spaceAfter=10, fontName='Helvetica-Bold')
-            story.append(Paragraph(f"Tienda: {store}", store_style))
-
-            # if client:
-            #     story.append(Paragraph(f"<b>Cliente:</b> {client}", styles['Normal']))
-            #     story.append(Spacer(1, 0.2*inch))
-
-            # --- TABLA ITEMS ---
-            # Si tiene IMEIs, los mostramos debajo del modelo
-            
-            data_rows = []
-            # Header
-            data_rows.append(['CANT', 'DESCRIPCIÓN'])
-            
-            # Items
-            style_item = ParagraphStyle('Item', parent=styles['Normal'], fontSize=14, leading=16)
-            style_imei_list = ParagraphStyle('ImeiList', parent=styles['Normal'], fontSize=12, leading=14, textColor=colors.black)
-
-            total_cant = 0
-            for item in self.items_data:
-                desc = f"<b>{item['Modelo']}</b>"
-                if item.get('Imeis'):
-                    # Limpiar y formatear IMEIs
-                    raw_imeis = item['Imeis'].replace('\n', ', ')
-                    # Usamos tamano 12 para que se vea bien, acorde a lo pedido
-                    desc += f"<br/><font size=12>{raw_imeis}</font>"
-                
-                qty = item['Cantidad']
-                total_cant += int(qty)
-                data_rows.append([str(qty), Paragraph(desc, style_item)])
-
-            # Fila de Total
-            style_center = ParagraphStyle('ItemCenter', parent=style_item, alignment=1)
-            data_rows.append([Paragraph(f"<b>{total_cant}</b>", style_center), Paragraph("<b>TOTAL EQUIPOS</b>", style_item)])
-
-            t_items = Table(data_rows, colWidths=[1*inch, 6.5*inch])
-            t_items.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('ALIGN', (0,0), (0,-1), 'CENTER'), # Cantidad centrada
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('BOTTOMPADDING', (0,0), (-1,-1), 6),
-                ('TOPPADDING', (0,0), (-1,-1), 6),
-            ]))
-            story.append(t_items)
-            story.append(Spacer(1, 0.2*inch))
-
-            # --- TERMS ---
-            terms_style = ParagraphStyle('Terms', parent=styles['Normal'], fontSize=8, leading=10)
-            # Reemplazar saltos de linea simples por <br/>
-            formatted_terms = DEFAULT_TERMS.replace("\n", "<br/>")
-            story.append(Paragraph(formatted_terms, terms_style))
-            
-            story.append(Spacer(1, 0.4*inch))
-
-            # --- FIRMA ---
-            sig_style = ParagraphStyle('Sig', parent=styles['Normal'], alignment=1, textColor=colors.deeppink, fontSize=12)
-            story.append(Paragraph("___________________________________", ParagraphStyle('Line', alignment=1)))
-            story.append(Paragraph("Firma", sig_style))
-
-            doc.build(story)
+            self.build_pdf(file_path, store, date_str)
 
             # --- SAVE TO HISTORY ---
             try:
@@ -0,0 +1,356 @@
+"""Servicio HTTP local que genera conduces y recibos de garantía en PDF.
+
+Recibe JSON y devuelve el PDF. Los documentos se generan en un pool de
+procesos que arranca junto con el servidor, con ReportLab importado, los
+estilos de todos los temas compilados y el logo ya reducido. La cola es
+acotada: si están ocupados todos los workers y todos los lugares de
+espera, la respuesta es 429 con Retry-After. Solo usa la biblioteca
+estándar (http.server + multiprocessing) y los generadores del proyecto.
+
+Endpoints:
+    POST /conduce, /conduce_imeis, /garantia   JSON -> application/pdf (con ETag)
+    GET  /metrics                               métricas en formato texto de Prometheus
+    GET  /health                                "ok"
+
+Cuerpo JSON (todo opcional salvo items):
+    {"destinatario": "...", "factura": "...", "items": [{"Cantidad": 2, "Modelo": "...", "IMEIs": "..."}],
+     "tema": "Verde Menta" | "acento": "#C1E1C1", "fecha": "dd/mm/aaaa",
+     "formato_imeis": "texto" | "grilla", "tienda": "...", "rapido": false, "copia": false}
+
+Uso:
+    python -m servicio_documentos [--host 127.0.0.1] [--port 8765] [--workers 4] [--cola 16] [--logo logo.png]
+
+    curl -s -X POST localhost:8765/conduce -H "Content-Type: application/json" \\
+         -d '{"destinatario": "TIENDA", "factura": "F1", "items": [{"Cantidad": 2, "Modelo": "IPHONE 15"}]}' -o conduce.pdf
+"""
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from cache_documentos import DocumentCache, document_key, document_etag
+from conduce_rapido import get_conduce_template, COPIES_ORIGINAL_COPY
+from datos_documentos import adapt_columns, render_document, DOC_TYPES
+from documentos_pdf import get_document_styles, load_logo, logo_digest, today_str, PDF_THEMES, DEFAULT_ACCENT, IMEI_LAYOUT_TEXT, IMEI_LAYOUT_GRID
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE = 16
+DEFAULT_LOGO = "logo_cache_web.png"
+MAX_BODY_BYTES = 5 * 1024 * 1024  # 5 MB de JSON
+RENDER_TIMEOUT = 120              # segundos por documento
+RETRY_AFTER = 1                   # segundos sugeridos al responder 429
+
+_HEX_COLOR = re.compile(r"^#[0-9A-Fa-f]{6}$")
+_TEXT_FIELDS = ("Modelo", "IMEIs", "IMEIs/Coment")
+
+
+# ==========================================
+# WORKERS
+# ==========================================
+
+def _warm_worker(logo):
+    # Corre una vez en cada proceso del pool, antes del primer pedido
+    for accent in set(PDF_THEMES.values()) | {DEFAULT_ACCENT}:
+        get_document_styles(accent)
+    if logo:
+        load_logo(logo)
+        get_conduce_template(DEFAULT_ACCENT, logo)
+
+
+def _render_worker(doc_type, destinatario, factura, items, options):
+    df = adapt_columns(pd.DataFrame(items), doc_type)
+    return render_document(doc_type, destinatario, factura, df, **options)
+
+
+# ==========================================
+# SERVICIO
+# ==========================================
+
+class RequestError(Exception):
+    """Pedido inválido: se responde 400 con el mensaje."""
+
+
+class QueueFull(Exception):
+    """Todos los workers y lugares de espera ocupados: se responde 429."""
+
+
+def _parse_item(n, item):
+    # Cantidad numérica (o texto numérico); los textos aceptan números, como
+    # un IMEI enviado sin comillas, y se convierten a str
+    qty = item.get("Cantidad")
+    if isinstance(qty, str):
+        try:
+            qty = float(qty)
+        except ValueError:
+            qty = None
+    if isinstance(qty, bool) or not isinstance(qty, (int, float)) or not math.isfinite(qty):
+        raise RequestError(f"items[{n}]: 'Cantidad' debe ser un número")
+    clean = {"Cantidad": int(qty) if float(qty).is_integer() else qty}
+    for field in _TEXT_FIELDS:
+        if field not in item and field != "Modelo":
+            continue  # adapt_columns completa las columnas que falten
+        value = item.get(field)
+        if value is None:
+            value = ""
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise RequestError(f"items[{n}]: '{field}' debe ser texto")
+        clean[field] = str(value)
+    return clean
+
+
+def parse_payload(doc_type, payload, logo):
+    """(destinatario, factura, items, opciones de render) validados desde el JSON."""
+    if not isinstance(payload, dict):
+        raise RequestError("se esperaba un objeto JSON")
+    items = payload.get("items")
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise RequestError("'items' debe ser una lista de objetos")
+    items = [_parse_item(n, item) for n, item in enumerate(items)]
+
+    accent = payload.get("acento") or PDF_THEMES.get(payload.get("tema"), DEFAULT_ACCENT)
+    if payload.get("tema") and payload.get("tema") not in PDF_THEMES and not payload.get("acento"):
+        raise RequestError(f"tema desconocido; opciones: {', '.join(PDF_THEMES)}")
+    if not _HEX_COLOR.match(accent):
+        raise RequestError("'acento' debe ser un color #RRGGBB")
+    imei_layout = payload.get("formato_imeis", IMEI_LAYOUT_TEXT)
+    if imei_layout not in (IMEI_LAYOUT_TEXT, IMEI_LAYOUT_GRID):
+        raise RequestError(f"'formato_imeis' debe ser {IMEI_LAYOUT_TEXT} o {IMEI_LAYOUT_GRID}")
+
+    options = {
+        "accent_hex": accent,
+        "logo": logo,
+        "date_str": str(payload.get("fecha") or today_str()),
+        "imei_layout": imei_layout,
+        "store": str(payload.get("tienda", "")),
+        "fast": bool(payload.get("rapido")),
+        "copies": COPIES_ORIGINAL_COPY if payload.get("copia") else None,
+    }
+    return str(payload.get("destinatario", "")), str(payload.get("factura", "")), items, options
+
+
+class DocumentService:
+    """Pool de render precalentado, cola acotada, cache por contenido y métricas."""
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE, logo=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.logo = logo
+        self.cache = DocumentCache()
+        self._logo_digest = logo_digest(logo)
+        # Lugares en proceso + en espera; sin lugar libre -> 429
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._pool = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._requests = {}       # código HTTP -> cantidad
+        self._rendered = {}       # tipo -> cantidad
+        self._cache_hits = 0
+        self._render_seconds = 0.0
+
+    def start(self):
+        self._pool = multiprocessing.Pool(self.workers, initializer=_warm_worker, initargs=(self.logo,))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def count_request(self, status):
+        with self._lock:
+            self._requests[status] = self._requests.get(status, 0) + 1
+
+    def render(self, doc_type, payload):
+        """(bytes, etag, desde_cache). Lanza RequestError, QueueFull o TimeoutError."""
+        destinatario, factura, items, options = parse_payload(doc_type, payload, self.logo)
+        key = document_key(doc_type, destinatario=destinatario, factura=factura, items=items, logo=self._logo_digest,
+                           **{k: v for k, v in options.items() if k != "logo"})
+        cached = self.cache.get(key)
+        if cached is not None:
+            with self._lock:
+                self._cache_hits += 1
+            return cached + (True,)
+
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull()
+        with self._lock:
+            self._in_flight += 1
+        t0 = time.perf_counter()
+
+        # El lugar se libera cuando el worker termina, no cuando el pedido
+        # deja de esperar: tras un 504 el documento sigue ocupando el pool
+        # (y al terminar queda en la cache para el reintento)
+        def done(result, rendered=True):
+            if rendered:
+                self.cache.put(key, result)
+            with self._lock:
+                self._in_flight -= 1
+                self._render_seconds += time.perf_counter() - t0
+                if rendered:
+                    self._rendered[doc_type] = self._rendered.get(doc_type, 0) + 1
+            self._slots.release()
+
+        try:
+            pending = self._pool.apply_async(_render_worker, (doc_type, destinatario, factura, items, options),
+                                             callback=done, error_callback=lambda e: done(e, rendered=False))
+        except Exception:
+            done(None, rendered=False)
+            raise
+        pdf_bytes = pending.get(RENDER_TIMEOUT)
+        return pdf_bytes, document_etag(pdf_bytes), False
+
+    def metrics_text(self):
+        with self._lock:
+            lines = [
+                "# TYPE documentos_requests_total counter",
+                *(f'documentos_requests_total{{status="{status}"}} {n}' for status, n in sorted(self._requests.items())),
+                "# TYPE documentos_rendered_total counter",
+                *(f'documentos_rendered_total{{tipo="{doc_type}"}} {n}' for doc_type, n in sorted(self._rendered.items())),
+                "# TYPE documentos_render_seconds_sum counter",
+                f"documentos_render_seconds_sum {self._render_seconds:.6f}",
+                "# TYPE documentos_cache_hits_total counter",
+                f"documentos_cache_hits_total {self._cache_hits}",
+                "# TYPE documentos_in_flight gauge",
+                f"documentos_in_flight {self._in_flight}",
+            ]
+        lines += [
+            "# TYPE documentos_capacity gauge",
+            f"documentos_capacity {self.workers + self.queue_size}",
+            "# TYPE documentos_workers gauge",
+            f"documentos_workers {self.workers}",
+            "# TYPE documentos_cache_bytes gauge",
+            f"documentos_cache_bytes {self.cache.total_bytes}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+# ==========================================
+# HTTP
+# ==========================================
+
+class DocumentRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ServicioDocumentos/1.0"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def _send(self, status, body, content_type="text/plain; charset=utf-8", headers=None):
+        self.service.count_request(status)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, headers=None):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, self.service.metrics_text().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        elif self.path == "/health":
+            self._send(200, b"ok")
+        else:
+            self._send_error(404, "ruta desconocida")
+
+    def do_POST(self):
+        doc_type = self.path.strip("/")
+        if doc_type not in DOC_TYPES:
+            self._send_error(404, f"documento desconocido; opciones: {', '.join(DOC_TYPES)}")
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            self._send_error(413, f"el cuerpo debe tener entre 0 y {MAX_BODY_BYTES} bytes")
+            return
+
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:  # JSON inválido o bytes que no son UTF-8
+            self._send_error(400, f"JSON inválido: {e}")
+            return
+
+        # Un ValueError del render (ReportLab, los builders) es un 500, no
+        # un pedido inválido: solo RequestError viene de validar el pedido
+        try:
+            pdf_bytes, etag, cached = self.service.render(doc_type, payload)
+        except RequestError as e:
+            self._send_error(400, str(e))
+            return
+        except QueueFull:
+            self._send_error(429, "servicio ocupado, reintentar", {"Retry-After": str(RETRY_AFTER)})
+            return
+        except multiprocessing.TimeoutError:
+            self._send_error(504, f"el documento tardó más de {RENDER_TIMEOUT} s")
+            return
+        except Exception as e:
+            logging.error(f"Error generando {doc_type}: {e}")
+            self._send_error(500, f"{type(e).__name__}: {e}")
+            return
+
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", headers={"ETag": etag})
+            return
+        self._send(200, pdf_bytes, "application/pdf", {"ETag": etag, "X-Cache": "HIT" if cached else "MISS"})
+
+    def log_message(self, format, *args):
+        logging.info(f"{self.address_string()} {format % args}")
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Servidor HTTP (un hilo por conexión) sobre un DocumentService ya iniciado.
+
+    Con port=0 el sistema elige un puerto libre (server.server_address[1]),
+    útil para levantarlo en pruebas locales.
+    """
+    server = ThreadingHTTPServer((host, port), DocumentRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="procesos de render")
+    ap.add_argument("--cola", type=int, default=DEFAULT_QUEUE, help="pedidos en espera antes de responder 429")
+    ap.add_argument("--logo", default=DEFAULT_LOGO if os.path.exists(DEFAULT_LOGO) else None)
+    args = ap.parse_args()
+
+    if args.workers < 1 or args.cola < 0:
+        ap.error("--workers debe ser al menos 1 y --cola no puede ser negativa")
+    if args.logo and not os.path.exists(args.logo):
+        ap.error(f"no existe el logo {args.logo}")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    service = DocumentService(args.workers, args.cola, args.logo)
+    service.start()
+    server = make_server(service, args.host, args.port)
+    logging.info(f"Servicio de documentos en http://{args.host}:{server.server_address[1]} ({service.workers} workers, cola {args.cola})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
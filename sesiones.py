@@ -0,0 +1,391 @@
+import atexit
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+# ==========================================
+# SESIONES COLABORATIVAS (almacenamiento)
+# ==========================================
+# Una base SQLite en modo WAL (SESSIONS_DB): los lectores no bloquean al
+# que escribe, y varios hilos o procesos del servidor pueden usar la misma
+# sesión sin pisarse (cada guardado es una transacción BEGIN IMMEDIATE).
+#
+# Cada item de la tabla es una fila con id estable y una columna de orden
+# (real: una fila insertada en medio toma un orden entre sus vecinas). Un
+# guardado salta el prefijo y el sufijo iguales y solo toca las filas del
+# tramo distinto, así que editar, insertar o borrar una fila de una sesión
+# con miles de IMEIs cuesta lo mismo que en una chica. Cada guardado con
+# cambios sube la versión de la sesión en uno.
+#
+# Cada guardado también anota sus operaciones por fila en un registro de
+# cambios con su versión: insert y delete por posición corren las filas
+# siguientes (como en una lista), update reemplaza el item, y "fields"
+# lleva destinatario/factura. Quien mira la sesión en vivo pide solo los
+# cambios desde la última versión que vio (changes_since) y los aplica a
+# su tabla (apply_changes): el costo depende de lo que cambió, no del
+# tamaño de la sesión. La tabla de items es siempre la foto completa de la
+# última versión; cada LOG_KEEP_VERSIONS versiones se borra del registro
+# lo anterior a esa ventana, y quien quedó más atrás vuelve a cargar la
+# sesión completa.
+#
+# Las sesiones viejas (un JSON por sesión en SESSIONS_DIR) se importan
+# una sola vez al abrir la base; los archivos quedan donde estaban.
+
+SESSIONS_DIR = "sessions"
+SESSIONS_DB = os.path.join(SESSIONS_DIR, "sesiones.db")
+AUTOSAVE_DELAY = 1.5  # segundos
+BUSY_TIMEOUT = 10.0   # segundos esperando a otro escritor
+LOG_KEEP_VERSIONS = 50
+
+OP_INSERT = "insert"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+OP_FIELDS = "fields"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    name TEXT PRIMARY KEY,
+    fields TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    last_updated TEXT NOT NULL,
+    log_start INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS items (
+    session TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    ord REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (session, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS items_orden ON items (session, ord);
+CREATE TABLE IF NOT EXISTS changes (
+    session TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    pos INTEGER NOT NULL,
+    data TEXT,
+    PRIMARY KEY (session, version, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Forma canónica: el mismo contenido siempre da el mismo texto. Un solo
+# encoder para no crearlo de nuevo en cada una de las miles de filas. Los
+# items conservan el orden de sus claves (el de las columnas de la tabla).
+_dumps = json.JSONEncoder(sort_keys=True, ensure_ascii=False, default=str).encode
+_dumps_item = json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+
+class SessionStore:
+    """Sesiones colaborativas en SQLite, con items por fila y versión."""
+
+    def __init__(self, db_path=SESSIONS_DB, json_dir=SESSIONS_DIR):
+        self.db_path = db_path
+        self._local = threading.local()  # una conexión por hilo
+        self._rows = {}                  # sesión -> (versión, ids, órdenes, [JSON de cada item])
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        self._migrate_json(json_dir)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def list(self):
+        return [name for (name,) in self._conn().execute("SELECT name FROM sessions ORDER BY name")]
+
+    def version(self, session_name):
+        """Versión actual de la sesión, o None si no existe."""
+        row = self._conn().execute("SELECT version FROM sessions WHERE name = ?", (session_name,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, session_name):
+        """Dict de la sesión (campos, items, version, last_updated) o None."""
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute("SELECT fields, version, last_updated FROM sessions WHERE name = ?", (session_name,)).fetchone()
+            if row is None:
+                return None
+            known = self._read_rows(conn, session_name, row[1])
+        finally:
+            conn.execute("COMMIT")
+        fields, version, last_updated = row
+        rows = known[3]
+        return {**json.loads(fields), "items": [json.loads(r) for r in rows], "version": version, "last_updated": last_updated}
+
+    def save(self, session_name, data):
+        """Guarda la sesión tocando solo las filas del tramo cambiado; devuelve la versión."""
+        fields = _dumps({k: v for k, v in data.items() if k not in ("items", "version", "last_updated")})
+        rows = [_dumps_item(item) for item in data.get("items", [])]
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("SELECT fields, version, log_start FROM sessions WHERE name = ?", (session_name,)).fetchone()
+            old_fields, version, log_start = current if current else (None, 0, 1)
+            with self._lock:
+                cached = self._rows.get(session_name)
+            if cached is None or cached[0] != version:
+                # Otro hilo o proceso la cambió: se compara contra la base
+                cached = self._read_rows(conn, session_name, version)
+            _, old_ids, old_ords, old_rows = cached
+
+            # Tramo distinto: lo que queda entre el prefijo y el sufijo iguales
+            start, end_old, end_new = 0, len(old_rows), len(rows)
+            while start < end_old and start < end_new and old_rows[start] == rows[start]:
+                start += 1
+            while end_old > start and end_new > start and old_rows[end_old - 1] == rows[end_new - 1]:
+                end_old -= 1
+                end_new -= 1
+            if current and start == end_old == end_new and old_fields == fields:
+                conn.execute("COMMIT")
+                return version
+
+            # Dentro del tramo: las primeras filas se reemplazan y el resto
+            # se inserta o se borra
+            common = min(end_old, end_new) - start
+            mid = start + common
+            ops = []
+            updates = []
+            for pos in range(start, mid):
+                if old_rows[pos] != rows[pos]:
+                    updates.append((rows[pos], session_name, old_ids[pos]))
+                    ops.append((OP_UPDATE, pos, rows[pos]))
+            deleted = old_ids[mid:end_old]
+            ops.extend((OP_DELETE, mid, None) for _ in deleted)
+            inserted = rows[mid:end_new]
+            ops.extend((OP_INSERT, mid + i, row) for i, row in enumerate(inserted))
+
+            next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM items WHERE session = ?", (session_name,)).fetchone()[0]
+            new_ids = list(range(next_id, next_id + len(inserted)))
+            new_ords, renumber = _between(old_ords[mid - 1] if mid > 0 else None,
+                                          old_ords[end_old] if end_old < len(old_ords) else None, len(inserted))
+            ids = old_ids[:mid] + new_ids + old_ids[end_old:]
+            ords = old_ords[:mid] + new_ords + old_ords[end_old:]
+            if renumber:
+                ords = [float(i) for i in range(len(ids))]
+
+            conn.executemany("UPDATE items SET data = ? WHERE session = ? AND id = ?", updates)
+            conn.executemany("DELETE FROM items WHERE session = ? AND id = ?", [(session_name, i) for i in deleted])
+            conn.executemany("INSERT INTO items (session, id, ord, data) VALUES (?, ?, ?, ?)",
+                             [(session_name, i, o, row) for i, o, row in zip(new_ids, ords[mid:mid + len(inserted)], inserted)])
+            if renumber:
+                # Sin lugar entre dos órdenes vecinos: se renumera todo (raro)
+                conn.executemany("UPDATE items SET ord = ? WHERE session = ? AND id = ?",
+                                 [(o, session_name, i) for i, o in zip(ids, ords)])
+            version += 1
+            if current:
+                # Una sesión nueva no necesita historia: se carga completa
+                if old_fields != fields:
+                    ops.append((OP_FIELDS, -1, fields))
+                conn.executemany("INSERT INTO changes (session, version, seq, op, pos, data) VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(session_name, version, seq, op, pos, d) for seq, (op, pos, d) in enumerate(ops)])
+                if version % LOG_KEEP_VERSIONS == 0:
+                    # Compactación: la tabla de items ya es la foto de esta versión
+                    log_start = max(log_start, version - LOG_KEEP_VERSIONS)
+                    conn.execute("DELETE FROM changes WHERE session = ? AND version <= ?", (session_name, log_start))
+            conn.execute("INSERT OR REPLACE INTO sessions (name, fields, version, last_updated, log_start) VALUES (?, ?, ?, ?, ?)",
+                         (session_name, fields, version, datetime.now().isoformat(), log_start))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._rows[session_name] = (version, ids, ords, rows)
+        return version
+
+    def _read_rows(self, conn, session_name, version):
+        # Dentro de una transacción: (versión, ids, órdenes, items) y a la cache
+        ids, ords, rows = [], [], []
+        for item_id, ord_, data in conn.execute("SELECT id, ord, data FROM items WHERE session = ? ORDER BY ord", (session_name,)):
+            ids.append(item_id)
+            ords.append(ord_)
+            rows.append(data)
+        known = (version, ids, ords, rows)
+        with self._lock:
+            self._rows[session_name] = known
+        return known
+
+    def changes_since(self, session_name, since_version):
+        """(versión, cambios) desde `since_version`, o None si hay que cargarla completa.
+
+        Cada cambio es (op, pos, datos): el item completo para insert y
+        update, None para delete y los campos de la sesión para fields.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute("SELECT version, log_start FROM sessions WHERE name = ?", (session_name,)).fetchone()
+            if row is None:
+                return None
+            version, log_start = row
+            if since_version == version:
+                return version, []
+            if since_version < log_start or since_version > version:
+                return None  # Fuera del registro (compactado o de otra base)
+            ops = conn.execute("SELECT op, pos, data FROM changes WHERE session = ? AND version > ? ORDER BY version, seq",
+                               (session_name, since_version)).fetchall()
+        finally:
+            conn.execute("COMMIT")
+        return version, [(op, pos, json.loads(d) if d is not None else None) for op, pos, d in ops]
+
+    def _migrate_json(self, json_dir):
+        # Importación única de las sesiones en JSON de versiones anteriores
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+            return
+        for path in sorted(glob.glob(os.path.join(json_dir, "*.json"))):
+            session_name = os.path.basename(path)[:-len(".json")]
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if self.version(session_name) is None:
+                    self.save(session_name, data)
+            except Exception as e:
+                logging.error(f"No se pudo migrar la sesión {path}: {e}")
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (datetime.now().isoformat(),))
+
+
+def _between(lo, hi, n):
+    """(n órdenes entre lo y hi, hay que renumerar); None es sin vecino."""
+    if n == 0:
+        return [], False
+    if lo is None and hi is None:
+        lo, hi = -1.0, float(n)
+    elif lo is None:
+        lo = hi - n - 1
+    elif hi is None:
+        hi = lo + n + 1
+    step = (hi - lo) / (n + 1)
+    ords = [lo + step * (i + 1) for i in range(n)]
+    # Tras muchas inserciones en el mismo hueco el real ya no distingue
+    renumber = not (lo < ords[0] and ords[-1] < hi and all(a < b for a, b in zip(ords, ords[1:])))
+    return ords, renumber
+
+
+def apply_changes(df, changes):
+    """Copia de `df` con los cambios por fila de changes_since aplicados.
+
+    Se aplican en orden sobre una lista de posiciones (índices de `df` o
+    filas nuevas) y la tabla se arma una sola vez al final. Los de tipo
+    fields los aplica quien llama.
+    """
+    df = df.reset_index(drop=True)
+    order = list(range(len(df)))  # posición -> fila de df, o -1 - n para la fila nueva n
+    new_rows = []
+    for op, pos, data in changes:
+        if op == OP_DELETE:
+            del order[pos]
+        elif op == OP_INSERT:
+            order.insert(pos, -1 - len(new_rows))
+            new_rows.append(data)
+        elif op == OP_UPDATE:
+            order[pos] = -1 - len(new_rows)
+            new_rows.append(data)
+
+    old_pos = [pos for pos, i in enumerate(order) if i >= 0]
+    kept = df.iloc[[order[pos] for pos in old_pos]]
+    kept.index = old_pos
+    new_pos = [pos for pos, i in enumerate(order) if i < 0]
+    if not new_pos:
+        return kept.reset_index(drop=True)
+    changed = pd.DataFrame([new_rows[-1 - order[pos]] for pos in new_pos], index=new_pos)
+    out = pd.concat([kept, changed]).sort_index().reset_index(drop=True)
+    return out[list(df.columns) + [c for c in changed.columns if c not in df.columns]]
+
+
+def session_digest(data):
+    """Hash del contenido de la sesión, sin la marca de tiempo."""
+    payload = {k: v for k, v in data.items() if k not in ('last_updated', 'version')}
+    return hashlib.sha256(_dumps(payload).encode("utf-8")).hexdigest()
+
+
+class SessionAutosaver:
+    """Guardado automático de sesiones: salta lo repetido y agrupa ráfagas.
+
+    Las páginas de conduces guardan la sesión activa en cada rerun de
+    Streamlit; si el contenido no cambió desde la última escritura no se
+    escribe nada, y las ediciones dentro de `delay` segundos se agrupan en
+    una sola escritura de la última.
+    """
+
+    def __init__(self, store, delay=AUTOSAVE_DELAY):
+        self.store = store
+        self.delay = delay
+        self._saved = {}    # sesión -> hash de lo último escrito
+        self._pending = {}  # sesión -> (datos, hash) por escribir
+        self._timers = {}   # sesión -> escritura programada
+        self._errors = {}   # sesión -> último error de escritura
+        self._lock = threading.Lock()
+        atexit.register(self.flush_all)
+
+    def save(self, session_name, data):
+        """Programa la escritura de `data`; False si ya está guardado igual."""
+        digest = session_digest(data)
+        with self._lock:
+            if self._saved.get(session_name) == digest:
+                # Volvió a lo que ya está guardado: se descarta lo pendiente
+                self._pending.pop(session_name, None)
+                return False
+            self._pending[session_name] = (data, digest)
+            if session_name not in self._timers:
+                timer = threading.Timer(self.delay, self.flush, args=(session_name,))
+                timer.daemon = True
+                self._timers[session_name] = timer
+                timer.start()
+        return True
+
+    def flush(self, session_name):
+        """Escribe ya lo pendiente de la sesión (lo llama el temporizador)."""
+        with self._lock:
+            timer = self._timers.pop(session_name, None)
+            pending = self._pending.pop(session_name, None)
+            if pending is not None:
+                # Se marca antes de escribir: una edición que llegue mientras
+                # tanto se compara contra lo que va camino a la base
+                previous = self._saved.get(session_name)
+                self._saved[session_name] = pending[1]
+        if timer is not None:
+            timer.cancel()
+        if pending is None:
+            return
+        try:
+            self.store.save(session_name, pending[0])
+        except Exception as e:
+            logging.error(f"Error guardando sesión {session_name}: {e}")
+            with self._lock:
+                self._errors[session_name] = str(e)
+                if self._saved.get(session_name) == pending[1]:
+                    self._saved[session_name] = previous
+            return
+        with self._lock:
+            self._errors.pop(session_name, None)
+
+    def flush_all(self):
+        with self._lock:
+            names = list(self._pending)
+        for session_name in names:
+            self.flush(session_name)
+
+    def error(self, session_name):
+        """Último error de escritura de la sesión, o None."""
+        with self._lock:
+            return self._errors.get(session_name)
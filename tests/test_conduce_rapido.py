@@ -0,0 +1,50 @@
+"""Regresión del conduce rápido con logo.
+
+El logo se dibuja una vez dentro del form de la cabecera y cada página
+solo lo referencia; la plantilla (con el logo) se cachea entre documentos.
+
+Uso:
+    python -m pytest tests/test_conduce_rapido.py
+"""
+import os
+import re
+from io import BytesIO
+
+import pandas as pd
+import pdfplumber
+import pytest
+
+import conduce_rapido
+from conduce_rapido import generate_conduce_fast, COPIES_ORIGINAL_COPY
+
+LOGO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logo_cache_web.png")
+ITEMS = pd.DataFrame({"Cantidad": range(1, 121), "Modelo": [f"IPHONE 15 PRO MAX {i}" for i in range(120)]})
+
+pytestmark = pytest.mark.skipif(not os.path.exists(LOGO), reason="falta logo_cache_web.png")
+
+
+def render():
+    return generate_conduce_fast("TIENDA", "F-1", LOGO, ITEMS, "#C1E1C1", True, COPIES_ORIGINAL_COPY, "01/01/2025").getvalue()
+
+
+def images(pdf_bytes):
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        return [[(round(im["x0"], 1), round(im["top"], 1), round(im["width"], 1), round(im["height"], 1)) for im in page.images] for page in pdf.pages]
+
+
+def test_logo_en_cada_pagina_y_una_sola_vez_en_el_pdf():
+    conduce_rapido._templates.clear()
+    pdf_bytes = render()
+    pages = images(pdf_bytes)
+    assert len(pages) >= 4  # 120 filas en ORIGINAL y COPIA
+    assert all(len(page) == 1 for page in pages)
+    assert len({page[0] for page in pages}) == 1
+    # El logo (y su máscara) se escriben una vez aunque lo usen todas las páginas
+    assert len(re.findall(rb"/Subtype /Image", pdf_bytes)) <= 2
+
+
+def test_cache_entre_documentos_da_los_mismos_bytes():
+    conduce_rapido._templates.clear()
+    first = render()
+    second = render()  # plantilla y logo ya cacheados
+    assert first == second
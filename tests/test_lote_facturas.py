@@ -0,0 +1,74 @@
+"""Pruebas del procesamiento de facturas por lotes.
+
+Uso:
+    python -m pytest tests/test_lote_facturas.py
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import lote_facturas
+from cache_extraccion import ExtractionCache
+
+
+def _fake_extract(pdf_bytes):
+    text = pdf_bytes.decode("utf-8")
+    if text == "roto":
+        raise ValueError("PDF dañado")
+    return "CLIENTE", text, [("1.00", "MODELO")]
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Pool de hilos que registra cuántas extracciones hubo en curso a la vez."""
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        cls = CountingExecutor
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        future = super().submit(fn, *args)
+
+        def collected(_):
+            with cls.lock:
+                cls.in_flight -= 1
+        future.add_done_callback(collected)
+        return future
+
+
+def _setup(tmp_path, monkeypatch, count):
+    cache = ExtractionCache(cache_dir=str(tmp_path / "cache"))
+    monkeypatch.setattr(lote_facturas, "get_extraction_cache", lambda: cache)
+    monkeypatch.setattr(lote_facturas, "_extract_worker", _fake_extract)
+    monkeypatch.setattr(lote_facturas, "ProcessPoolExecutor", CountingExecutor)
+    CountingExecutor.in_flight = CountingExecutor.peak = 0
+    paths = []
+    for n in range(count):
+        path = tmp_path / f"f{n:03d}.pdf"
+        path.write_bytes(b"roto" if n == 7 else f"F{n:03d}".encode("utf-8"))
+        paths.append(str(path))
+    return cache, paths
+
+
+def test_lote_en_orden_con_pocas_extracciones_en_curso(tmp_path, monkeypatch):
+    cache, paths = _setup(tmp_path, monkeypatch, 60)
+    progress = []
+    results = lote_facturas.extract_batch(paths, max_workers=3, progress_callback=lambda d, t, r: progress.append(d))
+
+    assert [r["archivo"] for r in results] == [f"f{n:03d}.pdf" for n in range(60)]
+    assert [r["factura"] for r in results if r["error"] is None] == [f"F{n:03d}" for n in range(60) if n != 7]
+    assert results[7]["error"] == "PDF dañado"
+    assert progress == list(range(1, 61))
+    assert CountingExecutor.peak <= lote_facturas.IN_FLIGHT_PER_WORKER * 3
+
+    # Segunda pasada: todo sale de la cache salvo el PDF roto
+    again = lote_facturas.extract_batch(paths, max_workers=3)
+    assert [r["factura"] for r in again] == [r["factura"] for r in results]
+
+
+def test_una_sola_factura_sin_procesos(tmp_path, monkeypatch):
+    _, paths = _setup(tmp_path, monkeypatch, 1)
+    results = lote_facturas.extract_batch(paths, max_workers=4)
+    assert results[0]["factura"] == "F000"
+    assert CountingExecutor.peak == 0
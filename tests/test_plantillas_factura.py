@@ -0,0 +1,115 @@
+"""Pruebas del registro de plantillas de factura.
+
+Uso:
+    python -m pytest tests/test_plantillas_factura.py
+"""
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pdfplumber
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from plantillas_factura import TemplateRegistry
+
+
+def _learn(path, worker):
+    # Como un worker de lote_facturas: su propia copia del registro
+    registry = TemplateRegistry(path)
+    registry.get("comun")
+    for n in range(20):
+        registry.update(f"layout-{worker}-{n}", tier=worker)
+        registry.update("comun", **{f"campo_{worker}": n})
+    return worker
+
+
+def test_procesos_en_paralelo_no_pierden_plantillas(tmp_path):
+    path = str(tmp_path / "plantillas.json")
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(_learn, [path] * 4, range(4)))
+
+    with open(path, encoding="utf-8") as f:
+        templates = json.load(f)
+    assert all(f"layout-{w}-{n}" in templates for w in range(4) for n in range(20))
+    assert templates["comun"] == {f"campo_{w}": 19 for w in range(4)}
+
+
+def test_update_ve_lo_que_guardo_otro_registro(tmp_path):
+    path = str(tmp_path / "plantillas.json")
+    first, second = TemplateRegistry(path), TemplateRegistry(path)
+    first.get("a")
+    second.update("b", tier="columnas")
+    first.update("a", tier="lineas")
+    assert TemplateRegistry(path).get("b") == {"tier": "columnas"}
+    assert first.get("b") == {"tier": "columnas"}
+
+
+def _invoice(rows, footer_y):
+    # Factura con el layout de facturas_sinteticas, pero con las filas
+    # bajando hasta donde se pida y el pie legal en `footer_y`
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter, invariant=1)
+    y = letter[1] - 60
+    c.setFont("Helvetica", 9)
+    for line in ("DISTRIBUIDORA DEMO SRL", "Cliente: TIENDA EJEMPLO MOVIL", "No Factura F000001"):
+        c.drawString(40, y, line)
+        y -= 13
+    y -= 13
+    c.setFont("Helvetica", 8)
+    models = []
+    for n in range(rows):
+        models.append(f"SAMSUNG GALAXY A{n} 128GB NEGRO")
+        c.drawString(40, y, "2.00")
+        c.drawString(80, y, models[-1])
+        c.drawRightString(430, y, "100.00")
+        c.drawRightString(490, y, "0.00")
+        c.drawRightString(570, y, "200.00")
+        y -= 13
+    c.drawString(330, y, "Sub-Total")
+    c.drawRightString(570, y, f"{200 * rows:,.2f}")
+    c.drawString(330, y - 13, "Total")
+    c.drawRightString(570, y - 13, f"{200 * rows:,.2f}")
+    c.setFont("Helvetica", 6)
+    c.drawString(40, footer_y, "Condiciones de venta: la mercancía viaja por cuenta y riesgo del comprador.")
+    c.showPage()
+    c.save()
+    return buffer.getvalue(), models
+
+
+def test_factura_mas_larga_no_pierde_filas_en_la_zona_del_pie(tmp_path):
+    registry = TemplateRegistry(str(tmp_path / "plantillas.json"))
+    short_pdf, _ = _invoice(rows=10, footer_y=120)
+    long_pdf, models = _invoice(rows=50, footer_y=20)
+
+    with pdfplumber.open(io.BytesIO(short_pdf)) as pdf:
+        assert registry.learn(pdf.pages[0], "demo")
+        # La misma factura sigue yendo por el recorte
+        assert "Total" in registry.extract_first_page(pdf.pages[0], "demo")
+    with pdfplumber.open(io.BytesIO(long_pdf)) as pdf:
+        page = pdf.pages[0]
+        # Las últimas filas y los totales caen donde la primera tenía el pie
+        assert registry.get("demo")["items_bbox"][3] < page.height - 120
+        assert registry.extract_first_page(page, "demo") is None
+        assert models[-1] in page.extract_text()
+        # El layout ya tiene plantilla: no se vuelve a aprender ni a guardar
+        learned = registry.get("demo")
+        mtime = os.path.getmtime(registry.path)
+        assert registry.learn(page, "demo") is None
+        assert registry.get("demo") == learned
+        assert os.path.getmtime(registry.path) == mtime
+
+
+def test_pagina_sin_regiones_se_recuerda(tmp_path):
+    registry = TemplateRegistry(str(tmp_path / "plantillas.json"))
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter, invariant=1)
+    c.drawString(40, 700, "Portada sin items")
+    c.showPage()
+    c.save()
+
+    with pdfplumber.open(io.BytesIO(buffer.getvalue())) as pdf:
+        assert registry.learn(pdf.pages[0], "portada") is None
+        assert registry.get("portada") == {"items_bbox": None}
+        assert registry.extract_first_page(pdf.pages[0], "portada") is None
@@ -0,0 +1,132 @@
+"""Pruebas del servicio HTTP de documentos, levantado en el mismo proceso.
+
+Uso:
+    python -m pytest tests/test_servicio_documentos.py
+"""
+import http.client
+import json
+import threading
+
+import pytest
+
+from servicio_documentos import DocumentService, make_server
+
+ITEMS = [{"Cantidad": 2, "Modelo": "IPHONE 15 128GB"}, {"Cantidad": 1, "Modelo": "GALAXY A15", "IMEIs": "350000000000001"}]
+
+
+@pytest.fixture(scope="module")
+def servicio():
+    service = DocumentService(workers=1, queue_size=0)
+    service.start()
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield service, server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def pedir(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    payload = json.dumps(body).encode("utf-8") if body is not None else None
+    conn.request(method, path, payload, {"Content-Type": "application/json", **(headers or {})})
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp.status, dict(resp.getheaders()), data
+
+
+def test_conduce_200_y_304(servicio):
+    _, port = servicio
+    status, headers, data = pedir(port, "POST", "/conduce", {"destinatario": "TIENDA", "factura": "F1", "items": ITEMS})
+    assert status == 200
+    assert headers["Content-Type"] == "application/pdf"
+    assert data.startswith(b"%PDF")
+    assert headers["X-Cache"] == "MISS"
+
+    status, again, data = pedir(port, "POST", "/conduce", {"destinatario": "TIENDA", "factura": "F1", "items": ITEMS})
+    assert status == 200 and again["X-Cache"] == "HIT" and again["ETag"] == headers["ETag"]
+
+    status, _, data = pedir(port, "POST", "/conduce", {"destinatario": "TIENDA", "factura": "F1", "items": ITEMS},
+                            {"If-None-Match": headers["ETag"]})
+    assert status == 304 and data == b""
+
+
+@pytest.mark.parametrize("body", [
+    {"items": "no es lista"},
+    {"items": ITEMS, "tema": "No Existe"},
+    {"items": ITEMS, "acento": "rojo"},
+    {"items": [{"Cantidad": "muchos", "Modelo": "X"}]},
+    {"items": [{"Cantidad": 1, "Modelo": "X", "IMEIs": ["350000000000001"]}]},
+])
+def test_pedido_invalido_400(servicio, body):
+    _, port = servicio
+    status, _, data = pedir(port, "POST", "/conduce_imeis", body)
+    assert status == 400
+    assert "error" in json.loads(data)
+
+
+def test_json_invalido_400(servicio):
+    _, port = servicio
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    conn.request("POST", "/conduce", b"{no es json", {"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    assert resp.status == 400
+    assert "JSON" in json.loads(data)["error"]
+
+
+def test_error_del_render_500(servicio, monkeypatch):
+    service, port = servicio
+    # pending.get() relanza lo que falle en el worker (p. ej. un ValueError
+    # de ReportLab): es un error del servicio, no del pedido
+    def falla(doc_type, payload):
+        raise ValueError("fallo dentro del render")
+    monkeypatch.setattr(service, "render", falla)
+    status, _, data = pedir(port, "POST", "/conduce", {"items": ITEMS})
+    assert status == 500
+    assert "ValueError" in json.loads(data)["error"]
+
+
+def test_imei_numerico_se_acepta(servicio):
+    _, port = servicio
+    status, _, data = pedir(port, "POST", "/conduce_imeis", {"items": [{"Cantidad": 1, "Modelo": "X", "IMEIs": 123}]})
+    assert status == 200 and data.startswith(b"%PDF")
+
+
+def test_cola_llena_429(servicio):
+    service, port = servicio
+    # Ocupar todos los lugares (1 worker, cola 0) como lo haría un render largo
+    held = 0
+    while service._slots.acquire(blocking=False):
+        held += 1
+    try:
+        status, headers, _ = pedir(port, "POST", "/garantia", {"tienda": "ANGELO", "items": ITEMS})
+        assert status == 429
+        assert headers["Retry-After"] == "1"
+    finally:
+        for _ in range(held):
+            service._slots.release()
+
+
+def test_rutas_desconocidas_404(servicio):
+    _, port = servicio
+    assert pedir(port, "POST", "/factura", {"items": ITEMS})[0] == 404
+    assert pedir(port, "GET", "/nada")[0] == 404
+
+
+def test_metricas(servicio):
+    _, port = servicio
+    pedir(port, "POST", "/conduce", {"factura": "METRICAS", "items": ITEMS})
+    status, headers, data = pedir(port, "GET", "/metrics")
+    assert status == 200
+    assert headers["Content-Type"].startswith("text/plain")
+    text = data.decode("utf-8")
+    lines = dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+    assert int(lines['documentos_requests_total{status="200"}']) >= 1
+    assert int(lines['documentos_rendered_total{tipo="conduce"}']) >= 1
+    assert lines["documentos_in_flight"] == "0"
+    assert lines["documentos_capacity"] == "1"
+    assert "# TYPE documentos_cache_hits_total counter" in text
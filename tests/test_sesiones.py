@@ -0,0 +1,141 @@
+"""Pruebas del almacén de sesiones y de la sincronización por versión.
+
+Uso:
+    python -m pytest tests/test_sesiones.py
+"""
+import random
+
+import pandas as pd
+import pytest
+
+import sesiones
+from sesiones import SessionStore, apply_changes, OP_FIELDS
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "sesiones.db"), str(tmp_path))
+
+
+def item(rng, n):
+    return {"Cantidad": rng.randint(1, 9), "Modelo": f"MODELO {n}", "IMEIs": " ".join(str(rng.randint(10**14, 10**15 - 1)) for _ in range(rng.randint(0, 3)))}
+
+
+def edit(rng, items, counter):
+    # Una ráfaga de ediciones al azar, como las de un data_editor
+    for _ in range(rng.randint(1, 6)):
+        op = rng.random()
+        if op < 0.35 or not items:
+            items.insert(rng.randint(0, len(items)), item(rng, next(counter)))
+        elif op < 0.7:
+            items[rng.randrange(len(items))] = item(rng, next(counter))
+        else:
+            del items[rng.randrange(len(items))]
+
+
+def records(df):
+    return df.to_dict('records')
+
+
+def sync(store, client):
+    # Lo que hace la página en modo tiempo real (app.sync_session)
+    delta = store.changes_since("s", client["version"])
+    if delta is None:
+        data = store.load("s")
+        client.update(version=data["version"], df=pd.DataFrame(data["items"]), destinatario=data.get("destinatario"), full=client["full"] + 1)
+        return
+    client["version"], changes = delta
+    for op, _, data in changes:
+        if op == OP_FIELDS:
+            client["destinatario"] = data.get("destinatario")
+    client["df"] = apply_changes(client["df"], changes)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_delta_igual_a_carga_completa(store, seed):
+    rng = random.Random(seed)
+    counter = iter(range(10**6))
+    items = [item(rng, next(counter)) for _ in range(rng.randint(0, 40))]
+    session = {"type": "conduce_imeis", "destinatario": "A", "factura": "1", "items": items}
+    store.save("s", session)
+    data = store.load("s")
+    # Clientes que sincronizan en cada ciclo, cada tanto o casi nunca
+    clients = [{"version": data["version"], "df": pd.DataFrame(data["items"]), "destinatario": "A", "full": 0, "every": every}
+               for every in (1, 3, 7)]
+
+    for cycle in range(150):
+        edit(rng, items, counter)
+        if rng.random() < 0.1:
+            session["destinatario"] = f"CLIENTE {cycle}"
+        store.save("s", session)
+        expected = store.load("s")
+        assert expected["items"] == items
+        for client in clients:
+            if cycle % client["every"] == 0:
+                sync(store, client)
+                assert client["version"] == expected["version"]
+                assert records(client["df"]) == items
+                assert list(client["df"].columns) == list(pd.DataFrame(items).columns) or not items
+                assert client["destinatario"] == session["destinatario"]
+
+
+def test_sin_cambios_no_sube_version(store):
+    session = {"type": "conduce_simple", "items": [{"Cantidad": 1, "Modelo": "A"}]}
+    v = store.save("s", session)
+    assert store.save("s", dict(session)) == v
+    assert store.changes_since("s", v) == (v, [])
+
+
+def test_borrar_primera_fila_es_un_solo_cambio(store):
+    items = [{"Cantidad": 1, "Modelo": f"M {i}"} for i in range(2000)]
+    v = store.save("s", {"items": items})
+    store.save("s", {"items": items[1:]})
+    store.save("s", {"items": items[1:1000] + [{"Cantidad": 2, "Modelo": "NUEVO"}] + items[1000:]})
+    _, changes = store.changes_since("s", v)
+    assert changes == [("delete", 0, None), ("insert", 999, {"Cantidad": 2, "Modelo": "NUEVO"})]
+
+
+def test_compactacion_pide_carga_completa(store, monkeypatch):
+    monkeypatch.setattr(sesiones, "LOG_KEEP_VERSIONS", 5)
+    rng = random.Random(7)
+    counter = iter(range(10**6))
+    items = [item(rng, next(counter)) for _ in range(10)]
+    first = store.save("s", {"items": items})
+    client = {"version": first, "df": pd.DataFrame(items), "destinatario": None, "full": 0}
+    for _ in range(12):
+        edit(rng, items, counter)
+        store.save("s", {"items": items})
+
+    # La versión 1 ya salió del registro: hay que cargarla completa
+    assert store.changes_since("s", first) is None
+    sync(store, client)
+    assert client["full"] == 1
+    assert records(client["df"]) == items
+
+    # Dentro de la ventana sigue funcionando el delta
+    recent = store.version("s")
+    edit(rng, items, counter)
+    store.save("s", {"items": items})
+    assert store.changes_since("s", recent) is not None
+    sync(store, client)
+    assert client["full"] == 1
+    assert records(client["df"]) == items
+
+
+def test_version_futura_o_sesion_inexistente(store):
+    v = store.save("s", {"items": []})
+    assert store.changes_since("s", v + 1) is None
+    assert store.changes_since("otra", 1) is None
+
+
+def test_otra_instancia_ve_los_cambios(store, tmp_path):
+    items = [{"Cantidad": 1, "Modelo": f"M {i}"} for i in range(5)]
+    store.save("s", {"items": items})
+    other = SessionStore(str(tmp_path / "sesiones.db"), str(tmp_path))
+    data = other.load("s")
+    data["items"].insert(2, {"Cantidad": 3, "Modelo": "OTRO"})
+    other.save("s", data)
+    # La primera instancia tiene su cache vieja: debe releer la base
+    items.append({"Cantidad": 4, "Modelo": "FINAL"})
+    store.save("s", {"items": data["items"][:2] + [{"Cantidad": 3, "Modelo": "OTRO"}] + items[2:]})
+    assert [r["Modelo"] for r in other.load("s")["items"]] == ["M 0", "M 1", "OTRO", "M 2", "M 3", "M 4", "FINAL"]
@@ -0,0 +1,151 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from cache_documentos import get_document_cache
+from datos_documentos import render_document
+from documentos_pdf import get_document_styles, PDF_THEMES, DEFAULT_ACCENT
+
+# ==========================================
+# COLA DE TRABAJOS DE RENDER (app web)
+# ==========================================
+# "Generar PDF" no construye el documento en el hilo del script de
+# Streamlit: encola un trabajo y devuelve su id al instante, y la página
+# consulta el estado con un fragmento liviano. ReportLab es Python puro y
+# queda limitado por el GIL, así que los trabajos corren en procesos
+# (spawn: no se hereda el estado de los hilos del servidor) y un conduce
+# enorme no frena los reruns de los demás usuarios.
+#
+# Los PDF terminados van a la cache de documentos (cache_documentos),
+# acotada por bytes; aquí solo se guarda el estado de los últimos
+# MAX_JOBS trabajos. Si el PDF ya salió de la cache el trabajo figura
+# como expirado y basta con volver a generarlo. Un PDF más grande que toda
+# la cache no entra en ella: esos bytes quedan en el propio trabajo (solo
+# en los últimos MAX_UNCACHED_JOBS, para no guardar varios PDF enormes).
+
+JOB_PENDING = "pendiente"
+JOB_DONE = "listo"
+JOB_ERROR = "error"
+JOB_EXPIRED = "expirado"
+
+MAX_RENDER_WORKERS = 2
+MAX_JOBS = 256
+MAX_UNCACHED_JOBS = 2
+
+
+def _warm_worker():
+    # Estilos de todos los temas compilados antes del primer trabajo
+    for accent in set(PDF_THEMES.values()) | {DEFAULT_ACCENT}:
+        get_document_styles(accent)
+
+
+def _render_worker(doc_type, destinatario, factura, df, options):
+    return render_document(doc_type, destinatario, factura, df, **options)
+
+
+class RenderJobQueue:
+    """Trabajos de render en un pool de procesos, con estado consultable por id."""
+
+    def __init__(self, max_workers=MAX_RENDER_WORKERS, max_jobs=MAX_JOBS, cache=None):
+        self.max_jobs = max_jobs
+        self.cache = cache or get_document_cache()
+        self._executor = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=_warm_worker)
+        self._jobs = OrderedDict()  # id -> estado del trabajo
+        self._running = {}          # clave del documento -> id del trabajo en curso
+        self._uncached = []         # ids de trabajos con el PDF guardado en el trabajo
+        self._lock = threading.Lock()
+
+    def submit(self, key, doc_type, destinatario, factura, df, options):
+        """Id del trabajo que genera el documento con clave `key`.
+
+        Si el mismo documento ya se está generando se devuelve ese trabajo;
+        si ya está en la cache el trabajo nace terminado.
+        """
+        with self._lock:
+            running_id = self._running.get(key)
+            if running_id is not None:
+                return running_id
+
+            job_id = uuid.uuid4().hex[:12]
+            job = SimpleNamespace(key=key, state=JOB_PENDING, started=time.perf_counter(), seconds=None, error=None, pdf=None)
+            self._jobs[job_id] = job
+            self._trim()
+            if self.cache.get(key) is not None:
+                job.state, job.seconds = JOB_DONE, 0.0
+                return job_id
+            self._running[key] = job_id
+
+        try:
+            future = self._executor.submit(_render_worker, doc_type, destinatario, factura, df, options)
+        except Exception as e:  # Pool roto o cerrado
+            self._finish(job_id, error=e)
+        else:
+            future.add_done_callback(lambda f: self._finish(job_id, future=f))
+        return job_id
+
+    def status(self, job_id):
+        """SimpleNamespace(state, seconds, error); state es uno de JOB_*."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return SimpleNamespace(state=JOB_EXPIRED, seconds=None, error=None)
+            seconds = job.seconds if job.seconds is not None else time.perf_counter() - job.started
+            state = job.state
+            if state == JOB_DONE and job.pdf is None and self.cache.get(job.key) is None:
+                state = JOB_EXPIRED
+            return SimpleNamespace(state=state, seconds=seconds, error=job.error)
+
+    def result(self, job_id):
+        """(bytes, etag) del trabajo terminado, o None si no está listo o expiró."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.state != JOB_DONE:
+            return None
+        return job.pdf or self.cache.get(job.key)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, job_id, future=None, error=None):
+        pdf_bytes = None
+        if future is not None:
+            try:
+                pdf_bytes = future.result()
+            except Exception as e:
+                error = e
+        with self._lock:
+            job = self._jobs.get(job_id)
+            key = job.key if job is not None else None
+        uncached = None
+        if pdf_bytes is not None and key is not None:
+            etag = self.cache.put(key, pdf_bytes)
+            if self.cache.get(key) is None:
+                uncached = (pdf_bytes, etag)  # Más grande que toda la cache
+
+        with self._lock:
+            if job is not None and uncached is not None:
+                job.pdf = uncached
+                self._uncached.append(job_id)
+                while len(self._uncached) > MAX_UNCACHED_JOBS:
+                    old = self._jobs.get(self._uncached.pop(0))
+                    if old is not None:
+                        old.pdf = None
+            if job is not None:
+                self._running.pop(job.key, None)
+                job.seconds = time.perf_counter() - job.started
+                job.state = JOB_ERROR if error is not None else JOB_DONE
+                job.error = f"{type(error).__name__}: {error}" if error is not None else None
+
+    def _trim(self):
+        # Con el lock tomado: se olvidan primero los trabajos terminados más viejos
+        if len(self._jobs) <= self.max_jobs:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].state != JOB_PENDING:
+                del self._jobs[job_id]
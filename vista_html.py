@@ -0,0 +1,135 @@
+from html import escape
+
+from reportlab.lib.units import inch
+
+from documentos_pdf import is_light_color, grid_bands, IMEI_LAYOUT_GRID, SIGNATURE_LABELS
+
+# ==========================================
+# VISTA PREVIA HTML DE LOS DOCUMENTOS
+# ==========================================
+# Misma disposición que los PDF, armada desde el mismo modelo
+# (conduce_model, conduce_imeis_model, garantia_model de documentos_pdf).
+# Es solo texto, así que se regenera en cada edición del data_editor en
+# pocos milisegundos; el PDF de verdad se construye solo al descargar.
+# El logo no se incluye: es lo único pesado y no cambia entre ediciones.
+#
+# En pedidos enormes solo se muestran las primeras PREVIEW_MAX_ROWS filas
+# (y secciones de IMEIs): mandar varios MB de HTML al navegador en cada
+# edición anularía la ventaja. Los totales siempre son los del documento.
+PREVIEW_MAX_ROWS = 300
+
+# Ancho útil de la sección de IMEIs en el PDF (7.7" menos el padding de la celda)
+GRID_WIDTH = 7.7 * inch - 12
+
+_CSS = """
+<style>
+.doc { font-family: Helvetica, Arial, sans-serif; font-size: 13px; color: #000; max-width: 780px; margin: 0 auto; padding: 16px; background: #fff; }
+.doc table { width: 100%; border-collapse: collapse; }
+.doc .titulo { text-align: right; font-size: 24px; font-weight: bold; color: #2C3E50; margin: 8px 0 12px; }
+.doc .info { font-size: 12px; font-weight: bold; color: #34495E; }
+.doc .info td { padding: 2px 6px; }
+.doc .info tr:first-child td { border-bottom: 1px solid var(--acento); }
+.doc .items { margin-top: 12px; }
+.doc .items td, .doc .items th { border: 1px solid grey; padding: 3px 6px; text-align: left; }
+.doc .items th { background: var(--acento); color: var(--texto-acento); font-size: 12px; }
+.doc .centro { text-align: center !important; }
+.doc .total { text-align: right; font-weight: bold; font-size: 14px; margin-top: 4px; }
+.doc .nota { font-size: 10px; margin-top: 18px; }
+.doc .firmas { margin-top: 36px; text-align: center; }
+.doc .seccion { background: var(--acento); border: 1px solid grey; text-align: center; font-weight: bold; padding: 3px; margin-top: 12px; }
+.doc .imeis { border: 1px solid grey; border-top: none; font-size: 11px; }
+.doc .imeis div { border-top: 1px solid grey; padding: 3px 6px; }
+.doc .imeis .modelo { background: whitesmoke; }
+.doc pre { font-family: Courier, monospace; font-size: 9px; line-height: 10px; margin: 0; }
+.doc .garantia-titulo { font-size: 30px; font-weight: bold; color: navy; margin: 16px 0 2px; }
+.doc .garantia-fecha { font-weight: bold; color: deeppink; font-size: 15px; }
+.doc .garantia-items td, .doc .garantia-items th { border: 1px solid black; padding: 2px 6px; vertical-align: top; text-align: left; }
+.doc .garantia-items th { background: lightgrey; }
+.doc .lineas { color: grey; font-size: 13px; }
+</style>
+"""
+
+
+def _open(accent_hex):
+    text_color = "#000" if is_light_color(accent_hex) else "#fff"
+    return [_CSS, f'<div class="doc" style="--acento: {escape(accent_hex)}; --texto-acento: {text_color}">']
+
+
+def _header(parts, model):
+    parts.append(f'<div class="titulo">{escape(model.title)}</div>')
+    parts.append('<table class="info">')
+    parts.append(f'<tr><td>FECHA: {escape(model.date)}</td><td style="width: 32%">FACTURA N°: {escape(str(model.factura))}</td></tr>')
+    parts.append(f'<tr><td>CLIENTE: {escape(str(model.cliente))}</td><td></td></tr>')
+    parts.append('</table>')
+
+
+def _more_rows(parts, total, what="filas"):
+    if total > PREVIEW_MAX_ROWS:
+        parts.append(f'<div class="nota">… y {total - PREVIEW_MAX_ROWS} {what} más (ver PDF)</div>')
+
+
+def _signatures(parts):
+    parts.append('<table class="firmas"><tr><td>_______________________</td><td>_______________________</td></tr>'
+                 f'<tr><td>{SIGNATURE_LABELS[0]}</td><td>{SIGNATURE_LABELS[1]}</td></tr></table>')
+
+
+def conduce_html(model, accent_hex):
+    """HTML del conduce simple (ver generate_conduce_pdf)."""
+    parts = _open(accent_hex)
+    _header(parts, model)
+    parts.append('<table class="items"><tr><th style="width: 10%">CANT</th><th>DESCRIPCIÓN DEL MODELO / EQUIPO</th><th class="centro" style="width: 10%">VERIF.</th></tr>')
+    parts.extend(f'<tr><td class="centro">{escape(qty)}</td><td>{escape(modelo)}</td><td class="centro">[&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;]</td></tr>' for qty, modelo in model.rows[:PREVIEW_MAX_ROWS])
+    parts.append('</table>')
+    _more_rows(parts, len(model.rows))
+    if model.total is not None:
+        parts.append(f'<div class="total">TOTAL UNIDADES: {model.total}</div>')
+    parts.append(f'<div class="nota"><b>Nota Importante:</b><br>{escape(model.note)}</div>')
+    _signatures(parts)
+    parts.append('</div>')
+    return "".join(parts)
+
+
+def conduce_imeis_html(model, accent_hex, imei_layout):
+    """HTML del conduce con IMEIs (ver generate_conduce_imeis_pdf)."""
+    parts = _open(accent_hex)
+    _header(parts, model)
+    parts.append('<div class="seccion">DETALLE DE MERCANCÍA</div>')
+    parts.append('<table class="items" style="margin-top: 0"><tr><th class="centro" style="width: 10%; background: lightgrey; color: #000">CANT</th><th style="background: lightgrey; color: #000">DESCRIPCIÓN DEL MODELO / EQUIPO</th></tr>')
+    parts.extend(f'<tr><td class="centro">{escape(qty)}</td><td>{escape(modelo)}</td></tr>' for qty, modelo in model.rows[:PREVIEW_MAX_ROWS])
+    parts.append('</table>')
+    _more_rows(parts, len(model.rows))
+
+    if model.sections:
+        parts.append('<div class="seccion">DETALLE DE IMEIS / SERIALES</div><div class="imeis">')
+        for modelo, imeis in model.sections[:PREVIEW_MAX_ROWS]:
+            if imei_layout == IMEI_LAYOUT_GRID:
+                parts.append(f'<div class="modelo"><b>{escape(modelo)}</b> ({len(imeis)})</div>')
+                parts.append(f'<div><pre>{escape(chr(10).join(grid_bands(imeis, GRID_WIDTH)))}</pre></div>')
+            else:
+                parts.append(f'<div><b>{escape(modelo)}:</b> {escape(", ".join(imeis))}</div>')
+        parts.append('</div>')
+        _more_rows(parts, len(model.sections), "modelos con IMEIs")
+
+    parts.append(f'<div class="nota"><b>Nota Importante:</b> {escape(model.note)}</div>')
+    _signatures(parts)
+    parts.append('</div>')
+    return "".join(parts)
+
+
+def garantia_html(model):
+    """HTML del recibo de garantía (ver generate_garantia_pdf)."""
+    parts = _open("#D3D3D3")
+    parts.append(f'<div style="text-align: right">{"<br>".join(escape(line) for line in model.address)}</div>')
+    parts.append(f'<div class="garantia-titulo">{escape(model.title)}</div>')
+    parts.append(f'<div class="garantia-fecha">Fecha:&nbsp; {escape(model.date)}</div>')
+    parts.append(f'<div style="font-weight: bold; font-size: 15px; margin-bottom: 10px">Tienda: {escape(str(model.store))}</div>')
+    parts.append('<table class="garantia-items"><tr><th class="centro" style="width: 13%">CANT</th><th>DESCRIPCIÓN</th></tr>')
+    for qty, modelo, lines in model.rows[:PREVIEW_MAX_ROWS]:
+        detail = f'<div class="lineas">{"<br>".join(escape(line) for line in lines)}</div>' if lines else ""
+        parts.append(f'<tr><td class="centro">{qty}</td><td><b>{escape(str(modelo))}</b>{detail}</td></tr>')
+    parts.append(f'<tr><td class="centro">{model.total}</td><td>TOTAL EQUIPOS</td></tr></table>')
+    _more_rows(parts, len(model.rows))
+    parts.append(f'<div class="nota" style="font-size: 11px">{escape(model.terms)}</div>')
+    parts.append('<div class="firmas">___________________________________<br><span style="color: deeppink">Firma</span></div>')
+    parts.append('</div>')
+    return "".join(parts)